@@ -0,0 +1,100 @@
+"""
+Response compression for JSON responses.
+
+Task results are repetitive JSON and compress 5-20x, which matters more
+than encoding speed for clients polling over the internet. JSON
+responses of COMPRESS_MIN_BYTES or more are compressed with the best
+encoding the client accepts:
+
+- zstd, when the optional zstandard package is installed
+  (pip install zstandard); faster than gzip at a better ratio
+- gzip otherwise
+
+Other responses (metrics, small bodies, clients sending no
+Accept-Encoding) pass through unchanged.
+"""
+
+import asyncio
+import gzip
+import importlib.util
+import logging
+
+from fastapi import Request
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+# Larger bodies are compressed off the event loop
+OFFLOAD_BYTES = 256 * 1024
+
+_zstd = None
+if importlib.util.find_spec("zstandard") is not None:
+    import zstandard
+
+    _zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+
+
+def _accepted(header: str) -> set[str]:
+    """Encodings in an Accept-Encoding header, without those given q=0."""
+    encodings = set()
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name)
+    return encodings
+
+
+def choose_encoding(header: str) -> str | None:
+    accepted = _accepted(header)
+    if _zstd is not None and "zstd" in accepted:
+        return "zstd"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return _zstd.compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+async def compress_responses(request: Request, call_next):
+    """HTTP middleware: compress JSON responses the client can decode."""
+    response = await call_next(request)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if (
+        encoding is None
+        or "content-encoding" in response.headers
+        or not response.headers.get("content-type", "").startswith("application/json")
+    ):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if len(body) >= OFFLOAD_BYTES:
+            body = await asyncio.to_thread(_compress, body, encoding)
+        else:
+            body = _compress(body, encoding)
+    else:
+        encoding = None
+
+    compressed = Response(body, status_code=response.status_code, background=response.background)
+    compressed.raw_headers = [
+        (name, value) for name, value in response.raw_headers if name.lower() != b"content-length"
+    ]
+    compressed.headers["content-length"] = str(len(body))
+    if encoding is not None:
+        compressed.headers["content-encoding"] = encoding
+    compressed.headers.add_vary_header("Accept-Encoding")
+    return compressed
@@ -0,0 +1,70 @@
+"""
+Request deadlines for task runs.
+
+A client that only cares about a result for a while sends
+`X-Deadline-Ms: <budget in ms>`. The budget starts when the request
+arrives; `inject_deadline` adds the absolute deadline to task input so
+the workflow worker can degrade or give up when it runs short (see
+workflows/deadline.py for the receiving side and input format).
+
+Requests without the header behave as before, and so do requests whose
+header is not a finite, positive number of milliseconds (it is logged
+and ignored).
+"""
+
+import contextvars
+import logging
+import math
+import time
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "x-deadline-ms"
+# Must match DEADLINE_KEY in workflows/deadline.py
+DEADLINE_KEY = "__deadline__"
+
+# Absolute deadline (unix seconds) of the request being handled
+_current: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+def remaining_ms() -> float | None:
+    """Milliseconds left before the request's deadline; None without one."""
+    deadline = _current.get()
+    if deadline is None:
+        return None
+    return (deadline - time.time()) * 1000
+
+
+def inject_deadline(args: list | dict) -> list | dict:
+    """Task input carrying the request's deadline, when it has one."""
+    deadline = _current.get()
+    if deadline is None:
+        return args
+    value = round(deadline * 1000)
+    if isinstance(args, dict):
+        return {**args, DEADLINE_KEY: value}
+    return [*args, {DEADLINE_KEY: value}]
+
+
+async def deadline_requests(request: Request, call_next):
+    """HTTP middleware: start the request's deadline from X-Deadline-Ms."""
+    header = request.headers.get(DEADLINE_HEADER)
+    deadline = None
+    if header:
+        try:
+            budget_ms = float(header)
+        except ValueError:
+            budget_ms = math.nan
+        if math.isfinite(budget_ms) and budget_ms > 0:
+            deadline = time.time() + budget_ms / 1000
+        else:
+            logger.warning(f"Ignoring malformed {DEADLINE_HEADER} header: {header!r}")
+    token = _current.set(deadline)
+    try:
+        return await call_next(request)
+    finally:
+        _current.reset(token)
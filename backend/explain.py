@@ -0,0 +1,377 @@
+"""
+Dry-run planner ("explain") for deep_parallel_tree and the document
+pipelines.
+
+Explaining a run simulates its task graph from the input alone; nothing
+is started:
+
+    POST /api/parallel/deep_parallel_tree/explain  {"numbers": [...], "chunk_size": 4}
+    POST /api/advanced/process_document/explain    {"document": "...", "pipelined": true}
+
+The response has the exact number of task runs per level (levels are
+labelled as in workflows/trace_analysis.py), the critical path (the
+chain of task runs the end-to-end time depends on), estimated JSON
+payload bytes (arguments plus results) and a predicted wall time. The
+simulation assumes no checkpoint restores, no retries, no deadline and
+that Render starts every subtask at once.
+
+Wall time is the sum of per-task latencies along the critical path. The
+latencies are each task's median self time (queue wait plus own work)
+from EXPLAIN_LATENCY_PROFILE, a file written by
+`python workflows/trace_analysis.py trace.json --latency-profile FILE`
+from a traced run. Tasks missing from the profile use DEFAULT_TASK_MS,
+and OpenAI tasks the default latency model of workflows/model_routing.py.
+Each task in the response says which source it used.
+
+With MAX_TREE_TASKS set, deep_parallel_tree submissions that would start
+more task runs than that are refused with 422 and their explanation.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Run overhead of a task without a recorded latency
+DEFAULT_TASK_MS = 500.0
+
+# Size of a dataset handle argument ({"dataset": id, "start": i, "stop": j})
+HANDLE_BYTES = 80
+# Largest decimal width of a packed dataset's values (payloads.PACKED_FORMATS)
+PACKED_DIGITS = {"int64": 19, "int32": 10, "float64": 24}
+
+# Copied from model_routing.py (tests/test_explain_copies.py checks them):
+# (short_input_chars, output_tokens) per task, and (base_ms,
+# ms_per_output_token) of the fast and strong models
+CHARS_PER_TOKEN = 4
+OPENAI_TASKS = {
+    "analyze_text_sentiment": (600, 80),
+    "translate_text": (300, None),
+    "summarize_text": (1500, 150),
+}
+FAST_MODEL_MS = (400, 8)
+STRONG_MODEL_MS = (1200, 35)
+# Typical JSON size of an analyze_text_sentiment result
+SENTIMENT_BYTES = 200
+
+
+@dataclass
+class LevelPlan:
+    level: str
+    tasks: int
+    payload_bytes: int
+
+
+@dataclass
+class Explanation:
+    task: str
+    total_tasks: int
+    levels: list[LevelPlan]
+    critical_path: list[str]
+    predicted_wall_ms: float
+    payload_bytes: int
+    peak_parallel_tasks: int
+    latencies: dict[str, dict] = field(default_factory=dict)
+    notes: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "critical_path_depth": len(self.critical_path)}
+
+
+class Latencies:
+    """Per-task latency: recorded in the profile, or a default."""
+
+    def __init__(self, profile: dict[str, float]):
+        self.profile = profile
+        self.used: dict[str, dict] = {}
+
+    def ms(self, task: str, input_chars: int = 0) -> float:
+        if task in self.profile:
+            latency, source = self.profile[task], "profile"
+        elif task in OPENAI_TASKS:
+            short_chars, output_tokens = OPENAI_TASKS[task]
+            base_ms, per_token = FAST_MODEL_MS if input_chars <= short_chars else STRONG_MODEL_MS
+            tokens = output_tokens if output_tokens is not None else input_chars / CHARS_PER_TOKEN
+            latency, source = DEFAULT_TASK_MS + base_ms + tokens * per_token, "default model"
+        else:
+            latency, source = DEFAULT_TASK_MS, "default"
+        # Tasks called with several input sizes report the slowest
+        if latency >= self.used.get(task, {}).get("ms", 0):
+            self.used[task] = {"ms": round(latency, 3), "source": source}
+        return latency
+
+
+_profile_cache: tuple[str, float, dict] | None = None
+_profile_lock = threading.Lock()
+
+
+def load_latencies() -> Latencies:
+    """Latencies from EXPLAIN_LATENCY_PROFILE (re-read when the file changes)."""
+    global _profile_cache
+    path = os.getenv("EXPLAIN_LATENCY_PROFILE")
+    if not path:
+        return Latencies({})
+    try:
+        mtime = os.path.getmtime(path)
+        with _profile_lock:
+            if _profile_cache is None or _profile_cache[:2] != (path, mtime):
+                with open(path) as f:
+                    tasks = json.load(f)["tasks"]
+                _profile_cache = (path, mtime, {name: float(t["self_ms"]) for name, t in tasks.items()})
+            return Latencies(dict(_profile_cache[2]))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring latency profile {path}: {e}")
+        return Latencies({})
+
+
+def _list_bytes(count: int, item_bytes: float) -> float:
+    """JSON size of a list of count items of item_bytes each."""
+    return 2 + count * (item_bytes + 2)
+
+
+def explain_tree(count: int, chunk_size: int, digits: float, handle: bool = False) -> Explanation:
+    """
+    Simulate deep_parallel_tree over `count` numbers of `digits` decimal
+    digits on average, passed inline or as a dataset handle. The graph
+    mirrors workflows/parallel_tasks.py.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be positive, got {chunk_size}")
+    latencies = load_latencies()
+    s = latencies.ms
+    n, d = count, digits
+    chunks = math.ceil(n / chunk_size)
+    pairs = n // 2
+
+    # tree_partial_sum halves 2 * pairs values until one is left
+    lengths = [2 * pairs]
+    while lengths[-1] > 1:
+        lengths.append(math.ceil(lengths[-1] / 2))
+
+    # Decimal digits of the values at each stage
+    square_d, cube_d = 2 * d, 3 * d
+    pair_sum_d, product_d = cube_d + 1, 2 * cube_d
+    record = 40 + square_d + 2 * cube_d
+    numbers_arg = HANDLE_BYTES if handle else _list_bytes(n, d)
+    chunk_results = _list_bytes(chunks, 60) + _list_bytes(n, d) + _list_bytes(n, record)
+    scatter_result = 80 + chunk_results
+    cross_result = 80 + _list_bytes(pairs, pair_sum_d) + _list_bytes(pairs, product_d)
+    summary = 300 + cube_d + product_d
+
+    levels = [
+        LevelPlan("L0 deep_parallel_tree", 1, numbers_arg + summary),
+        LevelPlan("L1 tree_scatter", 1, numbers_arg + scatter_result),
+        LevelPlan(
+            "L2 tree_chunk_process", chunks,
+            (chunks * HANDLE_BYTES if handle else _list_bytes(n, d)) + chunk_results,
+        ),
+        LevelPlan("L3 tree_square", n, n * (d + 2 + square_d)),
+        LevelPlan("L4 tree_cube", n, n * (d + 2 + cube_d)),
+        LevelPlan("L5 tree_combine", n, n * (square_d + cube_d + 4 + record)),
+        LevelPlan("L6 tree_cross_reduce", 1, chunk_results + cross_result),
+        LevelPlan("L7 tree_pair_add", pairs, pairs * (2 * cube_d + 4 + pair_sum_d)),
+        LevelPlan("L8 tree_pair_multiply", pairs, pairs * (2 * cube_d + 4 + product_d)),
+        LevelPlan("L9 tree_layered_sum", 1, cross_result + 40 + product_d),
+    ]
+    value_d = product_d
+    for depth, length in enumerate(lengths, start=1):
+        adds = length // 2
+        # The partial sum at this depth and the pair additions it starts
+        levels.append(LevelPlan(
+            f"L{9 + depth} tree_partial_sum", 1 + adds,
+            _list_bytes(length, value_d) + 40 + value_d + adds * (3 * value_d + 5),
+        ))
+        value_d += math.log10(2)
+    levels.append(LevelPlan("L12 tree_finalize", 1, scatter_result + cross_result + 40 + 2 * summary))
+    levels.sort(key=lambda level: int(level.level.split(" ")[0][1:]))
+    for level in levels:
+        level.payload_bytes = round(level.payload_bytes)
+
+    # The critical path and its latency, phase by phase
+    path = ["L0 deep_parallel_tree", "L1 tree_scatter"]
+    wall = s("deep_parallel_tree") + s("tree_scatter")
+    if n:
+        leaf = max(("tree_square", "tree_cube"), key=s)
+        path += ["L2 tree_chunk_process", f"L{3 if leaf == 'tree_square' else 4} {leaf}", "L5 tree_combine"]
+        wall += s("tree_chunk_process") + s(leaf) + s("tree_combine")
+    path.append("L6 tree_cross_reduce")
+    wall += s("tree_cross_reduce")
+    if pairs:
+        pair_task = max(("tree_pair_add", "tree_pair_multiply"), key=s)
+        path.append(f"L{7 if pair_task == 'tree_pair_add' else 8} {pair_task}")
+        wall += s(pair_task)
+    path.append("L9 tree_layered_sum")
+    wall += s("tree_layered_sum")
+    for depth, length in enumerate(lengths, start=1):
+        path.append(f"L{9 + depth} tree_partial_sum")
+        wall += s("tree_partial_sum")
+        if length > 1:
+            path.append(f"L{9 + depth} tree_pair_add")
+            wall += s("tree_pair_add")
+    path.append("L12 tree_finalize")
+    wall += s("tree_finalize")
+
+    notes = []
+    if handle and digits:
+        notes.append("Value sizes are estimated from the dataset's format")
+    return Explanation(
+        task="deep_parallel_tree",
+        total_tasks=sum(level.tasks for level in levels),
+        levels=levels,
+        critical_path=path,
+        predicted_wall_ms=round(wall, 1),
+        payload_bytes=sum(level.payload_bytes for level in levels),
+        # Root, scatter and every chunk, while all squares and cubes run
+        peak_parallel_tasks=max(2 + chunks + 2 * n, 3 + 2 * pairs),
+        latencies=latencies.used,
+        notes=notes,
+    )
+
+
+def explain_tree_input(numbers: list | None = None, meta: dict | None = None,
+                       chunk_size: int = 4) -> Explanation:
+    """explain_tree for an inline list of numbers, or a stored dataset's metadata."""
+    if meta is not None:
+        count = meta["count"]
+        if meta["format"] in PACKED_DIGITS:
+            digits = PACKED_DIGITS[meta["format"]]
+        else:
+            # One value per line
+            digits = max(meta["bytes"] / count - 1, 1) if count else 1
+        return explain_tree(count, chunk_size, digits, handle=True)
+    count = len(numbers)
+    digits = sum(len(str(x)) for x in numbers) / count if count else 1
+    return explain_tree(count, chunk_size, digits)
+
+
+def tree_limit() -> int | None:
+    """MAX_TREE_TASKS, or None when it is unset (or malformed)."""
+    value = os.getenv("MAX_TREE_TASKS", "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Ignoring malformed MAX_TREE_TASKS: {value!r}")
+        return None
+
+
+def enforce_tree_limit(explain: Callable[[], Explanation]) -> None:
+    """
+    Refuse a deep_parallel_tree run over MAX_TREE_TASKS task runs. The
+    run is only explained (an O(n) pass over its input) when it is set.
+    """
+    limit = tree_limit()
+    if limit is None:
+        return
+    explanation = explain()
+    if explanation.total_tasks > limit:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": f"Run would start {explanation.total_tasks} task runs (MAX_TREE_TASKS={limit})",
+                "explain": explanation.as_dict(),
+            },
+        )
+
+
+# Copied from _split_document in workflows/advanced_tasks.py (checked by
+# tests/test_explain_copies.py)
+def split_document(document: str, max_chars: int) -> list[str]:
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", document.strip()):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(re.split(r"(?<=[.!?])\s+", paragraph))
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks or [document]
+
+
+class _Calls:
+    """Task runs of a pipeline, grouped by level label."""
+
+    def __init__(self, latencies: Latencies):
+        self.latencies = latencies
+        self.levels: dict[str, LevelPlan] = {}
+
+    def call(self, task: str, input_chars: int, output_bytes: int) -> float:
+        """Count one call of task; returns its latency."""
+        level = self.levels.setdefault(f"L1 {task}", LevelPlan(f"L1 {task}", 0, 0))
+        level.tasks += 1
+        level.payload_bytes += input_chars + output_bytes + 20
+        return self.latencies.ms(task, input_chars)
+
+
+def explain_pipeline(document: str, translate_to: str | None = None, pipelined: bool = False,
+                     analyze_original: bool = False, chunk_chars: int = 1500) -> Explanation:
+    """
+    Simulate process_document_pipeline, or its pipelined variant, for a
+    document. The graph mirrors workflows/advanced_tasks.py.
+    """
+    latencies = load_latencies()
+    calls = _Calls(latencies)
+    summary_chars = OPENAI_TASKS["summarize_text"][1] * CHARS_PER_TOKEN
+    task = "process_document_pipeline_streaming" if pipelined else "process_document_pipeline"
+
+    def chain(text_chars: int, label_suffix: str = "") -> tuple[float, list[str]]:
+        """translate → summarize → sentiment over text_chars; (latency, path)."""
+        wall, path = 0.0, []
+        if translate_to:
+            wall += calls.call("translate_text", text_chars, text_chars)
+            path.append("L1 translate_text")
+        wall += calls.call("summarize_text", text_chars, summary_chars)
+        wall += calls.call("analyze_text_sentiment", summary_chars, SENTIMENT_BYTES)
+        return wall, path + ["L1 summarize_text", "L1 analyze_text_sentiment"]
+
+    chunks = [document]
+    if pipelined:
+        chunks = split_document(document, chunk_chars)
+        branches = [chain(len(chunk)) for chunk in chunks]
+        wall, path = max(branches, key=lambda branch: branch[0])
+        if analyze_original:
+            original = calls.call("analyze_text_sentiment", len(document), SENTIMENT_BYTES)
+            if original > wall:
+                wall, path = original, ["L1 analyze_text_sentiment"]
+        if len(chunks) > 1:
+            reduce_chars = len(chunks) * (summary_chars + 1)
+            wall += calls.call("summarize_text", reduce_chars, summary_chars)
+            wall += calls.call("analyze_text_sentiment", summary_chars, SENTIMENT_BYTES)
+            path = path + ["L1 summarize_text", "L1 analyze_text_sentiment"]
+        peak = 1 + len(chunks) + (1 if analyze_original else 0)
+    else:
+        wall, path = chain(len(document))
+        peak = 2
+
+    doc = len(document)
+    result_bytes = doc * (2 if translate_to else 1) + summary_chars + SENTIMENT_BYTES * (1 + len(chunks))
+    levels = [LevelPlan(f"L0 {task}", 1, doc + result_bytes), *calls.levels.values()]
+    wall += latencies.ms(task)
+    return Explanation(
+        task=task,
+        total_tasks=sum(level.tasks for level in levels),
+        levels=levels,
+        critical_path=[f"L0 {task}", *path],
+        predicted_wall_ms=round(wall, 1),
+        payload_bytes=sum(level.payload_bytes for level in levels),
+        peak_parallel_tasks=peak,
+        latencies=latencies.used,
+        notes=[f"{len(chunks)} chunks of at most ~{chunk_chars} characters"] if pipelined else [],
+    )
@@ -0,0 +1,227 @@
+"""
+Task-run history in an embedded SQLite database.
+
+Run history used to live only in the browser (TaskExecutionContext), and
+any view of past runs meant asking the Render API again. The backend now
+records every run it starts and the terminal state it next sees for it
+(from a poll or a cancel), so GET /api/tasks can list thousands of runs
+without upstream calls:
+
+    GET /api/tasks?task=deep_parallel_tree&status=completed,failed&limit=50
+    GET /api/tasks?...&cursor=<next_cursor>
+
+Runs are listed newest first with keyset pagination: the cursor is the
+(submitted_at, id) of the last run returned, so a page costs an index
+range scan however deep it is, and runs submitted meanwhile do not shift
+later pages. The indexes cover the filters (task, status) in that order.
+
+A run's status is the last one the backend saw. Runs nobody polled after
+submitting stay "running". Completed results are stored too (up to
+MAX_RESULT_BYTES) and serve later polls of the run without a Render
+call.
+
+TASK_HISTORY_DB is the database path (default
+<tmp>/backend-task-history.sqlite3); "off" disables the history.
+Several uvicorn workers can share one file (WAL mode).
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any
+
+from .results import decode_json, encode_json
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "canceled")
+MAX_RESULT_BYTES = 16 * 1024 * 1024
+MAX_LIST_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_runs (
+    id            TEXT PRIMARY KEY,
+    task          TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    submitted_at  REAL NOT NULL,
+    finished_at   REAL,
+    message       TEXT,
+    trace_id      TEXT,
+    result        BLOB,
+    result_bytes  INTEGER,
+    plan          TEXT,
+    priority      TEXT,
+    input_size    INTEGER
+);
+CREATE INDEX IF NOT EXISTS task_runs_by_time ON task_runs (submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS task_runs_by_task ON task_runs (task, submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS task_runs_by_status ON task_runs (status, submitted_at DESC, id DESC);
+"""
+
+# Columns added since the table was first created, for older databases
+_ADDED_COLUMNS = {"plan": "TEXT", "priority": "TEXT", "input_size": "INTEGER"}
+
+_COLUMNS = (
+    "id, task, status, submitted_at, finished_at, message, trace_id, result_bytes, plan, priority, input_size"
+)
+
+
+def _encode_cursor(submitted_at: float, run_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([submitted_at, run_id]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        submitted_at, run_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(submitted_at), str(run_id)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor {cursor!r}") from None
+
+
+class TaskHistory:
+    """The task_runs table; methods are blocking (call them from a thread)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(task_runs)")}
+        for column, kind in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE task_runs ADD COLUMN {column} {kind}")
+        self._lock = threading.Lock()
+
+    def record_submitted(self, run_id: str, task: str, trace_id: str | None = None,
+                         submitted_at: float | None = None, plan: str | None = None,
+                         priority: str | None = None, input_size: int | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO task_runs"
+                " (id, task, status, submitted_at, trace_id, plan, priority, input_size)"
+                " VALUES (?, ?, 'running', ?, ?, ?, ?, ?)",
+                (run_id, task, submitted_at or time.time(), trace_id, plan, priority, input_size),
+            )
+
+    def record_finished(self, run_id: str, status: str, message: str | None = None,
+                        result: Any = None) -> None:
+        """Store a run's terminal state; later calls for the same run are ignored."""
+        try:
+            blob = encode_json(result) if result is not None else None
+        except (TypeError, ValueError) as e:
+            # Still record the status; polls of the run fetch the result again
+            logger.warning(f"Not storing the result of {run_id}: {e}")
+            blob = None
+        size = len(blob) if blob is not None else None
+        if size is not None and size > MAX_RESULT_BYTES:
+            blob = None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE task_runs SET status = ?, finished_at = ?, message = ?, result = ?, result_bytes = ?"
+                " WHERE id = ? AND finished_at IS NULL",
+                (status, time.time(), message, blob, size, run_id),
+            )
+
+    def get_result(self, run_id: str) -> tuple[bool, Any]:
+        """(True, result) if a completed result is stored for the run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM task_runs WHERE id = ? AND status = 'completed' AND result IS NOT NULL",
+                (run_id,),
+            ).fetchone()
+        return (True, decode_json(row["result"])) if row else (False, None)
+
+    def list_runs(
+        self,
+        task: str | None = None,
+        statuses: list[str] | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Runs newest first, and the cursor of the next page (None on the last)."""
+        where, params = [], []
+        if task:
+            where.append("task = ?")
+            params.append(task)
+        if statuses:
+            where.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if since is not None:
+            where.append("submitted_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("submitted_at < ?")
+            params.append(until)
+        if cursor:
+            where.append("(submitted_at, id) < (?, ?)")
+            params.extend(_decode_cursor(cursor))
+        sql = f"SELECT {_COLUMNS} FROM task_runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY submitted_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1]["submitted_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+
+_history: TaskHistory | None = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> TaskHistory | None:
+    """The history database named by TASK_HISTORY_DB, or None when it is off."""
+    global _history
+    path = os.getenv("TASK_HISTORY_DB") or os.path.join(tempfile.gettempdir(), "backend-task-history.sqlite3")
+    if path == "off":
+        return None
+    with _history_lock:
+        if _history is None or _history.path != path:
+            _history = TaskHistory(path)
+        return _history
+
+
+async def _run(method: str, *args, **kwargs):
+    """Call a TaskHistory method in a thread; history failures are logged, not raised."""
+    try:
+        history = get_history()
+        if history is None:
+            return None
+        return await asyncio.to_thread(getattr(history, method), *args, **kwargs)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        # ValueError/TypeError: a result that cannot be encoded or decoded
+        logger.warning(f"Task history {method} failed: {e}")
+        return None
+
+
+async def record_submitted(run_id: str, task_name: str, trace_id: str | None = None,
+                           plan: str | None = None, priority: str | None = None,
+                           input_size: int | None = None) -> None:
+    await _run(
+        "record_submitted", run_id, task_name.rsplit("/", 1)[-1], trace_id,
+        plan=plan, priority=priority, input_size=input_size,
+    )
+
+
+async def record_finished(run_id: str, status: str, message: str | None = None, result: Any = None) -> None:
+    await _run("record_finished", run_id, status, message, result)
+
+
+async def stored_result(run_id: str) -> tuple[bool, Any]:
+    found = await _run("get_result", run_id)
+    return found or (False, None)
@@ -0,0 +1,125 @@
+"""
+Idempotency keys for task submissions.
+
+A client that may retry a submission (a timeout, a dropped connection)
+sends `Idempotency-Key: <unique string>`. The first request with a key
+starts the task run; a repeat with the same key and task returns the
+same task_run_id instead of starting another run, whichever worker it
+lands on (keys live in shared state, see shared_state.py):
+
+- the first request is still starting the run: 409, retry shortly
+- same key with a different input: 422
+- the run was started: the original response, for IDEMPOTENCY_TTL
+
+If the run fails to start, the key is released so a retry can start it.
+Requests without the header behave as before; so do all requests while
+the shared state is unreachable.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+
+from .metrics import record_cache
+from .shared_state import STATE_ERRORS, get_state
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+# How long a started run's response is replayed
+IDEMPOTENCY_TTL = 24 * 3600
+# How long a claim lasts if its request dies before the run starts
+PENDING_TTL = 60
+
+_current: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "idempotency_key", default=None
+)
+
+
+@dataclass
+class Claim:
+    key: str
+    fingerprint: str
+    # The original response, when the request is a repeat
+    response: dict | None = None
+
+
+def _fingerprint(args) -> str:
+    data = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+async def claim(task_name: str, args) -> Claim | None:
+    """Claim the request's idempotency key for starting task_name(args).
+
+    None when there is no key (or no shared state): start the run as
+    usual. Otherwise a Claim; if its response is set, return that
+    instead of starting the run.
+    """
+    header = _current.get()
+    if header is None:
+        return None
+    result = Claim(f"idem:{task_name.rsplit('/', 1)[-1]}:{header}", _fingerprint(args))
+    pending = json.dumps({"args": result.fingerprint})
+    try:
+        state = get_state()
+        # A second try if the key expires between set and get
+        for _ in range(2):
+            if await state.set(result.key, pending, ttl=PENDING_TTL, only_if_absent=True):
+                record_cache("idempotency", False)
+                return result
+            value = await state.get(result.key)
+            if value is not None:
+                break
+    except STATE_ERRORS as e:
+        logger.warning(f"Idempotency key not checked, shared state failed: {e}")
+        return None
+    if value is None:
+        return None
+    entry = json.loads(value)
+    if entry["args"] != result.fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different input")
+    if "response" not in entry:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    record_cache("idempotency", True)
+    result.response = entry["response"]
+    return result
+
+
+async def complete(claimed: Claim | None, response: dict) -> None:
+    """Store the response to replay for the claimed key."""
+    if claimed is None:
+        return
+    value = json.dumps({"args": claimed.fingerprint, "response": response})
+    try:
+        await get_state().set(claimed.key, value, ttl=IDEMPOTENCY_TTL)
+    except STATE_ERRORS as e:
+        logger.warning(f"Idempotency key {claimed.key!r} not stored: {e}")
+
+
+async def release(claimed: Claim | None) -> None:
+    """Free the claimed key after the run failed to start."""
+    if claimed is None:
+        return
+    try:
+        await get_state().delete(claimed.key)
+    except STATE_ERRORS as e:
+        logger.warning(f"Idempotency key {claimed.key!r} not released: {e}")
+
+
+async def idempotency_keys(request: Request, call_next):
+    """HTTP middleware: make the request's Idempotency-Key available to claim()."""
+    header = request.headers.get(IDEMPOTENCY_HEADER)
+    if header is not None and not 0 < len(header) <= MAX_KEY_LENGTH:
+        logger.warning(f"Ignoring {IDEMPOTENCY_HEADER} header of length {len(header)}")
+        header = None
+    token = _current.set(header)
+    try:
+        return await call_next(request)
+    finally:
+        _current.reset(token)
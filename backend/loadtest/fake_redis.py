@@ -0,0 +1,187 @@
+"""
+Local stand-in for a Redis server.
+
+Speaks enough of the Redis protocol (RESP) for backend/shared_state.py:
+PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, INCR, INCRBY, PEXPIRE,
+PTTL, DBSIZE and FLUSHALL, with key expiry. Everything is in memory in
+one process, so several backend workers pointed at it share state the
+way they would with a real Redis.
+
+    python -m backend.loadtest.fake_redis --port 6390
+    SHARED_STATE=redis://127.0.0.1:6390 uvicorn backend.main:app --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values: dict[bytes, tuple[bytes, float | None]] = {}
+        self.calls: Counter = Counter()
+
+    def _live(self, key: bytes) -> tuple[bytes, float | None] | None:
+        entry = self.values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.values[key]
+            return None
+        return entry
+
+    def execute(self, args: list[bytes]):
+        """The reply to one command: bytes, int, None, str (status) or an Exception."""
+        if not args:
+            return ValueError("ERR empty command")
+        name = args[0].upper().decode()
+        self.calls[name] += 1
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return ValueError(f"ERR unknown command '{name}'")
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError, IndexError):
+            return ValueError(f"ERR wrong arguments for '{name}'")
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_auth(self, *args):
+        return "OK"
+
+    def cmd_select(self, db):
+        return "OK"
+
+    def cmd_get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def cmd_set(self, key, value, *options):
+        expires_at = None
+        nx = xx = False
+        opts = [o.upper() for o in options]
+        i = 0
+        while i < len(opts):
+            if opts[i] == b"EX":
+                expires_at = time.time() + int(options[i + 1])
+                i += 1
+            elif opts[i] == b"PX":
+                expires_at = time.time() + int(options[i + 1]) / 1000
+                i += 1
+            elif opts[i] == b"NX":
+                nx = True
+            elif opts[i] == b"XX":
+                xx = True
+            else:
+                raise ValueError(opts[i])
+            i += 1
+        exists = self._live(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.values[key] = (value, expires_at)
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self.values[key]
+                removed += 1
+        return removed
+
+    def cmd_incrby(self, key, amount):
+        entry = self._live(key)
+        try:
+            value = int(entry[0] if entry else 0) + int(amount)
+        except ValueError:
+            return ValueError("ERR value is not an integer or out of range")
+        self.values[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, b"1")
+
+    def cmd_pexpire(self, key, ms):
+        entry = self._live(key)
+        if entry is None:
+            return 0
+        self.values[key] = (entry[0], time.time() + int(ms) / 1000)
+        return 1
+
+    def cmd_pttl(self, key):
+        entry = self._live(key)
+        if entry is None:
+            return -2
+        return -1 if entry[1] is None else int((entry[1] - time.time()) * 1000)
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self.values) if self._live(key) is not None)
+
+    def cmd_flushall(self, *args):
+        self.values.clear()
+        return "OK"
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-" + str(reply).encode() + b"\r\n"
+    if isinstance(reply, str):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command (redis-cli / telnet)
+        return line.split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        size = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def serve(host: str, port: int, redis: FakeRedis | None = None) -> asyncio.AbstractServer:
+    redis = redis or FakeRedis()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (args := await _read_command(reader)) is not None:
+                writer.write(_encode(redis.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the fake Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        server = await serve(args.host, args.port)
+        logger.warning(f"Fake Redis listening on {args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
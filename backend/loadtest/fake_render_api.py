@@ -0,0 +1,258 @@
+"""
+Local stand-in for the Render Workflows API.
+
+Implements the endpoints the backend uses through render_sdk, with
+configurable latency, error rate and task duration, and counts every
+call so load tests can measure upstream call amplification.
+
+Point the backend at it with:
+    RENDER_USE_LOCAL_DEV=true RENDER_LOCAL_DEV_URL=http://127.0.0.1:8120
+
+Run standalone:
+    python -m backend.loadtest.fake_render_api --port 8120 --latency-ms 40 --error-rate 0.01
+
+Configuration (environment variables, also settable via the CLI):
+- FAKE_RENDER_LATENCY_MS:        median per-request latency (default 30)
+- FAKE_RENDER_ERROR_RATE:        fraction of requests answered with 503 (default 0)
+- FAKE_RENDER_TASK_DURATION_MS:  median time a task run takes to complete (default 2000)
+- FAKE_RENDER_RESULT_BYTES:      approximate size of each task result (default 200)
+- FAKE_RENDER_SUBTASKS:          subtask runs each started run spawns, listed under
+                                 its root by GET /v1/task-runs (default 0)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+WORKFLOW_ID = "wfl-loadtest"
+OWNER_ID = "tea-loadtest"
+
+
+@dataclass
+class FakeConfig:
+    """Behaviour of the fake API."""
+    latency_ms: float = 30.0
+    error_rate: float = 0.0
+    task_duration_ms: float = 2000.0
+    result_bytes: int = 200
+    subtasks: int = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeConfig":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_RENDER_LATENCY_MS", "30")),
+            error_rate=float(os.getenv("FAKE_RENDER_ERROR_RATE", "0")),
+            task_duration_ms=float(os.getenv("FAKE_RENDER_TASK_DURATION_MS", "2000")),
+            result_bytes=int(os.getenv("FAKE_RENDER_RESULT_BYTES", "200")),
+            subtasks=int(os.getenv("FAKE_RENDER_SUBTASKS", "0")),
+        )
+
+
+@dataclass
+class FakeTaskRun:
+    id: str
+    task: str
+    input: list | dict
+    created: float
+    completes_at: float
+    parent_id: str = ""
+    root_id: str = ""
+    canceled: bool = False
+
+    @property
+    def status(self) -> str:
+        if self.canceled:
+            return "canceled"
+        return "completed" if time.monotonic() >= self.completes_at else "running"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def create_app(config: FakeConfig | None = None) -> FastAPI:
+    """Build the fake API app."""
+    config = config or FakeConfig.from_env()
+    app = FastAPI(title="Fake Render API")
+    runs: dict[str, FakeTaskRun] = {}
+    calls: Counter = Counter()
+    padding = "x" * config.result_bytes
+
+    def _sample(median_ms: float) -> float:
+        # Log-normal keeps a realistic long tail around the median
+        return random.lognormvariate(0, 0.5) * median_ms / 1000 if median_ms > 0 else 0.0
+
+    def _run_json(run: FakeTaskRun, details: bool) -> dict:
+        started_at = _iso(time.time() - (time.monotonic() - run.created))
+        body = {
+            "id": run.id,
+            "taskId": f"tsk-{run.task}",
+            "status": run.status,
+            "parentTaskRunId": run.parent_id,
+            "rootTaskRunId": run.root_id or run.id,
+            "retries": 0,
+            "attempts": [{"status": run.status, "startedAt": started_at}],
+            "startedAt": started_at,
+        }
+        if run.status == "completed":
+            body["completedAt"] = _iso(time.time())
+        if details:
+            body["input"] = run.input
+            body["results"] = (
+                [{"task": run.task, "input": run.input, "padding": padding}]
+                if run.status == "completed" else []
+            )
+        return body
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next):
+        path = "/".join("{id}" if part.startswith("trn-") else part
+                        for part in request.url.path.split("/"))
+        calls[f"{request.method} {path}"] += 1
+        if request.url.path.startswith("/_"):
+            return await call_next(request)
+        await asyncio.sleep(_sample(config.latency_ms))
+        if random.random() < config.error_rate:
+            calls["errors"] += 1
+            return JSONResponse({"id": "unavailable", "message": "injected error"}, status_code=503)
+        return await call_next(request)
+
+    @app.post("/v1/task-runs")
+    async def create_task_run(request: Request):
+        body = await request.json()
+        now = time.monotonic()
+        run = FakeTaskRun(
+            id=f"trn-{uuid.uuid4().hex[:20]}",
+            task=body["task"].split("/")[-1],
+            input=body.get("input", []),
+            created=now,
+            completes_at=now + _sample(config.task_duration_ms),
+        )
+        runs[run.id] = run
+        # Subtasks finish before their root, like a fan-out would
+        for i in range(config.subtasks):
+            child = FakeTaskRun(
+                id=f"trn-{uuid.uuid4().hex[:20]}",
+                task=f"{run.task}_subtask",
+                input=[i],
+                created=now,
+                completes_at=now + random.uniform(0, run.completes_at - now),
+                parent_id=run.id,
+                root_id=run.id,
+            )
+            runs[child.id] = child
+        return JSONResponse(_run_json(run, details=False), status_code=202)
+
+    @app.get("/v1/task-runs")
+    async def list_task_runs(
+        root_task_run_id: list[str] = Query(default=[], alias="rootTaskRunId"),
+        cursor: str | None = None,
+        limit: int = 20,
+    ):
+        roots = {i for part in root_task_run_id for i in part.split(",")}
+        matching = [r for r in runs.values() if not roots or (r.root_id or r.id) in roots]
+        # Cursor is the last ID of the previous page
+        if cursor is not None:
+            ids = [r.id for r in matching]
+            matching = matching[ids.index(cursor) + 1:] if cursor in ids else []
+        return [_run_json(r, details=False) for r in matching[:limit]]
+
+    @app.get("/v1/task-runs/events")
+    async def task_run_events(task_run_ids: list[str] = Query(alias="taskRunIds")):
+        ids = [i for part in task_run_ids for i in part.split(",")]
+
+        async def stream():
+            for run_id in ids:
+                run = runs.get(run_id)
+                if run is None:
+                    continue
+                while run.status == "running":
+                    await asyncio.sleep(min(0.05, max(0.0, run.completes_at - time.monotonic())))
+                data = json.dumps(_run_json(run, details=True))
+                yield f"event: task.completed\ndata: {data}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/v1/task-runs/{task_run_id}")
+    async def get_task_run(task_run_id: str):
+        run = runs.get(task_run_id)
+        if run is None:
+            return JSONResponse({"id": "not_found", "message": "task run not found"}, status_code=404)
+        return _run_json(run, details=True)
+
+    @app.delete("/v1/task-runs/{task_run_id}")
+    async def cancel_task_run(task_run_id: str):
+        run = runs.get(task_run_id)
+        if run is None:
+            return JSONResponse({"id": "not_found", "message": "task run not found"}, status_code=404)
+        run.canceled = True
+        return Response(status_code=204)
+
+    @app.get("/v1/workflows")
+    async def list_workflows():
+        return [{
+            "cursor": "c1",
+            "workflow": {
+                "id": WORKFLOW_ID,
+                "name": "workflow-demo-test-web",
+                "slug": os.getenv("WORKFLOW_SERVICE_SLUG", "workflow-demo-test-web"),
+                "ownerId": OWNER_ID,
+                "createdAt": _iso(0),
+                "updatedAt": _iso(0),
+                "buildConfig": {"buildCommand": "", "repo": "", "runtime": "python"},
+                "runCommand": "render-workflows main:app",
+                "region": "oregon",
+            },
+        }]
+
+    @app.get("/v1/logs")
+    async def list_logs():
+        now = _iso(time.time())
+        return {"hasMore": False, "nextStartTime": now, "nextEndTime": now, "logs": []}
+
+    @app.get("/_stats")
+    async def stats():
+        return dict(calls)
+
+    @app.post("/_reset")
+    async def reset():
+        calls.clear()
+        return {"ok": True}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the fake Render API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8120)
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--task-duration-ms", type=float)
+    parser.add_argument("--result-bytes", type=int)
+    parser.add_argument("--subtasks", type=int)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig.from_env()
+    for name in ("latency_ms", "error_rate", "task_duration_ms", "result_bytes", "subtasks"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(config, name, value)
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Load test for the backend API against the fake Render API.
+
+Starts the fake Render API and the backend (uvicorn, optionally with
+several workers) as subprocesses, then drives submit-then-poll traffic
+modeled on the frontend's useTaskRunner hook: each virtual user POSTs a
+task, polls GET /api/task/{id} every POLL_INTERVAL until it is terminal,
+thinks for a moment and starts over.
+
+Reports per route: p50/p95/p99 latency, throughput and error rate, plus
+upstream call amplification (Render API calls per backend request).
+
+Usage:
+    python -m backend.loadtest.run --users 1000 --duration 60
+    python -m backend.loadtest.run --users 200 --latency-ms 80 --error-rate 0.02 --workers 4
+    python -m backend.loadtest.run --workers 4 --shared-state redis
+    python -m backend.loadtest.run --output loadtest.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+# Same cadence as frontend/src/hooks/useTaskRunner.ts
+POLL_INTERVAL = 1.0
+
+# (route, payload, weight) - the mix of buttons users press in the UI
+SCENARIOS = [
+    ("/api/basic/square", {"a": 5}, 20),
+    ("/api/basic/greet", {"name": "Alice"}, 10),
+    ("/api/subtasks/add_squares", {"a": 3, "b": 4}, 10),
+    ("/api/parallel/compute_multiple", {"numbers": [2, 3, 4]}, 10),
+    ("/api/parallel/deep_parallel_tree", {"numbers": list(range(1, 13)), "chunk_size": 4}, 20),
+    ("/api/openai/analyze_sentiment", {"text": "I love this product!"}, 10),
+    ("/api/advanced/parallel_sentiment", {"texts": ["Great!", "Terrible.", "Okay."]}, 20),
+]
+
+POLL_ROUTE = "GET /api/task/{id}"
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LoadTest:
+    """Virtual users submitting and polling tasks."""
+
+    def __init__(self, base_url: str, users: int, duration: float, ramp_up: float, think_time: float):
+        self.base_url = base_url
+        self.users = users
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        self.stats: dict[str, RouteStats] = defaultdict(RouteStats)
+        self.completed_tasks = 0
+
+    async def _request(self, client: httpx.AsyncClient, method: str, path: str, route: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        stats = self.stats[route]
+        stats.latencies.append(time.perf_counter() - started)
+        if not ok:
+            stats.errors += 1
+            return None
+        return response.json()
+
+    async def _user(self, client: httpx.AsyncClient, index: int, stop_at: float) -> None:
+        await asyncio.sleep(self.ramp_up * index / max(1, self.users))
+        paths = [s[0] for s in SCENARIOS]
+        weights = [s[2] for s in SCENARIOS]
+        payloads = {s[0]: s[1] for s in SCENARIOS}
+        while time.monotonic() < stop_at:
+            path = random.choices(paths, weights)[0]
+            data = await self._request(client, "POST", path, f"POST {path}", json=payloads[path])
+            if data and data.get("status") not in ("completed", "failed"):
+                while time.monotonic() < stop_at:
+                    await asyncio.sleep(POLL_INTERVAL)
+                    polled = await self._request(
+                        client, "GET", f"/api/task/{data['task_run_id']}", POLL_ROUTE
+                    )
+                    if polled is None:
+                        break
+                    if polled.get("status") in ("completed", "failed", "canceled"):
+                        self.completed_tasks += 1
+                        break
+            await asyncio.sleep(random.uniform(0, self.think_time))
+
+    async def run(self) -> float:
+        limits = httpx.Limits(max_connections=self.users, max_keepalive_connections=self.users)
+        timeout = httpx.Timeout(120.0)
+        started = time.monotonic()
+        stop_at = started + self.duration
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout) as client:
+            await asyncio.gather(*(self._user(client, i, stop_at) for i in range(self.users)))
+        return time.monotonic() - started
+
+
+def build_report(test: LoadTest, elapsed: float, upstream: dict) -> dict:
+    routes = {}
+    for route, stats in sorted(test.stats.items()):
+        routes[route] = {
+            "requests": stats.requests,
+            "throughput_rps": stats.requests / elapsed,
+            "error_rate": stats.errors / stats.requests if stats.requests else 0.0,
+            "p50_ms": _percentile(stats.latencies, 50) * 1000,
+            "p95_ms": _percentile(stats.latencies, 95) * 1000,
+            "p99_ms": _percentile(stats.latencies, 99) * 1000,
+            "mean_ms": statistics.fmean(stats.latencies) * 1000 if stats.latencies else 0.0,
+        }
+    backend_requests = sum(s.requests for s in test.stats.values())
+    upstream_calls = sum(v for k, v in upstream.items() if k != "errors" and not k.split(" ")[1].startswith("/_"))
+    return {
+        "users": test.users,
+        "duration_s": elapsed,
+        "backend_requests": backend_requests,
+        "completed_tasks": test.completed_tasks,
+        "upstream_calls": upstream_calls,
+        "upstream_errors_injected": upstream.get("errors", 0),
+        "amplification": upstream_calls / backend_requests if backend_requests else 0.0,
+        "upstream_by_endpoint": upstream,
+        "routes": routes,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['users']} users, {report['duration_s']:.1f}s, "
+          f"{report['backend_requests']} requests, {report['completed_tasks']} tasks completed")
+    print(f"{'route':<45} {'reqs':>7} {'rps':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, r in report["routes"].items():
+        print(
+            f"{route:<45} {r['requests']:>7} {r['throughput_rps']:>7.1f} "
+            f"{r['error_rate']*100:>5.1f}% {r['p50_ms']:>7.0f}ms {r['p95_ms']:>7.0f}ms {r['p99_ms']:>7.0f}ms"
+        )
+    print(f"\nUpstream Render API calls: {report['upstream_calls']} "
+          f"({report['amplification']:.2f} per backend request)")
+    for endpoint, count in sorted(report["upstream_by_endpoint"].items()):
+        print(f"  {endpoint:<40} {count}")
+
+
+async def main_async(args) -> dict:
+    fake_port, backend_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    fake_cmd = [
+        sys.executable, "-m", "backend.loadtest.fake_render_api", "--port", str(fake_port),
+        "--latency-ms", str(args.latency_ms), "--error-rate", str(args.error_rate),
+        "--task-duration-ms", str(args.task_duration_ms),
+    ]
+    backend_cmd = [
+        sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(backend_port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    env = {
+        **os.environ,
+        "RENDER_API_KEY": os.getenv("RENDER_API_KEY", "rnd_loadtest"),
+        "RENDER_USE_LOCAL_DEV": "true",
+        "RENDER_LOCAL_DEV_URL": fake_url,
+    }
+
+    procs = [subprocess.Popen(fake_cmd, cwd=repo_root, env=env)]
+    if args.shared_state == "redis":
+        redis_port = _free_port()
+        redis_cmd = [sys.executable, "-m", "backend.loadtest.fake_redis", "--port", str(redis_port)]
+        procs.append(subprocess.Popen(redis_cmd, cwd=repo_root, env=env))
+        env["SHARED_STATE"] = f"redis://127.0.0.1:{redis_port}"
+    elif args.shared_state == "sqlite":
+        env["SHARED_STATE"] = f"sqlite:{tempfile.mkdtemp(prefix='loadtest-')}/shared-state.sqlite3"
+    elif args.shared_state == "memory":
+        env["SHARED_STATE"] = "memory"
+    procs.append(subprocess.Popen(backend_cmd, cwd=repo_root, env=env))
+    try:
+        await _wait_ready(f"{fake_url}/_stats")
+        await _wait_ready(f"{backend_url}/health")
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{fake_url}/_reset")
+
+        test = LoadTest(backend_url, args.users, args.duration, args.ramp_up, args.think_time)
+        elapsed = await test.run()
+
+        async with httpx.AsyncClient() as client:
+            upstream = (await client.get(f"{fake_url}/_stats")).json()
+        return build_report(test, elapsed, upstream)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the backend against a fake Render API")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds to start all users")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Max pause between tasks")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    parser.add_argument("--shared-state", choices=["memory", "sqlite", "redis"],
+                        help="SHARED_STATE backend for the workers (redis starts fake_redis)")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Fake Render API median latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake Render API error rate")
+    parser.add_argument("--task-duration-ms", type=float, default=2000.0)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
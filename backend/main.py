@@ -4,25 +4,55 @@ FastAPI backend for triggering Render workflows.
 This API provides endpoints to execute workflow tasks and retrieve results.
 """
 
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from starlette.exceptions import HTTPException as StarletteHTTPException
-from dotenv import load_dotenv
-
-from .models import TaskResponse
-from .routes import basic, subtasks, parallel, openai, advanced
-from .routes.utils import get_task_status
+import time
+from contextlib import asynccontextmanager
+
+# Logged when IMPORT_PROFILE is set. The backend starts once per deploy,
+# so it only reports the total; `python -X importtime -c "import
+# backend.main"` breaks it down (workflows/startup_profile.py profiles
+# the worker, whose imports are paid on every run).
+_import_started = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.exceptions import HTTPException as StarletteHTTPException  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from .models import CancelResponse, TaskListResponse, TaskResponse  # noqa: E402
+from .routes import basic, subtasks, parallel, openai, advanced, datasets  # noqa: E402
+from .compression import compress_responses  # noqa: E402
+from .deadline import deadline_requests  # noqa: E402
+from .history import MAX_LIST_LIMIT, get_history  # noqa: E402
+from .idempotency import idempotency_keys  # noqa: E402
+from .metrics import metrics_response, track_requests  # noqa: E402
+from .rate_limit import rate_limit  # noqa: E402
+from .results import MAX_PAGE_SIZE  # noqa: E402
+from .routes.utils import cancel_task_tree, get_task_status, preload_render_sdk  # noqa: E402
+from .tracing import shutdown_export, trace_requests  # noqa: E402
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Routes import render_sdk on first use. Load it in the background so
+    # the server starts accepting requests (and health checks) first.
+    app.state.preload = asyncio.create_task(asyncio.to_thread(preload_render_sdk))
+    yield
+    await shutdown_export()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Render SDK Examples API",
     description="API for triggering Render workflow tasks",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Define allowed origins - include both staging and production URLs
@@ -50,7 +80,7 @@ def get_cors_headers(request: Request) -> dict:
             "Access-Control-Allow-Origin": origin,
             "Access-Control-Allow-Credentials": "true",
             "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With, X-Deadline-Ms, Idempotency-Key",
         }
     return {}
 
@@ -59,7 +89,7 @@ def get_cors_headers(request: Request) -> dict:
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions with CORS headers."""
-    headers = get_cors_headers(request)
+    headers = {**(exc.headers or {}), **get_cors_headers(request)}
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
@@ -87,17 +117,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(basic.router, prefix="/api/basic", tags=["Basic Tasks"])
-app.include_router(subtasks.router, prefix="/api/subtasks", tags=["Subtasks"])
-app.include_router(parallel.router, prefix="/api/parallel", tags=["Parallel"])
-app.include_router(openai.router, prefix="/api/openai", tags=["OpenAI"])
-app.include_router(advanced.router, prefix="/api/advanced", tags=["Advanced"])
+# Response compression, idempotency keys, request deadlines
+# (X-Deadline-Ms), per-route metrics, and a trace span for every request
+# (W3C traceparent). Added last so they wrap CORS too; the trace span is
+# outermost.
+app.middleware("http")(compress_responses)
+app.middleware("http")(idempotency_keys)
+app.middleware("http")(deadline_requests)
+app.middleware("http")(track_requests)
+app.middleware("http")(trace_requests)
+
+# Include routers; starting tasks and uploading datasets count against
+# the rate limit (RATE_LIMIT_PER_MINUTE)
+limited = [Depends(rate_limit)]
+app.include_router(basic.router, prefix="/api/basic", tags=["Basic Tasks"], dependencies=limited)
+app.include_router(subtasks.router, prefix="/api/subtasks", tags=["Subtasks"], dependencies=limited)
+app.include_router(parallel.router, prefix="/api/parallel", tags=["Parallel"], dependencies=limited)
+app.include_router(openai.router, prefix="/api/openai", tags=["OpenAI"], dependencies=limited)
+app.include_router(advanced.router, prefix="/api/advanced", tags=["Advanced"], dependencies=limited)
+app.include_router(datasets.router, prefix="/api/datasets", tags=["Datasets"], dependencies=limited)
 
 @app.get("/api/task/{task_run_id}", response_model=TaskResponse)
-async def poll_task(task_run_id: str):
-    """Poll a task run's current status and result."""
-    return await get_task_status(task_run_id)
+async def poll_task(
+    task_run_id: str,
+    progress: bool = False,
+    fields: str | None = None,
+    items: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Poll a task run's current status and result.
+
+    Pass `?progress=true` to include partial output from streaming tasks.
+    For large results, `?fields=summary,total` returns only those keys and
+    `?items=results&limit=100` one page of a list; follow
+    `page.next_cursor` with `&cursor=` for the next one.
+    """
+    return await get_task_status(
+        task_run_id,
+        include_progress=progress,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        items=items,
+        cursor=cursor,
+        limit=limit,
+    )
+
+@app.get("/api/tasks", response_model=TaskListResponse)
+async def list_tasks(
+    task: str | None = None,
+    status: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    limit: int = Query(50, ge=1, le=MAX_LIST_LIMIT),
+    cursor: str | None = None,
+):
+    """List task runs this backend started, newest first, from its task history.
+
+    Filter by `task` name, `status` (comma-separated) and submission time
+    (`since`/`until`, unix seconds). Pass `next_cursor` back as `cursor`
+    for the next page. No Render API calls are made.
+    """
+    history = get_history()
+    if history is None:
+        raise HTTPException(status_code=404, detail="Task history is off (TASK_HISTORY_DB=off)")
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+    try:
+        runs, next_cursor = await asyncio.to_thread(
+            history.list_runs, task, statuses, since, until, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskListResponse(runs=runs, next_cursor=next_cursor)
+
+@app.delete("/api/task/{task_run_id}", response_model=CancelResponse)
+async def cancel_task(task_run_id: str):
+    """Cancel a task run and every subtask run it started.
+
+    Reports how many runs were cancelled and what state they were in.
+    """
+    return await cancel_task_tree(task_run_id)
 
 @app.get("/")
 async def root():
@@ -108,6 +206,11 @@ async def root():
         "version": "0.1.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (text exposition format)."""
+    return metrics_response()
+
 @app.get("/health")
 async def health():
     """Detailed health check."""
@@ -117,3 +220,9 @@ async def health():
         "render_api_key_configured": bool(api_key),
         "openai_configured": bool(os.getenv("OPENAI_API_KEY"))
     }
+
+# uvicorn configures its own logger before it imports the app
+if os.getenv("IMPORT_PROFILE"):
+    logging.getLogger("uvicorn.error").info(
+        f"startup: {(time.perf_counter() - _import_started) * 1000:.1f} ms importing the app"
+    )
@@ -0,0 +1,264 @@
+"""
+Prometheus metrics for the backend, served at GET /metrics.
+
+- http_request_duration_seconds{method,route,status}   route latency histogram
+- http_requests_in_flight                              requests being handled
+- render_api_request_duration_seconds{operation}       upstream Render API latency
+- render_api_errors_total{operation}                   upstream failures
+- backend_cache_requests_total{cache,result}           cache hits and misses
+- workflow_tasks_submitted_total{task}                 task runs started
+- workflow_tasks_in_flight                             submitted, not yet seen finished
+- workflow_tasks_cancelled_total{state}               task runs cancelled, by the state
+                                                      they were in (running or pending)
+- backend_datasets_uploaded_total{format}             datasets streamed to the payload store
+- backend_dataset_upload_bytes_total{format}          request bytes of those uploads
+
+Counters are plain numbers behind a per-metric lock, cheap enough for
+every request. The primitives mirror workflows/metrics.py; the two
+services deploy separately and do not share code.
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+
+from .tracing import route_template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Bound on task runs tracked for the in-flight gauge (runs nobody polls
+# to completion would otherwise accumulate)
+MAX_TRACKED_TASKS = 10_000
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, label_values: tuple) -> tuple:
+        if len(label_values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in label_values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.label_names, key)), value) for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value: float) -> None:
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        key = self._key(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Backend request latency", ("method", "route", "status")
+))
+requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled"
+))
+upstream_duration = REGISTRY.register(Histogram(
+    "render_api_request_duration_seconds", "Render API call latency", ("operation",)
+))
+upstream_errors = REGISTRY.register(Counter(
+    "render_api_errors_total", "Failed Render API calls", ("operation",)
+))
+cache_requests = REGISTRY.register(Counter(
+    "backend_cache_requests_total", "Cache lookups by result", ("cache", "result")
+))
+tasks_submitted = REGISTRY.register(Counter(
+    "workflow_tasks_submitted_total", "Task runs started through the backend", ("task",)
+))
+tasks_in_flight = REGISTRY.register(Gauge(
+    "workflow_tasks_in_flight", "Task runs started and not yet seen in a terminal state"
+))
+
+tasks_cancelled = REGISTRY.register(Counter(
+    "workflow_tasks_cancelled_total", "Task runs cancelled through the backend", ("state",)
+))
+
+datasets_uploaded = REGISTRY.register(Counter(
+    "backend_datasets_uploaded_total", "Datasets streamed to the payload store", ("format",)
+))
+
+dataset_upload_bytes = REGISTRY.register(Counter(
+    "backend_dataset_upload_bytes_total", "Request bytes of dataset uploads", ("format",)
+))
+
+plan_decisions = REGISTRY.register(Counter(
+    "backend_plan_decisions_total", "Plan and priority chosen for task runs", ("task", "plan", "priority")
+))
+
+requests_rate_limited = REGISTRY.register(Counter(
+    "backend_requests_rate_limited_total", "Requests refused by the rate limit"
+))
+
+_tracked_tasks: OrderedDict[str, None] = OrderedDict()
+_tracked_lock = threading.Lock()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+def plan_chosen(task: str, plan: str, priority: str) -> None:
+    plan_decisions.inc(task, plan, priority)
+
+
+def request_rate_limited() -> None:
+    requests_rate_limited.inc()
+
+
+def task_started(task_name: str, task_run_id: str) -> None:
+    tasks_submitted.inc(task_name.rsplit("/", 1)[-1])
+    with _tracked_lock:
+        _tracked_tasks[task_run_id] = None
+        if len(_tracked_tasks) > MAX_TRACKED_TASKS:
+            _tracked_tasks.popitem(last=False)
+        tasks_in_flight.set(value=len(_tracked_tasks))
+
+
+def task_finished(task_run_id: str) -> None:
+    with _tracked_lock:
+        if _tracked_tasks.pop(task_run_id, 0) is None:
+            tasks_in_flight.set(value=len(_tracked_tasks))
+
+
+def task_cancelled(state: str) -> None:
+    tasks_cancelled.inc(state)
+
+
+def dataset_uploaded(fmt: str, size: int) -> None:
+    datasets_uploaded.inc(fmt)
+    dataset_upload_bytes.inc(fmt, amount=size)
+
+
+@asynccontextmanager
+async def observe_upstream(operation: str):
+    """Time a Render API call and count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(operation)
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, operation)
+
+
+async def track_requests(request: Request, call_next):
+    """HTTP middleware: latency histogram and in-flight gauge per route."""
+    requests_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        requests_in_flight.dec()
+        # Unmatched paths (scanners, typos) would otherwise each get a series
+        route = route_template(request) if request.scope.get("route") else "unmatched"
+        request_duration.observe(time.perf_counter() - started, request.method, route, status)
+
+
+def metrics_response() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -12,6 +12,66 @@ class TaskResponse(BaseModel):
     status: str = Field(..., description="Current task status")
     message: str = Field(..., description="Human-readable message")
     result: Optional[Any] = Field(None, description="Task result if completed")
+    progress: Optional[dict] = Field(None, description="Latest partial output from a streaming task")
+    trace_id: Optional[str] = Field(None, description="W3C trace ID of the request that started the task")
+    page: Optional[dict] = Field(None, description="Pagination of a list in the result: items, offset, count, total, next_cursor")
+    plan: Optional[str] = Field(None, description="Compute plan chosen for the run")
+    priority: Optional[str] = Field(None, description="Priority class chosen for the run: interactive or batch")
+
+class CancelResponse(BaseModel):
+    """Result of cancelling a task run and its subtasks."""
+    task_run_id: str = Field(..., description="Root task run that was cancelled")
+    status: str = Field(..., description="Root task run status after the request")
+    message: str = Field(..., description="Human-readable message")
+    cancelled: int = Field(0, description="Task runs cancelled, root included")
+    freed: dict[str, int] = Field(default_factory=dict, description="Cancelled runs by the state they were in")
+    failed: int = Field(0, description="Runs that finished before they could be cancelled")
+
+class DatasetInfo(BaseModel):
+    """A dataset stored in the payload store."""
+    dataset: str = Field(..., description="Dataset id (hash of its content)")
+    format: str = Field(..., description="json, or the packed dtype (int64, int32, float64)")
+    count: int = Field(..., description="Number of values")
+    bytes: int = Field(..., description="Stored size in bytes")
+    types: Optional[list[str]] = Field(None, description="JSON types of the values (json format only)")
+
+class TaskRunRecord(BaseModel):
+    """A task run in the backend's task history."""
+    id: str = Field(..., description="Task run identifier")
+    task: str = Field(..., description="Task name, without the service slug")
+    status: str = Field(..., description="Last status the backend saw")
+    submitted_at: float = Field(..., description="Unix time the backend started the run")
+    finished_at: Optional[float] = Field(None, description="Unix time the backend saw it finish")
+    message: Optional[str] = Field(None, description="Final message (error for failed runs)")
+    trace_id: Optional[str] = Field(None, description="W3C trace ID of the request that started it")
+    result_bytes: Optional[int] = Field(None, description="Size of the completed result's JSON")
+    plan: Optional[str] = Field(None, description="Compute plan chosen at submission")
+    priority: Optional[str] = Field(None, description="Priority class chosen at submission")
+    input_size: Optional[int] = Field(None, description="Input size the plan was chosen from")
+
+class TaskListResponse(BaseModel):
+    """A page of the task history, newest first."""
+    runs: list[TaskRunRecord] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= for the next page")
+
+class ExplainLevel(BaseModel):
+    """Simulated task runs of one level of a task graph."""
+    level: str = Field(..., description="Level and task, e.g. 'L3 tree_square'")
+    tasks: int = Field(..., description="Task runs at this level")
+    payload_bytes: int = Field(..., description="Estimated JSON bytes of their arguments and results")
+
+class ExplainResponse(BaseModel):
+    """Dry-run simulation of a task's graph; nothing is started."""
+    task: str = Field(..., description="Task that would be started")
+    total_tasks: int = Field(..., description="Task runs the run would start, root included")
+    levels: list[ExplainLevel] = Field(default_factory=list)
+    critical_path: list[str] = Field(default_factory=list, description="Chain of task runs the wall time depends on")
+    critical_path_depth: int = Field(..., description="Length of the critical path")
+    predicted_wall_ms: float = Field(..., description="Sum of task latencies along the critical path")
+    payload_bytes: int = Field(..., description="Estimated JSON bytes passed between all task runs")
+    peak_parallel_tasks: int = Field(..., description="Most task runs in flight at once")
+    latencies: dict[str, dict] = Field(default_factory=dict, description="Latency used per task, and its source")
+    notes: list[str] = Field(default_factory=list)
 
 class ErrorResponse(BaseModel):
     """Error response."""
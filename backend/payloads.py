@@ -0,0 +1,266 @@
+"""
+Payload store for large task inputs.
+
+deep_parallel_tree and parallel_sentiment_analysis take their whole input
+list as a task argument: the backend parses the JSON body into a list and
+forwards it inline, so input size is capped by request and task argument
+limits and every value passes through memory as Python objects. Uploads
+(POST /api/datasets, or the /upload variants of those two endpoints)
+instead stream the body to disk as it arrives. The task is started with a
+handle in place of the list,
+
+    {"dataset": "<id>", "start": 0, "stop": 100000}
+
+and tasks read the slices they need (see workflows/datasets.py).
+
+Upload bodies:
+- application/x-ndjson: one JSON value per line; a line holding an array
+  adds each of its items, so clients can send batches
+- application/octet-stream: a packed little-endian array, ?dtype=int64
+  (default), int32 or float64
+
+A dataset is a directory PAYLOAD_DIR/<id>/:
+- meta.json   {"format": "json" | "int64" | "int32" | "float64", "count": n, ...}
+- data.bin    the packed array, or one compact JSON value per line
+- index.bin   json only: count + 1 little-endian uint64 line offsets
+
+The id is a hash of the format and the stored data, so the same upload is
+stored once and checkpoint keys built from handles stay stable.
+PAYLOAD_DIR defaults to <tmp>/workflow-payloads; the workflow worker must
+see the same directory (same machine or a shared mount).
+"""
+
+import array
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from fastapi import HTTPException, Request
+
+from .metrics import dataset_uploaded
+
+logger = logging.getLogger(__name__)
+
+# Must match workflows/datasets.py
+DATASET_KEY = "dataset"
+JSON_FORMAT = "json"
+# Packed formats and their array typecodes
+PACKED_FORMATS = {"int64": "q", "int32": "i", "float64": "d"}
+INT_FORMATS = ("int64", "int32")
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+BINARY_TYPE = "application/octet-stream"
+
+
+def payload_dir() -> str:
+    return os.getenv("PAYLOAD_DIR") or os.path.join(tempfile.gettempdir(), "workflow-payloads")
+
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("PAYLOAD_MAX_BYTES", str(1 << 30)))
+
+
+def _json_type(value) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "null" if value is None else "object"
+
+
+def _little_endian(values: array.array) -> bytes:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class DatasetWriter:
+    """Writes one upload into a temporary directory, then publishes it under its hash."""
+
+    def __init__(self, root: str, fmt: str):
+        if fmt != JSON_FORMAT and fmt not in PACKED_FORMATS:
+            raise ValueError(f"Unknown dtype {fmt!r}; use one of {', '.join(PACKED_FORMATS)}")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.format = fmt
+        self.count = 0
+        self.types: set[str] = set()
+        self._tmp = tempfile.mkdtemp(dir=root, prefix=".upload-")
+        self._data = open(os.path.join(self._tmp, "data.bin"), "wb")
+        self._index = open(os.path.join(self._tmp, "index.bin"), "wb") if fmt == JSON_FORMAT else None
+        self._offset = 0
+        self._lines = 0
+        self._pending = b""
+        self._hash = hashlib.sha256(fmt.encode() + b"\0")
+        if self._index is not None:
+            self._index.write(_little_endian(array.array("Q", [0])))
+
+    def feed(self, chunk: bytes) -> None:
+        """Append the next piece of the body; may end mid-line or mid-value."""
+        buf = self._pending + chunk
+        if self._index is None:
+            itemsize = array.array(PACKED_FORMATS[self.format]).itemsize
+            whole = len(buf) - len(buf) % itemsize
+            self._pending = buf[whole:]
+            self._write(buf[:whole])
+            self.count += whole // itemsize
+            return
+        lines = buf.split(b"\n")
+        self._pending = lines.pop()
+        self._add_lines(lines)
+
+    def _add_lines(self, lines: list[bytes]) -> None:
+        out = []
+        offsets = array.array("Q")
+        for line in lines:
+            self._lines += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON on line {self._lines}: {e}") from None
+            for item in value if isinstance(value, list) else [value]:
+                encoded = json.dumps(item, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+                self.types.add(_json_type(item))
+                out.append(encoded)
+                self._offset += len(encoded)
+                offsets.append(self._offset)
+        if out:
+            self._write(b"".join(out))
+            self._index.write(_little_endian(offsets))
+            self.count += len(offsets)
+
+    def _write(self, data: bytes) -> None:
+        self._data.write(data)
+        self._hash.update(data)
+
+    def close(self) -> dict:
+        """Finish the upload and return its metadata (with "dataset", its id)."""
+        if self._index is not None:
+            self._add_lines([self._pending])
+        elif self._pending:
+            raise ValueError(f"Body ends with a partial {self.format} value ({len(self._pending)} bytes)")
+        self._pending = b""
+        self._data.close()
+        if self._index is not None:
+            self._index.close()
+        meta = {"format": self.format, "count": self.count, "bytes": os.path.getsize(self._data.name)}
+        if self._index is not None:
+            meta["types"] = sorted(self.types)
+        with open(os.path.join(self._tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        dataset_id = self._hash.hexdigest()[:32]
+        final = os.path.join(self.root, dataset_id)
+        try:
+            os.rename(self._tmp, final)
+        except OSError:
+            # Already stored (same content uploaded before)
+            if not os.path.isdir(final):
+                raise
+            shutil.rmtree(self._tmp, ignore_errors=True)
+        return {DATASET_KEY: dataset_id, **meta}
+
+    def abort(self) -> None:
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def _format_for(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == BINARY_TYPE:
+        return request.query_params.get("dtype", "int64")
+    if content_type and content_type not in NDJSON_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Upload as {NDJSON_TYPES[0]} or {BINARY_TYPE}, not {content_type}",
+        )
+    return JSON_FORMAT
+
+
+async def receive_dataset(request: Request) -> dict:
+    """Stream the request body into the payload store; returns the dataset's metadata."""
+    fmt = _format_for(request)
+    limit = max_upload_bytes()
+    try:
+        writer = await asyncio.to_thread(DatasetWriter, payload_dir(), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    received = 0
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            received += len(chunk)
+            if received > limit:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds PAYLOAD_MAX_BYTES ({limit})")
+            # Parsing and writing stay off the event loop
+            await asyncio.to_thread(writer.feed, chunk)
+        meta = await asyncio.to_thread(writer.close)
+    except ValueError as e:
+        writer.abort()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        writer.abort()
+        raise
+    dataset_uploaded(fmt, received)
+    logger.info(f"Stored dataset {meta[DATASET_KEY]}: {meta['count']} {fmt} values from {received} bytes")
+    return meta
+
+
+def _dataset_path(dataset_id: str) -> str:
+    if not dataset_id.isalnum():
+        raise HTTPException(status_code=400, detail=f"Invalid dataset id {dataset_id!r}")
+    return os.path.join(payload_dir(), dataset_id)
+
+
+def dataset_info(dataset_id: str) -> dict:
+    """Metadata of a stored dataset; 404 if there is none."""
+    try:
+        with open(os.path.join(_dataset_path(dataset_id), "meta.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} not found")
+    return {DATASET_KEY: dataset_id, **meta}
+
+
+def delete_dataset(dataset_id: str) -> bool:
+    path = _dataset_path(dataset_id)
+    if not os.path.isdir(path):
+        return False
+    shutil.rmtree(path)
+    return True
+
+
+def task_handle(meta: dict, expect: type) -> dict:
+    """
+    The handle a task receives for a stored dataset, after checking its
+    values are what the task takes (int or str).
+    """
+    if expect is int:
+        ok = meta["format"] in INT_FORMATS or (
+            meta["format"] == JSON_FORMAT and set(meta.get("types", [])) <= {"int"}
+        )
+    else:
+        ok = meta["format"] == JSON_FORMAT and set(meta.get("types", [])) <= {"str"}
+    if not ok:
+        found = ", ".join(meta.get("types") or [meta["format"]])
+        raise HTTPException(
+            status_code=400,
+            detail=f"Dataset {meta[DATASET_KEY]} holds {found} values; this task takes {expect.__name__}",
+        )
+    return {DATASET_KEY: meta[DATASET_KEY], "start": 0, "stop": meta["count"]}
@@ -0,0 +1,181 @@
+"""
+Compute plan and priority for each task run, chosen at submission.
+
+Render fixes a task's instance plan when the task is registered, and all
+tasks used to run on "standard": a `square` call got the same instance
+as a deep_parallel_tree over 100k numbers. The heavy task families are
+now also registered on a larger plan (`<task>__pro`, see `plans=` in
+workflows/app.py), and the backend decides per run from the task family
+and the size of its input. A variant starts its subtasks' variants on
+the same plan: deep_parallel_tree__pro runs the phases that hold all the
+numbers (scatter, cross-reduce, layered sum, finalize) on "pro" too. The
+OpenAI families upsize only their orchestrator, which splits and joins
+the texts; their leaves wait on OpenAI whatever their plan.
+
+- interactive: every task without a profile below, and small inputs of
+  the heavy families. Runs on the default plan; submitted immediately.
+- batch: inputs of a heavy family at or over its threshold. Starts the
+  HEAVY_PLAN variant. At most BATCH_SUBMIT_CONCURRENCY batch submissions
+  (whose inputs can be megabytes) are sent to Render at once, so a burst
+  of them does not hold up interactive ones.
+
+Every decision is logged ("[Plan] ..."), counted in
+backend_plan_decisions_total and stored with the run in the task history
+(plan, priority, input_size), so thresholds can be tuned against how
+long runs actually took (GET /api/tasks).
+
+Configuration (environment variables):
+- PLAN_THRESHOLD_<TASK>: input size at which a task counts as batch,
+  e.g. PLAN_THRESHOLD_DEEP_PARALLEL_TREE=50000
+- PLAN_<TASK>: run every call of a task on this plan, e.g.
+  PLAN_PARALLEL_SENTIMENT_ANALYSIS=pro (the default plan or HEAVY_PLAN)
+- BATCH_SUBMIT_CONCURRENCY: concurrent batch submissions (default 4)
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from .metrics import plan_chosen
+from .payloads import DATASET_KEY
+
+logger = logging.getLogger(__name__)
+
+# Must match DEFAULT_PLAN, PLAN_VARIANT_SEPARATOR and the plans= of the
+# heavy tasks in workflows/
+DEFAULT_PLAN = "standard"
+HEAVY_PLAN = "pro"
+PLAN_VARIANT_SEPARATOR = "__"
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+def _items(value) -> int:
+    """Length of a list or string input, or of a dataset handle's slice."""
+    if isinstance(value, dict) and DATASET_KEY in value:
+        return value.get("stop", 0) - value.get("start", 0)
+    if isinstance(value, (list, str)):
+        return len(value)
+    return 0
+
+
+@dataclass
+class PlanProfile:
+    """How a heavy task family's input size is measured, and where batch starts."""
+    unit: str
+    threshold: int
+    size: Callable[[list], int]
+
+
+PLAN_PROFILES = {
+    "deep_parallel_tree": PlanProfile("numbers", 10_000, lambda args: _items(args[0])),
+    "parallel_sentiment_analysis": PlanProfile("texts", 256, lambda args: _items(args[0])),
+    "process_document_pipeline": PlanProfile("chars", 20_000, lambda args: _items(args[0])),
+    "process_document_pipeline_streaming": PlanProfile("chars", 20_000, lambda args: _items(args[0])),
+    "multi_language_summary": PlanProfile(
+        "chars x languages", 20_000, lambda args: _items(args[0]) * max(_items(args[1]), 1)
+    ),
+}
+
+
+@dataclass
+class PlanDecision:
+    """The plan and priority chosen for one run, and why."""
+    task: str
+    # The task (or plan variant) to start, with the workflow slug
+    task_name: str
+    plan: str
+    priority: str
+    input_size: int | None
+    reason: str
+
+
+def _threshold(task: str, profile: PlanProfile) -> int:
+    value = os.getenv(f"PLAN_THRESHOLD_{task.upper()}")
+    if value:
+        try:
+            return int(value)
+        except ValueError:
+            logger.warning(f"Ignoring malformed PLAN_THRESHOLD_{task.upper()}: {value!r}")
+    return profile.threshold
+
+
+def _pinned_plan(task: str, profile: PlanProfile | None) -> str | None:
+    plan = os.getenv(f"PLAN_{task.upper()}")
+    if not plan:
+        return None
+    if plan != DEFAULT_PLAN and (profile is None or plan != HEAVY_PLAN):
+        logger.warning(f"Ignoring PLAN_{task.upper()}={plan!r}: no {task} variant on that plan")
+        return None
+    return plan
+
+
+def choose_plan(task_name: str, args: list | dict) -> PlanDecision:
+    """Pick the plan and priority for starting task_name(args)."""
+    slug, _, task = task_name.rpartition("/")
+    profile = PLAN_PROFILES.get(task)
+    size = None
+    if profile is not None:
+        try:
+            size = profile.size(args)
+        except (IndexError, KeyError, TypeError):
+            size = None
+
+    pinned = _pinned_plan(task, profile)
+    if profile is None or size is None:
+        plan, priority = pinned or DEFAULT_PLAN, INTERACTIVE
+        reason = "env override" if pinned else "interactive task"
+    else:
+        threshold = _threshold(task, profile)
+        heavy = size >= threshold
+        priority = BATCH if heavy else INTERACTIVE
+        if pinned:
+            plan, reason = pinned, "env override"
+        else:
+            plan = HEAVY_PLAN if heavy else DEFAULT_PLAN
+            reason = f"{size} {profile.unit} {'>=' if heavy else '<'} {threshold}"
+
+    name = task if plan == DEFAULT_PLAN else f"{task}{PLAN_VARIANT_SEPARATOR}{plan}"
+    decision = PlanDecision(
+        task=task,
+        task_name=f"{slug}/{name}" if slug else name,
+        plan=plan,
+        priority=priority,
+        input_size=size,
+        reason=reason,
+    )
+    logger.info(
+        f"[Plan] {task}: {decision.plan}/{decision.priority} ({decision.reason}, "
+        f"input_size={decision.input_size})"
+    )
+    plan_chosen(task, decision.plan, decision.priority)
+    return decision
+
+
+_batch_slots: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+def _batch_concurrency() -> int:
+    try:
+        return max(int(os.getenv("BATCH_SUBMIT_CONCURRENCY", "4")), 1)
+    except ValueError:
+        return 4
+
+
+@asynccontextmanager
+async def submission_slot(decision: PlanDecision):
+    """Hold one of the BATCH_SUBMIT_CONCURRENCY slots while a batch run is submitted."""
+    if decision.priority != BATCH:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    slots = _batch_slots.get(loop)
+    if slots is None:
+        _batch_slots.clear()
+        slots = _batch_slots[loop] = asyncio.Semaphore(_batch_concurrency())
+    async with slots:
+        yield
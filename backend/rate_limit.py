@@ -0,0 +1,75 @@
+"""
+Per-client rate limit on task submissions.
+
+RATE_LIMIT_PER_MINUTE=N lets each client start at most N requests on the
+submission routes per minute; further requests get 429 with Retry-After
+until the minute is over. The count is kept in shared state
+(shared_state.py), so the limit holds across all the backend's workers
+rather than per worker.
+
+A client is the last address in X-Forwarded-For, the one Render's proxy
+appended (earlier entries come from the client and can be forged), or
+the connection's address without the header. The limit is a fixed one-minute
+window. It is off when the variable is unset or 0, and is not enforced
+while the shared state is unreachable.
+"""
+
+import logging
+import math
+import os
+import time
+
+from fastapi import HTTPException, Request
+
+from .metrics import request_rate_limited
+from .shared_state import STATE_ERRORS, get_state
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+
+def _limit() -> int:
+    value = os.getenv("RATE_LIMIT_PER_MINUTE", "").strip()
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        logger.warning(f"Ignoring malformed RATE_LIMIT_PER_MINUTE: {value!r}")
+        return 0
+
+
+def client_address(request: Request) -> str:
+    # A proxy may append to the header or add another one
+    hops = [
+        hop.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    if hops:
+        return hops[-1]
+    return request.client.host if request.client else "unknown"
+
+
+async def rate_limit(request: Request) -> None:
+    """Route dependency: refuse the request with 429 once the client is over the limit."""
+    limit = _limit()
+    if not limit:
+        return
+    now = time.time()
+    window = int(now // WINDOW_SECONDS)
+    try:
+        count = await get_state().incr(
+            f"rate:{client_address(request)}:{window}", ttl=WINDOW_SECONDS
+        )
+    except STATE_ERRORS as e:
+        logger.warning(f"Rate limit not checked, shared state failed: {e}")
+        return
+    if count > limit:
+        request_rate_limited()
+        retry_after = math.ceil((window + 1) * WINDOW_SECONDS - now)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit of {limit} requests per minute exceeded",
+            headers={"Retry-After": str(max(retry_after, 1))},
+        )
@@ -0,0 +1,151 @@
+"""
+Shaping large task results for polls.
+
+A completed deep_parallel_tree or parallel_sentiment_analysis run can
+return megabytes of JSON, and GET /api/task/{id} used to send all of it
+on every poll. Clients now pick what they read:
+
+- ?fields=summary,total       only these keys of a dict result; dotted
+                              paths reach nested keys (checkpoint.phases)
+- ?items=results&limit=100    one page of a list in the result (a dotted
+  &cursor=<next_cursor>       path; omit items when the result is itself
+                              a list). The response's "page" has the
+                              total and the cursor of the next page.
+
+Completed results cannot change, so the backend keeps the latest ones
+in memory (see RESULT_CACHE_SIZE in routes/utils.py) and in the task
+history (history.py), and serves later pages and projections without
+fetching the run again. Responses are encoded with
+orjson, skipping model validation of the result, and compressed by
+compression.py.
+
+orjson only handles 64-bit integers, and deep_parallel_tree sums of big
+inputs exceed that: encode_json falls back to the stdlib json module
+when orjson refuses a value, and decode_json uses it for documents that
+may hold such integers (orjson would read them as floats).
+"""
+
+import base64
+import json
+import re
+from typing import Any
+
+import orjson
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+MAX_PAGE_SIZE = 1000
+
+# Digit runs long enough to be an integer beyond 64 bits
+_BIG_INT = re.compile(rb"\d{20,}")
+
+
+def encode_json(content: Any) -> bytes:
+    """JSON bytes, with orjson where it can encode the value."""
+    try:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+        ).encode()
+
+
+def decode_json(data: bytes) -> Any:
+    """Parse encode_json output without losing integers beyond 64 bits."""
+    if _BIG_INT.search(data):
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """JSON response encoded with orjson (stdlib json for what orjson cannot encode)."""
+    return Response(encode_json(content), status_code=status_code, media_type="application/json")
+
+
+def _split(path: str) -> list[str]:
+    return [part for part in path.split(".") if part]
+
+
+def _get(value: Any, path: list[str]) -> tuple[bool, Any]:
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return False, None
+        value = value[key]
+    return True, value
+
+
+def _with(value: Any, path: list[str], new: Any) -> Any:
+    """Copy of value with the item at path replaced (only the path is copied)."""
+    if not path:
+        return new
+    return {**value, path[0]: _with(value[path[0]], path[1:], new)}
+
+
+def project(result: Any, fields: list[str]) -> Any:
+    """The listed (dotted) fields of a dict result; other results as is."""
+    if not isinstance(result, dict):
+        return result
+    out: dict = {}
+    for field in fields:
+        path = _split(field)
+        found, value = _get(result, path)
+        if not found or not path:
+            continue
+        target = out
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return out
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {cursor!r}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {cursor!r}")
+    return offset
+
+
+def paginate(result: Any, items: str, cursor: str | None, limit: int) -> tuple[Any, dict]:
+    """Replace the list at `items` with one page of it; returns (result, page info)."""
+    path = _split(items)
+    found, values = _get(result, path)
+    if not found or not isinstance(values, list):
+        raise HTTPException(status_code=400, detail=f"Result has no list at {items or 'the top level'!r}")
+    offset = decode_cursor(cursor)
+    page = values[offset:offset + limit]
+    end = offset + len(page)
+    return _with(result, path, page), {
+        "items": items,
+        "offset": offset,
+        "count": len(page),
+        "total": len(values),
+        "next_cursor": encode_cursor(end) if end < len(values) else None,
+    }
+
+
+def shape_result(
+    result: Any,
+    fields: list[str] | None = None,
+    items: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> tuple[Any, dict | None]:
+    """Apply pagination, then projection (the paginated list is always kept)."""
+    page = None
+    if items is not None or limit is not None or cursor is not None:
+        result, page = paginate(result, items or "", cursor, limit or MAX_PAGE_SIZE)
+        if fields and items:
+            fields = [*fields, items]
+    if fields:
+        result = project(result, fields)
+    return result, page
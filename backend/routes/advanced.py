@@ -2,19 +2,23 @@
 Endpoints for advanced workflow examples.
 """
 
-from typing import Any
-from fastapi import APIRouter
-from render_sdk import RenderAsync
+from typing import TYPE_CHECKING, Any
+from fastapi import APIRouter, Request
 import os
 
-from ..models import TaskResponse
-from .utils import run_task_and_respond
+from ..explain import explain_pipeline
+from ..models import ExplainResponse, TaskResponse
+from ..payloads import dataset_info, receive_dataset, task_handle
+from .utils import render_client, run_task_and_respond
+
+if TYPE_CHECKING:
+    from render_sdk import RenderAsync
 
 router = APIRouter()
 
-def get_client() -> RenderAsync:
+def get_client() -> "RenderAsync":
     """Get Render async API client."""
-    return RenderAsync()
+    return render_client()
 
 def get_task_name(task: str) -> str:
     """Get full task name with service slug if configured."""
@@ -28,21 +32,48 @@ async def process_document(data: dict[str, Any]):
 
     Input: {
         "document": "Long text here...",
-        "translate_to": "Spanish"  # Optional
+        "translate_to": "Spanish",  # Optional
+        "pipelined": true,          # Optional: overlap stages per chunk
+        "analyze_original": true    # Optional, pipelined only
     }
     Output: {
         "original_document": "...",
         "translated_text": "...",  # If translate_to specified
         "summary": "...",
         "sentiment_analysis": {...}
+        # pipelined adds "chunk_sentiments", "stage_timings"
+        # and "original_sentiment" (if analyze_original)
     }
     """
+    if data.get("pipelined"):
+        args = [data["document"], data.get("translate_to"), data.get("analyze_original", False)]
+        if "chunk_chars" in data:
+            args.append(data["chunk_chars"])
+        return await run_task_and_respond(
+            get_client(), get_task_name("process_document_pipeline_streaming"), args,
+            message="Document pipeline completed",
+        )
     return await run_task_and_respond(
         get_client(), get_task_name("process_document_pipeline"),
         [data["document"], data.get("translate_to")],
         message="Document pipeline completed",
     )
 
+@router.post("/process_document/explain", response_model=ExplainResponse)
+async def process_document_explain(data: dict[str, Any]):
+    """
+    Simulate the document pipeline for the same input as
+    /process_document, without starting anything: task runs per task,
+    critical path, payload bytes and predicted wall time (see explain.py).
+    """
+    return explain_pipeline(
+        data["document"],
+        translate_to=data.get("translate_to"),
+        pipelined=bool(data.get("pipelined")),
+        analyze_original=bool(data.get("pipelined") and data.get("analyze_original")),
+        chunk_chars=data.get("chunk_chars", 1500),
+    ).as_dict()
+
 @router.post("/parallel_sentiment", response_model=TaskResponse)
 async def parallel_sentiment(data: dict[str, Any]):
     """
@@ -51,14 +82,33 @@ async def parallel_sentiment(data: dict[str, Any]):
     Input: {
         "texts": ["Great product!", "Terrible service.", "It's okay."]
     }
+    (or {"dataset": "<id>"} for texts uploaded to /api/datasets)
     Output: {
         "results": [...],
         "summary": {"positive": 1, "negative": 1, "neutral": 1},
         "total": 3
     }
     """
+    if "dataset" in data:
+        texts = task_handle(dataset_info(data["dataset"]), str)
+    else:
+        texts = data["texts"]
+    return await run_task_and_respond(
+        get_client(), get_task_name("parallel_sentiment_analysis"), [texts],
+        message="Parallel sentiment analysis completed",
+    )
+
+@router.post("/parallel_sentiment/upload", response_model=TaskResponse)
+async def parallel_sentiment_upload(request: Request):
+    """
+    Stream texts for parallel_sentiment_analysis and start it over them.
+
+    Body: NDJSON strings, one per line (or arrays of strings). The task
+    gets a dataset handle and reads the texts a slice at a time.
+    """
+    texts = task_handle(await receive_dataset(request), str)
     return await run_task_and_respond(
-        get_client(), get_task_name("parallel_sentiment_analysis"), [data["texts"]],
+        get_client(), get_task_name("parallel_sentiment_analysis"), [texts],
         message="Parallel sentiment analysis completed",
     )
 
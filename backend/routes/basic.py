@@ -2,19 +2,21 @@
 Endpoints for basic task examples.
 """
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from fastapi import APIRouter
-from render_sdk import RenderAsync
 import os
 
 from ..models import TaskResponse
-from .utils import run_task_and_respond
+from .utils import render_client, run_task_and_respond
+
+if TYPE_CHECKING:
+    from render_sdk import RenderAsync
 
 router = APIRouter()
 
-def get_client() -> RenderAsync:
+def get_client() -> "RenderAsync":
     """Get Render async API client."""
-    return RenderAsync()
+    return render_client()
 
 def get_task_name(task: str) -> str:
     """Get full task name with service slug if configured."""
@@ -0,0 +1,36 @@
+"""
+Endpoints for the payload store (large task inputs streamed to disk).
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+
+from ..models import DatasetInfo
+from ..payloads import dataset_info, delete_dataset, receive_dataset
+
+router = APIRouter()
+
+@router.post("", response_model=DatasetInfo)
+async def upload_dataset(request: Request):
+    """
+    Stream a dataset into the payload store.
+
+    Body: NDJSON (Content-Type: application/x-ndjson), one value or array
+    of values per line, or a packed little-endian array
+    (Content-Type: application/octet-stream, ?dtype=int64|int32|float64).
+
+    Pass the returned id as {"dataset": "<id>"} to
+    /api/parallel/deep_parallel_tree or /api/advanced/parallel_sentiment.
+    """
+    return await receive_dataset(request)
+
+@router.get("/{dataset_id}", response_model=DatasetInfo)
+async def get_dataset(dataset_id: str):
+    """Metadata of a stored dataset."""
+    return dataset_info(dataset_id)
+
+@router.delete("/{dataset_id}")
+async def remove_dataset(dataset_id: str):
+    """Delete a stored dataset. Runs still reading it will fail."""
+    if not delete_dataset(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} not found")
+    return {"dataset": dataset_id, "deleted": True}
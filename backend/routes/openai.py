@@ -2,19 +2,21 @@
 Endpoints for OpenAI integration examples.
 """
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from fastapi import APIRouter
-from render_sdk import RenderAsync
 import os
 
 from ..models import TaskResponse
-from .utils import run_task_and_respond
+from .utils import render_client, run_task_and_respond
+
+if TYPE_CHECKING:
+    from render_sdk import RenderAsync
 
 router = APIRouter()
 
-def get_client() -> RenderAsync:
+def get_client() -> "RenderAsync":
     """Get Render async API client."""
-    return RenderAsync()
+    return render_client()
 
 def get_task_name(task: str) -> str:
     """Get full task name with service slug if configured."""
@@ -26,11 +28,13 @@ async def analyze_sentiment(data: dict[str, Any]):
     """
     Execute the analyze_text_sentiment task.
 
-    Input: {"text": "I love this product!"}
+    Input: {"text": "I love this product!", "latency_budget_ms": 1500, "model": "gpt-4"}
     Output: {"sentiment": "positive", "explanation": "..."}
+    (latency_budget_ms and model are optional and steer model routing)
     """
     return await run_task_and_respond(
-        get_client(), get_task_name("analyze_text_sentiment"), [data["text"]],
+        get_client(), get_task_name("analyze_text_sentiment"),
+        [data["text"], data.get("latency_budget_ms"), data.get("model")],
         message="Sentiment analysis completed",
     )
 
@@ -39,11 +43,15 @@ async def translate(data: dict[str, Any]):
     """
     Execute the translate_text task.
 
-    Input: {"text": "Hello world", "target_language": "Spanish"}
+    Input: {"text": "Hello world", "target_language": "Spanish", "stream": true}
     Output: "Hola mundo"
+    (stream is optional; when true, poll with ?progress=true for partial output.
+    latency_budget_ms and model are optional and steer model routing)
     """
     return await run_task_and_respond(
-        get_client(), get_task_name("translate_text"), [data["text"], data["target_language"]],
+        get_client(), get_task_name("translate_text"),
+        [data["text"], data["target_language"], data.get("stream", False),
+         data.get("latency_budget_ms"), data.get("model")],
         message="Translation completed",
     )
 
@@ -52,10 +60,14 @@ async def summarize(data: dict[str, Any]):
     """
     Execute the summarize_text task.
 
-    Input: {"text": "Long text here...", "max_sentences": 2}
+    Input: {"text": "Long text here...", "max_sentences": 2, "stream": true}
     Output: "Summary in 2 sentences."
+    (stream is optional; when true, poll with ?progress=true for partial output.
+    latency_budget_ms and model are optional and steer model routing)
     """
     return await run_task_and_respond(
-        get_client(), get_task_name("summarize_text"), [data["text"], data.get("max_sentences", 3)],
+        get_client(), get_task_name("summarize_text"),
+        [data["text"], data.get("max_sentences", 3), data.get("stream", False),
+         data.get("latency_budget_ms"), data.get("model")],
         message="Summarization completed",
     )
@@ -2,19 +2,23 @@
 Endpoints for parallel execution examples.
 """
 
-from typing import Any
-from fastapi import APIRouter
-from render_sdk import RenderAsync
+from typing import TYPE_CHECKING, Any
+from fastapi import APIRouter, Request
 import os
 
-from ..models import TaskResponse
-from .utils import run_task_and_respond
+from ..explain import enforce_tree_limit, explain_tree_input
+from ..models import ExplainResponse, TaskResponse
+from ..payloads import dataset_info, receive_dataset, task_handle
+from .utils import render_client, run_task_and_respond
+
+if TYPE_CHECKING:
+    from render_sdk import RenderAsync
 
 router = APIRouter()
 
-def get_client() -> RenderAsync:
+def get_client() -> "RenderAsync":
     """Get Render async API client."""
-    return RenderAsync()
+    return render_client()
 
 def get_task_name(task: str) -> str:
     """Get full task name with service slug if configured."""
@@ -57,9 +61,47 @@ async def deep_parallel_tree(data: dict[str, Any]):
     parallel tree that fans out and reduces across multiple phases.
 
     Input: {"numbers": [1,2,3,4,5,6,7,8,9,10,11,12], "chunk_size": 4}
-    (chunk_size is optional, defaults to 4)
+    (chunk_size is optional, defaults to 4). Instead of "numbers", pass
+    {"dataset": "<id>"} to run over a dataset uploaded to /api/datasets.
     """
-    args = [data["numbers"]]
+    chunk_size = data.get("chunk_size", 4)
+    if "dataset" in data:
+        meta = dataset_info(data["dataset"])
+        args = [task_handle(meta, int)]
+        enforce_tree_limit(lambda: explain_tree_input(meta=meta, chunk_size=chunk_size))
+    else:
+        args = [data["numbers"]]
+        enforce_tree_limit(lambda: explain_tree_input(data["numbers"], chunk_size=chunk_size))
     if "chunk_size" in data:
         args.append(data["chunk_size"])
     return await run_task_and_respond(get_client(), get_task_name("deep_parallel_tree"), args)
+
+@router.post("/deep_parallel_tree/explain", response_model=ExplainResponse)
+async def deep_parallel_tree_explain(data: dict[str, Any]):
+    """
+    Simulate deep_parallel_tree for the same input as /deep_parallel_tree,
+    without starting anything: task runs per level, critical path,
+    payload bytes and predicted wall time (see explain.py).
+    """
+    chunk_size = data.get("chunk_size", 4)
+    if "dataset" in data:
+        meta = dataset_info(data["dataset"])
+        task_handle(meta, int)
+        return explain_tree_input(meta=meta, chunk_size=chunk_size).as_dict()
+    return explain_tree_input(data["numbers"], chunk_size=chunk_size).as_dict()
+
+@router.post("/deep_parallel_tree/upload", response_model=TaskResponse)
+async def deep_parallel_tree_upload(request: Request, chunk_size: int | None = None):
+    """
+    Stream the numbers for deep_parallel_tree and start it over them.
+
+    Body: NDJSON integers or a packed int64/int32 array (see
+    /api/datasets). The task gets a dataset handle instead of the list and
+    each chunk reads its own slice.
+    """
+    meta = await receive_dataset(request)
+    args = [task_handle(meta, int)]
+    enforce_tree_limit(lambda: explain_tree_input(meta=meta, chunk_size=chunk_size or 4))
+    if chunk_size is not None:
+        args.append(chunk_size)
+    return await run_task_and_respond(get_client(), get_task_name("deep_parallel_tree"), args)
@@ -2,34 +2,116 @@
 Shared utilities for route handlers.
 """
 
+import asyncio
+import json
 import logging
 import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
 from fastapi import HTTPException
-from render_sdk import RenderAsync
-from render_sdk.client.errors import RenderError
-from render_sdk.public_api.api.workflows_ea import list_workflows
-import httpx
+from fastapi.responses import Response
+
+from .. import idempotency
+from ..deadline import inject_deadline, remaining_ms
+from ..history import record_finished, record_submitted, stored_result
+from ..metrics import observe_upstream, record_cache, task_cancelled, task_finished, task_started
+from ..planning import choose_plan, submission_slot
+from ..results import json_response, shape_result
+from ..shared_state import STATE_ERRORS, get_state
+from ..tracing import client_span, inject_trace_context
 
 logger = logging.getLogger(__name__)
 
+# Must match PROGRESS_MARKER in workflows/progress.py
+PROGRESS_MARKER = "[progress]"
+
+# Task runs in these states still hold (or are queued for, or will resume
+# on) a worker
+ACTIVE_STATUSES = ("pending", "running", "paused")
+# Bounds for cancelling a task run's subtree
+CANCEL_CONCURRENCY = 16
+CANCEL_PAGE_SIZE = 100
+CANCEL_MAX_SWEEPS = 3
+# Completed results kept for later pages and projections
+RESULT_CACHE_SIZE = 16
+# How long workers share a workflow ID before one looks it up again
+WORKFLOW_ID_TTL = 3600
+
 _workflow_id_cache: str | None = None
+_workflow_owner_cache: str | None = None
+_result_cache: OrderedDict[str, Any] = OrderedDict()
+
+# render_sdk takes about half a second to import, most of the backend's
+# startup. It is imported on first use and preloaded in the background
+# once the server is up (see preload_render_sdk and main.lifespan).
+if TYPE_CHECKING:
+    from render_sdk import RenderAsync
+
+    from ..models import CancelResponse, TaskResponse
+
+
+def render_client() -> "RenderAsync":
+    """Render API client."""
+    from render_sdk import RenderAsync
+
+    return RenderAsync()
 
 
-async def get_workflow_id(client: RenderAsync) -> str | None:
-    global _workflow_id_cache
+def preload_render_sdk() -> None:
+    """Import the render_sdk modules the routes use."""
+    import render_sdk  # noqa: F401
+    import render_sdk.public_api.api.logs  # noqa: F401
+    import render_sdk.public_api.api.workflow_tasks_ea.list_task_runs  # noqa: F401
+    import render_sdk.public_api.api.workflows_ea  # noqa: F401
+
+
+def _workflow_state_key() -> str:
+    return f"workflow:{os.getenv('WORKFLOW_SERVICE_SLUG', 'workflow-demo-test-web')}"
+
+
+async def _shared_workflow() -> dict | None:
+    try:
+        value = await get_state().get(_workflow_state_key())
+    except STATE_ERRORS as e:
+        logger.warning(f"Shared state lookup failed: {e}")
+        return None
+    return json.loads(value) if value else None
+
+
+async def _share_workflow(workflow: dict) -> None:
+    try:
+        await get_state().set(_workflow_state_key(), json.dumps(workflow), ttl=WORKFLOW_ID_TTL)
+    except STATE_ERRORS as e:
+        logger.warning(f"Shared state update failed: {e}")
+
+
+async def get_workflow_id(client: "RenderAsync") -> str | None:
+    """The workflow's ID: from this process, then from the other workers
+    (shared state), then from the Render API."""
+    global _workflow_id_cache, _workflow_owner_cache
+    record_cache("workflow_id", _workflow_id_cache is not None)
     if _workflow_id_cache is not None:
         return _workflow_id_cache
+    shared = await _shared_workflow()
+    record_cache("workflow_id_shared", shared is not None)
+    if shared is not None:
+        _workflow_id_cache, _workflow_owner_cache = shared["id"], shared["owner"]
+        return _workflow_id_cache
+    from render_sdk.public_api.api.workflows_ea import list_workflows
+
     try:
-        response = await list_workflows.asyncio_detailed(client=client._client.internal, limit=10)
+        async with observe_upstream("list_workflows"):
+            response = await list_workflows.asyncio_detailed(client=client._client.internal, limit=10)
         if response.parsed and isinstance(response.parsed, list) and len(response.parsed) > 0:
             service_slug = os.getenv("WORKFLOW_SERVICE_SLUG", "workflow-demo-test-web")
-            for item in response.parsed:
-                wf = item.workflow
-                if wf.slug == service_slug:
-                    _workflow_id_cache = wf.id
-                    return _workflow_id_cache
             # Fallback to first workflow if no slug match
-            _workflow_id_cache = response.parsed[0].workflow.id
+            wf = next(
+                (item.workflow for item in response.parsed if item.workflow.slug == service_slug),
+                response.parsed[0].workflow,
+            )
+            _workflow_id_cache = wf.id
+            _workflow_owner_cache = wf.owner_id
+            await _share_workflow({"id": wf.id, "owner": wf.owner_id})
             return _workflow_id_cache
     except Exception as e:
         logger.warning(f"Failed to fetch workflow ID: {e}")
@@ -37,52 +119,270 @@ async def get_workflow_id(client: RenderAsync) -> str | None:
 
 
 async def run_task_and_respond(
-    client: RenderAsync,
+    client: "RenderAsync",
     task_name: str,
     args: list,
     message: str = "Task completed successfully",
 ) -> "TaskResponse":
-    """Create a task and return immediately with its ID (non-blocking)."""
+    """Create a task and return immediately with its ID (non-blocking).
+
+    With an X-Deadline-Ms header, the deadline travels with the task input;
+    if it has already passed, no task run is started. With an
+    Idempotency-Key header, a repeat of the request returns the run the
+    first one started (see idempotency.py). The run's plan and priority
+    are chosen from its input (see planning.py).
+    """
     from ..models import TaskResponse
 
+    remaining = remaining_ms()
+    if remaining is not None and remaining <= 0:
+        raise HTTPException(status_code=504, detail="Deadline passed before the task could start")
+    claimed = await idempotency.claim(task_name, args)
+    if claimed is not None and claimed.response is not None:
+        return TaskResponse(**claimed.response)
+    plan = choose_plan(task_name, args)
     try:
-        result = await client.workflows.run_task(task_name, args)
-        wf_id = await get_workflow_id(client)
-        return TaskResponse(
-            task_run_id=result.id,
-            workflow_id=wf_id,
-            status="running",
-            message="Task started",
-        )
+        async with client_span("render.run_task", **{"task.name": plan.task_name}) as span:
+            async with submission_slot(plan), observe_upstream("run_task"):
+                result = await client.workflows.start_task(
+                    plan.task_name, inject_trace_context(inject_deadline(args))
+                )
     except Exception as e:
+        await idempotency.release(claimed)
         raise handle_sdk_error(e)
+    task_started(task_name, result.id)
+    await record_submitted(
+        result.id, task_name, span.trace_id if span else None,
+        plan=plan.plan, priority=plan.priority, input_size=plan.input_size,
+    )
+    response = TaskResponse(
+        task_run_id=result.id,
+        workflow_id=await get_workflow_id(client),
+        status="running",
+        message="Task started",
+        trace_id=span.trace_id if span else None,
+        plan=plan.plan,
+        priority=plan.priority,
+    )
+    await idempotency.complete(claimed, response.model_dump())
+    return response
 
 
-async def get_task_status(task_run_id: str) -> "TaskResponse":
-    """Poll a task run's current status."""
-    from ..models import TaskResponse
+async def get_task_progress(client: "RenderAsync", task_run_id: str) -> dict | None:
+    """Fetch the latest progress event a task run has published to its logs.
 
-    client = RenderAsync()
+    Streaming tasks log lines like `[progress] {"text": ..., "seq": ...}`.
+    Each event carries the full text so far, so only the newest is needed.
+    """
+    from render_sdk.public_api.api.logs import list_logs
+
+    wf_id = await get_workflow_id(client)
+    if wf_id is None or _workflow_owner_cache is None:
+        return None
     try:
-        details = await client.workflows.get_task_run(task_run_id)
-        wf_id = await get_workflow_id(client)
+        async with observe_upstream("list_logs"):
+            response = await list_logs.asyncio_detailed(
+                client=client._client.internal,
+                owner_id=_workflow_owner_cache,
+                resource=[wf_id],
+                task_run=[task_run_id],
+                text=[PROGRESS_MARKER],
+                limit=20,
+            )
+    except Exception as e:
+        logger.warning(f"Failed to fetch task progress: {e}")
+        return None
+
+    logs = getattr(response.parsed, "logs", None) or []
+    latest = None
+    for log in logs:
+        _, marker, payload = log.message.partition(PROGRESS_MARKER)
+        if not marker:
+            continue
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            continue
+        if latest is None or event.get("seq", 0) > latest.get("seq", 0):
+            latest = event
+    return latest
+
+
+def _cache_result(task_run_id: str, result: Any) -> None:
+    _result_cache[task_run_id] = result
+    if len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+
+
+async def get_task_status(
+    task_run_id: str,
+    include_progress: bool = False,
+    fields: list[str] | None = None,
+    items: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Response:
+    """Poll a task run's current status.
+
+    With `include_progress`, running tasks also report the latest partial
+    output published by streaming tasks. `fields`, `items`, `cursor` and
+    `limit` select part of a completed result (see results.py).
+
+    The body follows TaskResponse but is encoded directly: the result can
+    be megabytes, and validating and re-encoding it on every poll is what
+    projection and pagination are meant to avoid.
+    """
+    client = render_client()
+    record_cache("task_result", task_run_id in _result_cache)
+    if task_run_id in _result_cache:
+        _result_cache.move_to_end(task_run_id)
+        found, result = True, _result_cache[task_run_id]
+    else:
+        # Completed results recorded in the task history (see history.py)
+        found, result = await stored_result(task_run_id)
+        record_cache("task_history", found)
+        if found:
+            _cache_result(task_run_id, result)
+    if found:
+        status, message, progress = "completed", "Task completed successfully", None
+    else:
+        try:
+            async with observe_upstream("get_task_run"):
+                details = await client.workflows.get_task_run(task_run_id)
+        except Exception as e:
+            raise handle_sdk_error(e)
         status = details.status.value if hasattr(details.status, 'value') else str(details.status)
+        if status in ("completed", "failed", "canceled"):
+            task_finished(task_run_id)
         result = None
+        progress = None
         message = f"Task {status}"
+        if include_progress and status not in ("completed", "failed"):
+            progress = await get_task_progress(client, task_run_id)
         if status == "completed":
             result = details.results
             message = "Task completed successfully"
+            _cache_result(task_run_id, result)
         elif status == "failed":
             message = details.error if hasattr(details, 'error') and details.error else "Task failed"
-        return TaskResponse(
-            task_run_id=task_run_id,
-            workflow_id=wf_id,
-            status=status,
-            message=message,
-            result=result,
-        )
+        if status in ("completed", "failed", "canceled"):
+            await record_finished(task_run_id, status, message, result)
+
+    page = None
+    if result is not None:
+        result, page = shape_result(result, fields, items, cursor, limit)
+    return json_response({
+        "task_run_id": task_run_id,
+        "workflow_id": await get_workflow_id(client),
+        "status": status,
+        "message": message,
+        "result": result,
+        "progress": progress,
+        "trace_id": None,
+        "page": page,
+    })
+
+
+def _status(run) -> str:
+    return run.status.value if hasattr(run.status, 'value') else str(run.status)
+
+
+async def _list_active_descendants(client: "RenderAsync", root_id: str) -> list:
+    """
+    Every active task run under root_id, excluding the root. Raises if a
+    page cannot be listed, rather than reading the error as an empty page.
+    """
+    from render_sdk.public_api.api.workflow_tasks_ea import list_task_runs
+
+    active = []
+    cursor = None
+    while True:
+        async with observe_upstream("list_task_runs"):
+            response = await list_task_runs.asyncio_detailed(
+                client=client._client.internal,
+                root_task_run_id=[root_id],
+                limit=CANCEL_PAGE_SIZE,
+                **({"cursor": cursor} if cursor else {}),
+            )
+        if response.status_code != 200 or not isinstance(response.parsed, list):
+            raise RuntimeError(f"list_task_runs returned HTTP {int(response.status_code)}")
+        page = response.parsed
+        active.extend(run for run in page if run.id != root_id and _status(run) in ACTIVE_STATUSES)
+        if len(page) < CANCEL_PAGE_SIZE:
+            return active
+        cursor = page[-1].id
+
+
+async def cancel_task_tree(task_run_id: str) -> "CancelResponse":
+    """Cancel a task run and every subtask run under it.
+
+    Cancelling the root on Render stops its own process, but subtask runs
+    it already started are separate runs that keep going. They share the
+    root's ID as rootTaskRunId, so they are listed and cancelled too. The
+    listing is repeated (up to CANCEL_MAX_SWEEPS times) to catch subtasks
+    that were started while the first sweep ran.
+    """
+    from ..models import CancelResponse
+
+    client = render_client()
+    freed = {status: 0 for status in ACTIVE_STATUSES}
+    failed = 0
+
+    async def cancel(run_id: str, status: str) -> None:
+        nonlocal failed
+        try:
+            async with observe_upstream("cancel_task_run"):
+                await client.workflows.cancel_task_run(run_id)
+        except Exception as e:
+            # Usually the run finished between listing and cancelling
+            logger.info(f"Could not cancel task run {run_id}: {e}")
+            failed += 1
+            return
+        freed[status] += 1
+        task_cancelled(status)
+
+    try:
+        async with observe_upstream("get_task_run"):
+            root = await client.workflows.get_task_run(task_run_id)
+        root_status = _status(root)
+        if root_status in ACTIVE_STATUSES:
+            # Root first, so it stops starting new subtasks
+            await cancel(task_run_id, root_status)
     except Exception as e:
         raise handle_sdk_error(e)
+    task_finished(task_run_id)
+
+    semaphore = asyncio.Semaphore(CANCEL_CONCURRENCY)
+
+    async def bounded(run) -> None:
+        async with semaphore:
+            await cancel(run.id, _status(run))
+
+    swept = True
+    try:
+        for _ in range(CANCEL_MAX_SWEEPS):
+            active = await _list_active_descendants(client, task_run_id)
+            if not active:
+                break
+            await asyncio.gather(*(bounded(run) for run in active))
+    except Exception as e:
+        logger.warning(f"Failed to list subtasks of {task_run_id}: {e}")
+        swept = False
+
+    cancelled = sum(freed.values())
+    message = f"Cancelled {cancelled} task run{'s' if cancelled != 1 else ''}"
+    if not swept:
+        message += "; subtask runs could not be listed and may still be running"
+    if root_status in ACTIVE_STATUSES:
+        await record_finished(task_run_id, "canceled", "Task cancelled")
+    return CancelResponse(
+        task_run_id=task_run_id,
+        status="canceled" if root_status in ACTIVE_STATUSES else root_status,
+        message=message,
+        cancelled=cancelled,
+        freed=freed,
+        failed=failed,
+    )
 
 
 def handle_sdk_error(e: Exception) -> HTTPException:
@@ -92,6 +392,9 @@ def handle_sdk_error(e: Exception) -> HTTPException:
     a streaming response without calling read() first. This causes
     httpx.ResponseNotRead exceptions when there are SSE stream errors.
     """
+    import httpx
+    from render_sdk.client.errors import RenderError
+
     if isinstance(e, httpx.ResponseNotRead):
         logger.error(f"SDK streaming error (likely auth or connection issue): {e}")
         return HTTPException(
@@ -0,0 +1,371 @@
+"""
+State shared by the backend's worker processes.
+
+`uvicorn backend.main:app --workers N` runs N processes, and anything
+kept in module globals (the workflow ID cache, idempotency keys, rate
+limit counters) exists N times: every worker repeats the list_workflows
+lookup, a retried submission that lands on another worker starts a
+second run, and each worker allows the full rate. State that has to be
+consistent across workers goes through get_state() instead.
+
+Select the backend with SHARED_STATE:
+- unset / "memory":     this process only (one worker, tests)
+- "sqlite" / "sqlite:PATH": a SQLite file shared by every worker on the
+                        host (default <tmp>/backend-shared-state.sqlite3)
+- "redis://[:password@]host:port[/db]": a Redis server, or anything
+                        speaking its protocol, such as
+                        backend/loadtest/fake_redis.py; needed when
+                        workers run on several hosts
+
+Other backends plug in with register_state(scheme, factory). Values are
+strings; keys may carry a TTL in seconds.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from typing import Protocol
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server."""
+
+
+# What a backend raises when the state cannot be reached or updated.
+# Callers fall back to per-process behaviour rather than fail requests.
+# EOFError covers asyncio.IncompleteReadError (a connection the server
+# closed, e.g. on restart); asyncio.TimeoutError is not an OSError
+# before Python 3.11.
+STATE_ERRORS = (OSError, EOFError, asyncio.TimeoutError, sqlite3.Error, RedisError)
+
+
+class SharedState(Protocol):
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: float | None = None,
+                  only_if_absent: bool = False) -> bool:
+        """Store value; with only_if_absent, only if the key does not exist. True if stored."""
+        ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Add to an integer counter; ttl applies when the call creates the key."""
+        ...
+
+
+class MemoryState:
+    """State held in this process."""
+
+    # Expired keys are swept when the table grows past this
+    SWEEP_SIZE = 10_000
+
+    def __init__(self):
+        self._values: dict[str, tuple[str, float | None]] = {}
+
+    def _live(self, key: str) -> tuple[str, float | None] | None:
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._values[key]
+            return None
+        return entry
+
+    def _store(self, key: str, value: str, ttl: float | None) -> None:
+        if len(self._values) >= self.SWEEP_SIZE:
+            now = time.time()
+            self._values = {k: v for k, v in self._values.items() if v[1] is None or v[1] > now}
+        self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    async def get(self, key: str) -> str | None:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: str, ttl: float | None = None,
+                  only_if_absent: bool = False) -> bool:
+        if only_if_absent and self._live(key) is not None:
+            return False
+        self._store(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        entry = self._live(key)
+        if entry is None:
+            self._store(key, str(amount), ttl)
+            return amount
+        value = int(entry[0]) + amount
+        self._values[key] = (str(value), entry[1])
+        return value
+
+    def __repr__(self) -> str:
+        return "memory"
+
+
+class SQLiteState:
+    """State in a SQLite file, shared by the processes on one host."""
+
+    # Every this many writes, all expired keys are deleted
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state"
+            " (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _transaction(self, key: str, fn):
+        """Run fn(conn) in a write transaction, after dropping `key` if it has expired."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._writes += 1
+                if self._writes % self.SWEEP_EVERY == 0:
+                    self._conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM shared_state WHERE key = ? AND expires_at <= ?", (key, time.time())
+                )
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float | None, only_if_absent: bool) -> bool:
+        expires_at = time.time() + ttl if ttl else None
+        verb = "INSERT OR IGNORE" if only_if_absent else "INSERT OR REPLACE"
+
+        def write(conn):
+            cursor = conn.execute(
+                f"{verb} INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            return cursor.rowcount > 0
+
+        return self._transaction(key, write)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def _incr(self, key: str, amount: int, ttl: float | None) -> int:
+        expires_at = time.time() + ttl if ttl else None
+
+        def add(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO shared_state (key, value, expires_at) VALUES (?, '0', ?)",
+                (key, expires_at),
+            )
+            conn.execute(
+                "UPDATE shared_state SET value = CAST(value AS INTEGER) + ? WHERE key = ?", (amount, key)
+            )
+            return int(conn.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()[0])
+
+        return self._transaction(key, add)
+
+    async def get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None,
+                  only_if_absent: bool = False) -> bool:
+        return await asyncio.to_thread(self._set, key, value, ttl, only_if_absent)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        return await asyncio.to_thread(self._incr, key, amount, ttl)
+
+    def __repr__(self) -> str:
+        return f"sqlite:{self.path}"
+
+
+def _encode_command(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Redis connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        size = int(payload)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        count = int(payload)
+        return None if count < 0 else [await _read_reply(reader) for _ in range(count)]
+    raise RedisError(f"Unexpected reply {line!r}")
+
+
+def _discard(loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter) -> None:
+    """Close a connection that belongs to another event loop."""
+    if not loop.is_closed():
+        loop.call_soon_threadsafe(writer.close)
+        return
+    # A closed loop cannot run the transport's close; end the connection
+    # here and the socket is released with the transport
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class RedisState:
+    """State in Redis, spoken to over RESP with a small connection pool."""
+
+    MAX_CONNECTIONS = 16
+    TIMEOUT = 2.0
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            writer.write(b"".join(_encode_command(*c) for c in setup))
+            for _ in setup:
+                await _read_reply(reader)
+        return reader, writer
+
+    async def _pipeline(self, *commands: tuple) -> list:
+        """Send commands in one write on one connection; returns their replies."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections belong to the loop that opened them
+            for _, writer in self._idle:
+                _discard(self._loop, writer)
+            self._loop, self._idle = loop, []
+            self._slots = asyncio.Semaphore(self.MAX_CONNECTIONS)
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(self._connect(), self.TIMEOUT)
+                reader, writer = conn
+                writer.write(b"".join(_encode_command(*c) for c in commands))
+                replies = []
+                for _ in commands:
+                    try:
+                        replies.append(await asyncio.wait_for(_read_reply(reader), self.TIMEOUT))
+                    except RedisError as e:
+                        replies.append(e)
+            except BaseException:
+                if conn is not None:
+                    conn[1].close()
+                raise
+            self._idle.append(conn)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def get(self, key: str) -> str | None:
+        (value,) = await self._pipeline(("GET", key))
+        return value
+
+    async def set(self, key: str, value: str, ttl: float | None = None,
+                  only_if_absent: bool = False) -> bool:
+        command = ["SET", key, value]
+        if ttl:
+            command += ["PX", int(ttl * 1000)]
+        if only_if_absent:
+            command.append("NX")
+        (reply,) = await self._pipeline(tuple(command))
+        return reply == "OK"
+
+    async def delete(self, key: str) -> None:
+        await self._pipeline(("DEL", key))
+
+    async def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        if not ttl:
+            (value,) = await self._pipeline(("INCRBY", key, amount))
+            return value
+        # Create the key with its TTL first, so the counter always expires
+        _, value = await self._pipeline(("SET", key, 0, "PX", int(ttl * 1000), "NX"), ("INCRBY", key, amount))
+        return value
+
+    def __repr__(self) -> str:
+        return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+_factories: dict[str, Callable[[str], SharedState]] = {
+    "memory": lambda _: MemoryState(),
+    "sqlite": lambda arg: SQLiteState(arg or os.path.join(tempfile.gettempdir(), "backend-shared-state.sqlite3")),
+    "redis": lambda arg: RedisState(f"redis:{arg}"),
+}
+_states: dict[str, SharedState] = {}
+_states_lock = threading.Lock()
+
+
+def register_state(scheme: str, factory: Callable[[str], SharedState]) -> None:
+    """Make SHARED_STATE="<scheme>:<arg>" build a backend with factory(arg)."""
+    _factories[scheme] = factory
+
+
+def get_state() -> SharedState:
+    """The backend named by SHARED_STATE (memory by default)."""
+    spec = os.getenv("SHARED_STATE", "").strip() or "memory"
+    with _states_lock:
+        state = _states.get(spec)
+        if state is None:
+            scheme, _, arg = spec.partition(":")
+            if scheme not in _factories:
+                raise ValueError(f"Unknown SHARED_STATE scheme {scheme!r}")
+            state = _states[spec] = _factories[scheme](arg)
+            logger.info(f"Shared state: {state!r}")
+        return state
@@ -0,0 +1,288 @@
+"""
+W3C trace context for the backend.
+
+Every request gets a server span: it continues the caller's `traceparent`
+header when there is one and starts a new trace otherwise. Calls to the
+Render API made while handling the request become child spans, and
+`inject_trace_context` adds the current context to task input so the
+workflow worker's spans join the same trace (see
+workflows/trace_context.py for the receiving side and input format).
+
+Exporters, as on the worker:
+- OTEL_EXPORTER_OTLP_ENDPOINT: POST OTLP JSON to <endpoint>/v1/traces
+- TRACE_EXPORT_FILE: append one OTLP JSON document per line
+- OTEL_SERVICE_NAME: service.name resource attribute (default "backend")
+
+Context is only injected into task input when an exporter is configured.
+
+Spans are exported in the background: finished spans are queued and a
+task per event loop sends them in batches every EXPORT_INTERVAL seconds
+(sooner once MAX_BATCH_SPANS are waiting) over one shared httpx client,
+so requests never wait for the collector. Up to MAX_QUEUED_SPANS wait;
+beyond that spans are dropped and counted. main.lifespan flushes the
+queue on shutdown.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# Must match TRACEPARENT_KEY in workflows/trace_context.py
+TRACEPARENT_KEY = "__traceparent__"
+
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+EXPORT_INTERVAL = 1.0
+MAX_BATCH_SPANS = 512
+MAX_QUEUED_SPANS = 4096
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    """The parts of a W3C traceparent header."""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @classmethod
+    def new_root(cls) -> "TraceContext":
+        return cls(trace_id=secrets.token_hex(16), span_id=secrets.token_hex(8))
+
+    @classmethod
+    def parse(cls, header: str | None) -> "TraceContext | None":
+        """Parse a traceparent header; None if it is missing or malformed."""
+        if not header:
+            return None
+        parts = header.strip().split("-")
+        if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        version, trace_id, span_id, flags = parts[:4]
+        if version == "ff" or set(trace_id) == {"0"} or set(span_id) == {"0"}:
+            return None
+        try:
+            int(trace_id, 16), int(span_id, 16)
+            sampled = bool(int(flags, 16) & 1)
+        except ValueError:
+            return None
+        return cls(trace_id=trace_id, span_id=span_id, sampled=sampled)
+
+    def child(self) -> "TraceContext":
+        return TraceContext(self.trace_id, secrets.token_hex(8), self.sampled)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+_current: contextvars.ContextVar[TraceContext | None] = contextvars.ContextVar(
+    "trace_context", default=None
+)
+
+
+def export_enabled() -> bool:
+    return bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("TRACE_EXPORT_FILE"))
+
+
+def inject_trace_context(args: list | dict) -> list | dict:
+    """Task input carrying the current trace context, when tracing is on."""
+    context = _current.get()
+    if context is None or not export_enabled():
+        return args
+    if isinstance(args, dict):
+        return {**args, TRACEPARENT_KEY: context.traceparent}
+    return [*args, {TRACEPARENT_KEY: context.traceparent}]
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(context, parent, name, kind, start_ns, end_ns, attributes, error) -> dict:
+    return {
+        "traceId": context.trace_id,
+        "spanId": context.span_id,
+        "parentSpanId": parent.span_id if parent else "",
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_otlp_attribute(k, v) for k, v in attributes.items()],
+        "status": (
+            {"code": STATUS_ERROR, "message": error} if error else {"code": STATUS_OK}
+        ),
+    }
+
+
+def _otlp_document(spans: list[dict]) -> dict:
+    service = os.getenv("OTEL_SERVICE_NAME", "backend")
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service)]},
+            "scopeSpans": [{"scope": {"name": "backend.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def _write_file(path: str, document: dict) -> None:
+    with open(path, "a") as f:
+        f.write(json.dumps(document) + "\n")
+
+
+class SpanExporter:
+    """Queue of finished spans, sent in batches by a background task."""
+
+    def __init__(self):
+        self.dropped = 0
+        self._spans: list[dict] = []
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def add(self, span: dict) -> None:
+        if len(self._spans) >= MAX_QUEUED_SPANS:
+            self.dropped += 1
+            return
+        self._spans.append(span)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        if len(self._spans) >= MAX_BATCH_SPANS:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            try:
+                while True:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), EXPORT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+                    await self._send(client)
+            except asyncio.CancelledError:
+                # Shutting down: send what is left
+                await self._send(client)
+                raise
+
+    async def _send(self, client) -> None:
+        while self._spans:
+            batch, self._spans = self._spans[:MAX_BATCH_SPANS], self._spans[MAX_BATCH_SPANS:]
+            document = _otlp_document(batch)
+            try:
+                path = os.getenv("TRACE_EXPORT_FILE")
+                if path:
+                    await asyncio.to_thread(_write_file, path, document)
+                endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+                if endpoint:
+                    response = await client.post(f"{endpoint.rstrip('/')}/v1/traces", json=document)
+                    response.raise_for_status()
+            except Exception as e:
+                logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    async def shutdown(self) -> None:
+        """Send the queued spans and stop the background task."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} spans: export queue full")
+
+
+_exporter = SpanExporter()
+
+
+def _export_span(context, parent, name, kind, start_ns, attributes, error=None) -> None:
+    if not (export_enabled() and context.sampled):
+        return
+    _exporter.add(_otlp_span(context, parent, name, kind, start_ns, time.time_ns(), attributes, error))
+
+
+async def shutdown_export() -> None:
+    """Flush queued spans (called on server shutdown)."""
+    await _exporter.shutdown()
+
+
+@asynccontextmanager
+async def client_span(name: str, **attributes):
+    """Child span of the current request for an outgoing call."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    context = parent.child()
+    token = _current.set(context)
+    start_ns = time.time_ns()
+    error = None
+    try:
+        yield context
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _export_span(context, parent, name, SPAN_KIND_CLIENT, start_ns, attributes, error)
+
+
+def route_template(request: Request) -> str:
+    """Request path with path parameters put back as placeholders (low cardinality)."""
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(str(value), "{" + name + "}")
+    return path
+
+
+async def trace_requests(request: Request, call_next):
+    """HTTP middleware: one server span per request."""
+    parent = TraceContext.parse(request.headers.get("traceparent"))
+    context = parent.child() if parent else TraceContext.new_root()
+    token = _current.set(context)
+    start_ns = time.time_ns()
+    status_code, error = 500, None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["traceparent"] = context.traceparent
+        return response
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _export_span(
+            context, parent, f"{request.method} {route_template(request)}",
+            SPAN_KIND_SERVER, start_ns,
+            {
+                "http.method": request.method,
+                "http.target": request.url.path,
+                "http.status_code": status_code,
+            },
+            error or (f"HTTP {status_code}" if status_code >= 500 else None),
+        )
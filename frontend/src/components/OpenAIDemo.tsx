@@ -78,7 +78,7 @@ export default function OpenAIDemo() {
             placeholder="Target language (e.g., Spanish, French, Japanese)"
           />
           <button
-            onClick={() => runTask('Translate Text', () => runTranslate(translateText, targetLanguage), { text: translateText, target_language: targetLanguage })}
+            onClick={() => runTask('Translate Text', () => runTranslate(translateText, targetLanguage, true), { text: translateText, target_language: targetLanguage, stream: true })}
             className="bg-blue-500 text-white px-6 py-2 rounded hover:bg-blue-600 transition w-full"
           >
             Translate
@@ -113,7 +113,7 @@ export default function OpenAIDemo() {
             max="10"
           />
           <button
-            onClick={() => runTask('Summarize Text', () => runSummarize(summarizeText, parseInt(maxSentences)), { text: summarizeText, max_sentences: parseInt(maxSentences) })}
+            onClick={() => runTask('Summarize Text', () => runSummarize(summarizeText, parseInt(maxSentences), true), { text: summarizeText, max_sentences: parseInt(maxSentences), stream: true })}
             className="bg-blue-500 text-white px-6 py-2 rounded hover:bg-blue-600 transition w-full"
           >
             Summarize
@@ -1,8 +1,46 @@
+import { useState } from 'react'
 import { useTaskExecution } from '../contexts/TaskExecutionContext'
 import type { TaskExecution } from '../contexts/TaskExecutionContext'
+import { cancelTask } from '../services/api'
 
 export default function TaskSidebar() {
-  const { tasks, clearTasks } = useTaskExecution()
+  const { tasks, removeTask, clearTasks } = useTaskExecution()
+  const [cancelNotice, setCancelNotice] = useState<string | null>(null)
+
+  // Dismissing a running task cancels its run and every subtask it started
+  const cancelRuns = async (dismissed: TaskExecution[]) => {
+    const runIds = dismissed
+      .filter(t => t.status === 'running' && t.result?.task_run_id)
+      .map(t => t.result!.task_run_id)
+    if (runIds.length === 0) return
+    const results = await Promise.allSettled(runIds.map(id => cancelTask(id)))
+    let running = 0
+    let pending = 0
+    let failed = 0
+    for (const r of results) {
+      if (r.status === 'fulfilled') {
+        running += r.value.data.freed.running || 0
+        pending += (r.value.data.freed.pending || 0) + (r.value.data.freed.paused || 0)
+      } else {
+        failed += 1
+      }
+    }
+    setCancelNotice(
+      `Freed ${running} running and ${pending} queued or paused task runs` +
+        (failed ? ` (${failed} cancellation${failed === 1 ? '' : 's'} failed)` : '')
+    )
+  }
+
+  const dismissTask = (task: TaskExecution) => {
+    removeTask(task.id)
+    cancelRuns([task])
+  }
+
+  const clearAll = () => {
+    const dismissed = tasks
+    clearTasks()
+    cancelRuns(dismissed)
+  }
 
   const runningCount = tasks.filter(t => t.status === 'running').length
   const completedCount = tasks.filter(t => t.status === 'completed').length
@@ -51,7 +89,7 @@ export default function TaskSidebar() {
           <h2 className="text-lg font-semibold text-gray-900">Task Executions</h2>
           {tasks.length > 0 && (
             <button
-              onClick={clearTasks}
+              onClick={clearAll}
               className="text-xs text-gray-500 hover:text-gray-700 px-2 py-1 rounded hover:bg-gray-100"
             >
               Clear All
@@ -59,6 +97,10 @@ export default function TaskSidebar() {
           )}
         </div>
         
+        {cancelNotice && (
+          <div className="mb-2 text-xs text-gray-600">{cancelNotice}</div>
+        )}
+
         {/* Stats */}
         <div className="flex gap-4 text-xs">
           <div className="flex items-center gap-1">
@@ -99,6 +141,13 @@ export default function TaskSidebar() {
                     {formatDuration(task)}
                   </div>
                 </div>
+                <button
+                  onClick={() => dismissTask(task)}
+                  title={task.status === 'running' ? 'Cancel and dismiss' : 'Dismiss'}
+                  className="text-gray-400 hover:text-gray-600 leading-none"
+                >
+                  &times;
+                </button>
               </div>
 
               {/* Inputs */}
@@ -111,6 +160,16 @@ export default function TaskSidebar() {
                 </div>
               )}
 
+              {/* Partial output from streaming tasks */}
+              {task.status === 'running' && task.result?.progress?.text && (
+                <div className="mb-2 text-xs">
+                  <div className="text-gray-600 font-medium mb-1">Streaming:</div>
+                  <div className="bg-white bg-opacity-50 rounded p-2 max-h-32 overflow-y-auto whitespace-pre-wrap">
+                    {task.result.progress.text}
+                  </div>
+                </div>
+              )}
+
               {/* Result */}
               {task.status === 'completed' && task.result && (
                 <div className="text-xs">
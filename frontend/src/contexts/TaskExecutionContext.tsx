@@ -18,6 +18,7 @@ interface TaskExecutionContextType {
   updateTask: (id: string, update: Partial<TaskExecution>) => void
   completeTask: (id: string, result: TaskResponse) => void
   failTask: (id: string, error: string, result?: TaskResponse) => void
+  removeTask: (id: string) => void
   clearTasks: () => void
 }
 
@@ -62,13 +63,17 @@ export function TaskExecutionProvider({ children }: { children: ReactNode }) {
     })
   }
 
+  const removeTask = (id: string) => {
+    setTasks(prev => prev.filter(task => task.id !== id))
+  }
+
   const clearTasks = () => {
     setTasks([])
   }
 
   return (
     <TaskExecutionContext.Provider
-      value={{ tasks, addTask, updateTask, completeTask, failTask, clearTasks }}
+      value={{ tasks, addTask, updateTask, completeTask, failTask, removeTask, clearTasks }}
     >
       {children}
     </TaskExecutionContext.Provider>
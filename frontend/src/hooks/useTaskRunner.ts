@@ -30,17 +30,17 @@ export function useTaskRunner() {
       }
 
       // Task is running — poll until terminal state
-      await pollUntilDone(taskId, data.task_run_id)
+      await pollUntilDone(taskId, data.task_run_id, Boolean(inputs?.stream))
     } catch (err: any) {
       failTask(taskId, err.response?.data?.detail || err.message)
     }
   }
 
-  const pollUntilDone = async (taskId: string, taskRunId: string) => {
+  const pollUntilDone = async (taskId: string, taskRunId: string, withProgress: boolean = false) => {
     while (true) {
       await new Promise(r => setTimeout(r, POLL_INTERVAL))
       try {
-        const res = await getTaskStatus(taskRunId)
+        const res = await getTaskStatus(taskRunId, withProgress)
         const data = res.data
 
         if (data.status === 'completed') {
@@ -51,6 +51,10 @@ export function useTaskRunner() {
           failTask(taskId, data.message || 'Task failed', data)
           return
         }
+        if (data.status === 'canceled') {
+          failTask(taskId, 'Task cancelled', data)
+          return
+        }
         // Still running — update result in case fields changed
         updateTask(taskId, { result: data })
       } catch {
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import type { TaskResponse } from '../types'
+import type { CancelResponse, ResultQuery, TaskListQuery, TaskListResponse, TaskResponse } from '../types'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
@@ -47,11 +47,11 @@ export const runDeepParallelTree = (numbers: number[], chunk_size?: number) =>
 export const runAnalyzeSentiment = (text: string) =>
   api.post<TaskResponse>('/api/openai/analyze_sentiment', { text })
 
-export const runTranslate = (text: string, target_language: string) =>
-  api.post<TaskResponse>('/api/openai/translate', { text, target_language })
+export const runTranslate = (text: string, target_language: string, stream: boolean = false) =>
+  api.post<TaskResponse>('/api/openai/translate', { text, target_language, stream })
 
-export const runSummarize = (text: string, max_sentences: number = 3) =>
-  api.post<TaskResponse>('/api/openai/summarize', { text, max_sentences })
+export const runSummarize = (text: string, max_sentences: number = 3, stream: boolean = false) =>
+  api.post<TaskResponse>('/api/openai/summarize', { text, max_sentences, stream })
 
 // Advanced
 export const runProcessDocument = (document: string, translate_to?: string) =>
@@ -64,7 +64,23 @@ export const runMultiLanguageSummary = (text: string, languages: string[]) =>
   api.post<TaskResponse>('/api/advanced/multi_language_summary', { text, languages })
 
 // Task status polling
-export const getTaskStatus = (taskRunId: string) =>
-  api.get<TaskResponse>(`/api/task/${taskRunId}`)
+export const getTaskStatus = (taskRunId: string, progress: boolean = false, query: ResultQuery = {}) =>
+  api.get<TaskResponse>(`/api/task/${taskRunId}`, {
+    params: {
+      ...(progress ? { progress } : {}),
+      ...query,
+      fields: query.fields?.join(','),
+    },
+  })
+
+// Task runs recorded by the backend, newest first
+export const listTasks = (query: TaskListQuery = {}) =>
+  api.get<TaskListResponse>('/api/tasks', {
+    params: { ...query, status: query.status?.join(',') },
+  })
+
+// Cancel a task run and its subtasks
+export const cancelTask = (taskRunId: string) =>
+  api.delete<CancelResponse>(`/api/task/${taskRunId}`)
 
 export default api
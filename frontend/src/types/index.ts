@@ -4,9 +4,77 @@ export interface TaskResponse {
   status: string
   message: string
   result?: any
+  progress?: TaskProgress
+  page?: ResultPage
+  plan?: string
+  priority?: TaskPriority
+}
+
+// Chosen by the backend at submission (see backend/planning.py)
+export type TaskPriority = 'interactive' | 'batch'
+
+// Part of a completed result to fetch (see backend/results.py)
+export interface ResultQuery {
+  fields?: string[]
+  items?: string
+  limit?: number
+  cursor?: string
+}
+
+export interface ResultPage {
+  items: string
+  offset: number
+  count: number
+  total: number
+  next_cursor: string | null
+}
+
+export interface TaskProgress {
+  task: string
+  seq: number
+  text: string
+  done: boolean
+}
+
+export interface CancelResponse {
+  task_run_id: string
+  status: string
+  message: string
+  cancelled: number
+  freed: Record<string, number>
+  failed: number
 }
 
 export interface ErrorResponse {
   error: string
   detail?: string
 }
+
+// Backend task history (GET /api/tasks)
+export interface TaskRunRecord {
+  id: string
+  task: string
+  status: string
+  submitted_at: number
+  finished_at?: number | null
+  message?: string | null
+  trace_id?: string | null
+  result_bytes?: number | null
+  plan?: string | null
+  priority?: TaskPriority | null
+  input_size?: number | null
+}
+
+export interface TaskListResponse {
+  runs: TaskRunRecord[]
+  next_cursor: string | null
+}
+
+export interface TaskListQuery {
+  task?: string
+  status?: string[]
+  since?: number
+  until?: number
+  limit?: number
+  cursor?: string
+}
@@ -0,0 +1,53 @@
+"""
+backend/explain.py keeps copies of workflow code, since the backend is
+deployed without workflows/. These tests fail when the copies drift.
+"""
+
+import inspect
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "workflows")]
+
+import model_routing  # noqa: E402
+from advanced_tasks import _split_document, process_document_pipeline_streaming  # noqa: E402
+
+from backend import explain  # noqa: E402
+
+DOCUMENTS = [
+    "",
+    "One sentence.",
+    "First paragraph.\n\nSecond paragraph.\n   \nThird.",
+    "A long paragraph. " * 200,
+    ("Short intro.\n\n" + "Sentence one! Sentence two? Sentence three. " * 60 + "\n\nOutro.") * 3,
+    "No sentence boundary " * 300,
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("max_chars", [1, 50, 1500, 10_000])
+def test_split_document_matches(document, max_chars):
+    assert explain.split_document(document, max_chars) == _split_document(document, max_chars)
+
+
+def test_default_chunk_chars_matches():
+    default = inspect.signature(process_document_pipeline_streaming).parameters["chunk_chars"].default
+    assert inspect.signature(explain.explain_pipeline).parameters["chunk_chars"].default == default
+
+
+def test_task_profiles_match():
+    assert explain.CHARS_PER_TOKEN == model_routing.CHARS_PER_TOKEN
+    assert explain.OPENAI_TASKS == {
+        task: (profile.short_input_chars, profile.output_tokens)
+        for task, profile in model_routing.TASK_PROFILES.items()
+    }
+
+
+def test_model_latencies_match():
+    router = model_routing.ModelRouter()
+    fast, strong = router.profiles[router.fast_model], router.profiles[router.strong_model]
+    assert explain.FAST_MODEL_MS == (fast.base_ms, fast.ms_per_output_token)
+    assert explain.STRONG_MODEL_MS == (strong.base_ms, strong.ms_per_output_token)
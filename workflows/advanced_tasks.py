@@ -6,16 +6,45 @@ These tasks show:
 - Complex pipelines combining multiple operations
 - Conditional workflows
 - Data aggregation across subtasks
+- Pipelined stages that overlap instead of running in series
+- Degrading under a deadline: the document pipelines skip optional
+  stages when the time left (see deadline.py) would not cover them
+- Large inputs: parallel_sentiment_analysis takes a dataset handle (see
+  datasets.py) and reads the texts a slice at a time
 """
 
-import asyncio
 import logging
+import re
+import time
 from app import app
+from cancellation import gather_cancelling
+from datasets import is_handle, load, split
+from deadline import remaining_ms
+from model_routing import get_router
 from openai_tasks import analyze_text_sentiment, translate_text, summarize_text
 
 logger = logging.getLogger(__name__)
 
-@app.task
+# Texts of a dataset handle read and analyzed at a time
+SENTIMENT_SLICE = 256
+
+
+async def _fits_budget(*calls: tuple[str, int]) -> bool:
+    """
+    Whether the fast model is expected to finish these (task_type,
+    input_chars) calls, one after another, before the run's deadline.
+    Always true without a deadline.
+    """
+    remaining = remaining_ms()
+    if remaining is None:
+        return True
+    router = get_router()
+    await router.refresh()
+    needed = sum(router.estimate_ms(router.fast_model, task, chars) for task, chars in calls)
+    return needed <= remaining
+
+
+@app.task(plans=("pro",))
 async def process_document_pipeline(document: str, translate_to: str = None) -> dict:
     """
     Complex document processing pipeline with multiple levels of subtasks.
@@ -27,6 +56,11 @@ async def process_document_pipeline(document: str, translate_to: str = None) ->
 
     This demonstrates nested subtask execution - each subtask calling other subtasks.
 
+    Under a deadline, translation is skipped when the three stages would
+    not fit in the time left, and the later stages get the remaining time
+    as their latency budget (cheaper model). The stages skipped are listed
+    under 'degraded'.
+
     Args:
         document: The document to process
         translate_to: Optional language to translate to (e.g., 'Spanish')
@@ -39,6 +73,18 @@ async def process_document_pipeline(document: str, translate_to: str = None) ->
     logger.info(f"[Pipeline Task] Translation target: {translate_to or 'None'}")
 
     results = {"original_document": document}
+    degraded = []
+
+    if translate_to and not await _fits_budget(
+        ("translate_text", len(document)),
+        ("summarize_text", len(document)),
+        ("analyze_text_sentiment", 0),
+    ):
+        logger.warning(
+            f"[Pipeline Task] Skipping translation: {remaining_ms():.0f}ms left before the deadline"
+        )
+        degraded.append("translation")
+        translate_to = None
 
     # Level 1: Translation (if requested)
     if translate_to:
@@ -52,7 +98,7 @@ async def process_document_pipeline(document: str, translate_to: str = None) ->
 
     # Level 2: Summarization
     logger.info("[Pipeline Task] → Level 2: Calling summarize_text subtask...")
-    summary = await summarize_text(text_to_summarize, max_sentences=2)
+    summary = await summarize_text(text_to_summarize, 2)
     results["summary"] = summary
 
     # Level 3: Sentiment Analysis
@@ -62,33 +108,229 @@ async def process_document_pipeline(document: str, translate_to: str = None) ->
     sentiment = await analyze_text_sentiment(summary)
     results["sentiment_analysis"] = sentiment
 
+    if degraded:
+        results["degraded"] = degraded
+
     logger.info("[Pipeline Task] Pipeline complete!")
     logger.info(f"[Pipeline Task] Final sentiment: {sentiment['sentiment']}")
 
     return results
 
 
-@app.task
-async def parallel_sentiment_analysis(texts: list[str]) -> dict:
+def _split_document(document: str, max_chars: int) -> list[str]:
+    """
+    Split a document into chunks of at most ~max_chars characters.
+
+    Paragraph boundaries are preferred; paragraphs that are too long are
+    split on sentence boundaries. A single sentence is never broken up.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", document.strip()):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(re.split(r"(?<=[.!?])\s+", paragraph))
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks or [document]
+
+
+class _StageTimings:
+    """Track when each pipeline stage first started and last finished."""
+
+    def __init__(self):
+        self._origin = time.monotonic()
+        self._spans: dict[str, list[float]] = {}
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def record(self, stage: str, started: float) -> None:
+        start_ms = (started - self._origin) * 1000
+        end_ms = (time.monotonic() - self._origin) * 1000
+        span = self._spans.get(stage)
+        if span is None:
+            self._spans[stage] = [start_ms, end_ms]
+        else:
+            span[0] = min(span[0], start_ms)
+            span[1] = max(span[1], end_ms)
+
+    def as_dict(self) -> dict:
+        timings = {
+            stage: {
+                "start_ms": round(start, 1),
+                "end_ms": round(end, 1),
+                "duration_ms": round(end - start, 1),
+            }
+            for stage, (start, end) in self._spans.items()
+        }
+        timings["total_ms"] = round((time.monotonic() - self._origin) * 1000, 1)
+        return timings
+
+
+@app.task(plans=("pro",))
+async def process_document_pipeline_streaming(
+    document: str,
+    translate_to: str = None,
+    analyze_original: bool = False,
+    chunk_chars: int = 1500,
+) -> dict:
+    """
+    Pipelined variant of process_document_pipeline.
+
+    The document is split into chunks that flow through the stages
+    independently, so stages overlap instead of running in series:
+
+      per chunk:  translate → summarize → sentiment (on the partial summary)
+      then:       summarize the chunk summaries → final sentiment
+
+    Summarization of chunk 1 starts as soon as its translation arrives,
+    while other chunks are still being translated. With analyze_original,
+    sentiment of the original text runs in parallel with translation.
+    A document that fits in one chunk makes the same calls as the serial
+    pipeline.
+
+    Args:
+        document: The document to process
+        translate_to: Optional language to translate to (e.g., 'Spanish')
+        analyze_original: Also analyze sentiment of the untranslated text
+        chunk_chars: Approximate maximum chunk size in characters
+
+    Returns:
+        dict with the same keys as process_document_pipeline, plus
+        'chunk_sentiments' and 'stage_timings' (ms offsets per stage)
+    """
+    chunks = _split_document(document, chunk_chars)
+    degraded = []
+    # Chunks run in parallel, so the budget has to cover one chunk's stages
+    # plus the final reduce (when there is more than one chunk)
+    longest = max((len(chunk) for chunk in chunks), default=0)
+    reduce_calls = [("summarize_text", 0), ("analyze_text_sentiment", 0)] if len(chunks) > 1 else []
+    if translate_to and not await _fits_budget(
+        ("translate_text", longest), ("summarize_text", longest),
+        ("analyze_text_sentiment", 0), *reduce_calls,
+    ):
+        degraded.append("translation")
+        translate_to = None
+    if analyze_original and not await _fits_budget(("analyze_text_sentiment", len(document))):
+        degraded.append("original_sentiment")
+        analyze_original = False
+    if degraded:
+        logger.warning(
+            f"[Pipelined Pipeline] Skipping {', '.join(degraded)}: "
+            f"{remaining_ms():.0f}ms left before the deadline"
+        )
+
+    logger.info(
+        f"[Pipelined Pipeline] Starting: {len(document)} chars in {len(chunks)} chunks, "
+        f"translation target: {translate_to or 'None'}"
+    )
+    timings = _StageTimings()
+
+    async def run_chunk(chunk: str) -> tuple[str, str, dict]:
+        text = chunk
+        if translate_to:
+            started = timings.now()
+            text = await translate_text(chunk, translate_to)
+            timings.record("translate", started)
+
+        started = timings.now()
+        chunk_summary = await summarize_text(text, 2)
+        timings.record("summarize", started)
+
+        started = timings.now()
+        chunk_sentiment = await analyze_text_sentiment(chunk_summary)
+        timings.record("sentiment", started)
+        return text, chunk_summary, chunk_sentiment
+
+    async def run_original_sentiment() -> dict:
+        started = timings.now()
+        sentiment = await analyze_text_sentiment(document)
+        timings.record("original_sentiment", started)
+        return sentiment
+
+    chunk_runs = gather_cancelling(*(run_chunk(chunk) for chunk in chunks))
+    if analyze_original:
+        chunk_results, original_sentiment = await gather_cancelling(
+            chunk_runs, run_original_sentiment()
+        )
+    else:
+        chunk_results, original_sentiment = await chunk_runs, None
+
+    translated_chunks = [r[0] for r in chunk_results]
+    chunk_summaries = [r[1] for r in chunk_results]
+    chunk_sentiments = [r[2] for r in chunk_results]
+
+    if len(chunks) == 1:
+        summary, sentiment = chunk_summaries[0], chunk_sentiments[0]
+    else:
+        logger.info(f"[Pipelined Pipeline] → Reducing {len(chunks)} chunk summaries...")
+        started = timings.now()
+        summary = await summarize_text("\n".join(chunk_summaries), 2)
+        timings.record("summarize", started)
+
+        started = timings.now()
+        sentiment = await analyze_text_sentiment(summary)
+        timings.record("sentiment", started)
+
+    results = {"original_document": document}
+    if translate_to:
+        results["translated_text"] = "\n\n".join(translated_chunks)
+    results["summary"] = summary
+    results["sentiment_analysis"] = sentiment
+    results["chunk_sentiments"] = chunk_sentiments
+    if original_sentiment is not None:
+        results["original_sentiment"] = original_sentiment
+    results["stage_timings"] = timings.as_dict()
+    if degraded:
+        results["degraded"] = degraded
+
+    logger.info(
+        f"[Pipelined Pipeline] Complete in {results['stage_timings']['total_ms']}ms, "
+        f"final sentiment: {sentiment['sentiment']}"
+    )
+    return results
+
+
+@app.task(plans=("pro",))
+async def parallel_sentiment_analysis(texts: list[str] | dict) -> dict:
     """
     Analyze multiple text snippets in parallel using concurrent subtask execution.
 
     This demonstrates how to execute multiple subtasks concurrently using
-    asyncio.gather().
+    asyncio.gather(); gather_cancelling also stops the other analyses
+    when one fails or the run is cancelled.
+
+    A dataset handle is read SENTIMENT_SLICE texts at a time, each slice
+    analyzed in parallel, so only one slice of texts is held at once.
 
     Args:
-        texts: List of text snippets to analyze
+        texts: List of text snippets to analyze, or a dataset handle
 
     Returns:
         dict with 'results' (list of sentiment analyses) and 'summary'
         (aggregated stats)
     """
-    logger.info(f"[Parallel Analysis] Starting analysis of {len(texts)} text snippets")
+    if is_handle(texts):
+        logger.info(f"[Parallel Analysis] Starting analysis of dataset {texts['dataset']}")
+        results = []
+        for part in split(texts, SENTIMENT_SLICE):
+            results.extend(await gather_cancelling(*(analyze_text_sentiment(t) for t in load(part))))
+    else:
+        logger.info(f"[Parallel Analysis] Starting analysis of {len(texts)} text snippets")
 
-    # Execute all sentiment analyses in parallel
-    logger.info("[Parallel Analysis] → Launching parallel subtasks...")
-    sentiment_tasks = [analyze_text_sentiment(text) for text in texts]
-    results = await asyncio.gather(*sentiment_tasks)
+        # Execute all sentiment analyses in parallel
+        logger.info("[Parallel Analysis] → Launching parallel subtasks...")
+        sentiment_tasks = [analyze_text_sentiment(text) for text in texts]
+        results = await gather_cancelling(*sentiment_tasks)
 
     logger.info("[Parallel Analysis] → All parallel subtasks completed")
 
@@ -105,12 +347,13 @@ async def parallel_sentiment_analysis(texts: list[str]) -> dict:
     return {
         "results": results,
         "summary": sentiment_counts,
-        "total": len(texts),
+        "total": len(results),
+        # A handle stays a handle: the texts are not copied into the result
         "texts": texts
     }
 
 
-@app.task
+@app.task(plans=("pro",))
 async def multi_language_summary(text: str, languages: list[str]) -> dict:
     """
     Generate summaries in multiple languages in parallel.
@@ -131,14 +374,14 @@ async def multi_language_summary(text: str, languages: list[str]) -> dict:
 
     # Step 1: Summarize the original text
     logger.info("[Multi-Language] → Step 1: Summarizing original text...")
-    original_summary = await summarize_text(text, max_sentences=3)
+    original_summary = await summarize_text(text, 3)
 
     # Step 2: Translate summary to all languages in parallel
     logger.info(f"[Multi-Language] → Step 2: Translating to {languages}...")
     translation_tasks = [
         translate_text(original_summary, lang) for lang in languages
     ]
-    translations = await asyncio.gather(*translation_tasks)
+    translations = await gather_cancelling(*translation_tasks)
 
     # Build result dictionary
     results = {
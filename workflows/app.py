@@ -4,10 +4,114 @@ All task modules import `app` from here. Kept separate from main.py
 to avoid circular imports when main.py imports the task modules.
 """
 
+import functools
+import inspect
+
 from render_sdk import Retry, Workflows
+from render_sdk.workflows.task import TaskRegistry, _current_client
+
+from deadline import deadline_aware
+from log_config import sampled
+from metrics import instrumented
+from offload import offloaded
+from retry_policy import RetryPolicy, retried, runtime_retry
+from trace_context import traced
+
+
+# Separates a task's name from the plan of one of its variants
+PLAN_VARIANT_SEPARATOR = "__"
+DEFAULT_PLAN = "standard"
+
+
+def plan_variant(name: str, plan: str) -> str:
+    """Name of the variant of task `name` registered on `plan`."""
+    return f"{name}{PLAN_VARIANT_SEPARATOR}{plan}"
+
+
+class _PlanClient:
+    """Wraps the subtask client to start subtasks' variants on the caller's plan."""
+
+    def __init__(self, client, plan: str, registry: TaskRegistry):
+        self._client = client
+        self._plan = plan
+        self._registry = registry
+
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None):
+        variant = plan_variant(task_name, self._plan)
+        if self._registry.get_task(variant) is not None:
+            task_name = variant
+        return await self._client.run_subtask(task_name, input_data)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def on_plan(func, plan: str, registry: TaskRegistry):
+    """Wrap the task function of a variant on `plan` to keep its subtasks there."""
+    if not inspect.iscoroutinefunction(func):
+        # Sync tasks start no subtasks
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        client = _current_client.get(None)
+        if client is None:
+            return await func(*args, **kwargs)
+        token = _current_client.set(_PlanClient(client, plan, registry))
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current_client.reset(token)
+
+    return wrapper
+
+
+class InstrumentedWorkflows(Workflows):
+    """
+    Workflows whose tasks receive and propagate trace context (see
+    trace_context.py) and deadlines (see deadline.py), retry transient
+    failures in-process (see retry_policy.py), record run metrics (see
+    metrics.py) and follow LOG_SAMPLE (see log_config.py).
+
+    The `retry` option configures retry_policy; Render itself only keeps
+    RUNTIME_RETRIES retries for infrastructure failures, and its
+    `timeout_seconds` is stretched to cover the in-process attempts.
+
+    Sync tasks run on a thread pool and tasks registered with
+    `cpu_bound=True` (or a predicate such as offload.big_ints) on a
+    process pool, instead of blocking the event loop (see offload.py).
+
+    A task's plan is fixed when it is registered, so `plans=("pro",)`
+    also registers the task as `<name>__pro` on that plan. The backend
+    starts a variant when the input is large (see backend/planning.py),
+    and a variant starts the variants of its subtasks on the same plan
+    where they have one, so the phases doing the work move with it.
+    """
+
+    def task(self, func=None, *, retry=None, plans=(), cpu_bound=False, timeout_seconds=None, **options):
+        policy = RetryPolicy.from_retry(
+            retry if retry is not None else self._default_retry,
+            timeout_seconds if timeout_seconds is not None else self._default_timeout,
+        )
+        base_task = super().task
+        options = {**options, "retry": runtime_retry(), "timeout_seconds": policy.run_timeout()}
+        register = base_task(**options)
+
+        def wrap(f):
+            wrapped = instrumented(traced(deadline_aware(retried(offloaded(sampled(f), cpu_bound), policy))))
+            name = options.get("name") or f.__name__
+            for plan in plans:
+                variant = on_plan(wrapped, plan, self._registry)
+                base_task(**{**options, "name": plan_variant(name, plan), "plan": plan})(variant)
+            return register(wrapped)
+
+        if func is None:
+            return wrap
+        return wrap(func)
+
 
-app = Workflows(
+app = InstrumentedWorkflows(
     default_retry=Retry(max_retries=3, wait_duration_ms=1000, backoff_scaling=2.0),
     default_timeout=300,
-    default_plan="standard",
+    default_plan=DEFAULT_PLAN,
 )
@@ -3,27 +3,28 @@ Basic task examples demonstrating simple sync and async patterns.
 
 These tasks show:
 - Simple synchronous functions
-- Async functions
 - Type annotations
 - Retry configuration
+- Sync tasks off the event loop (cpu_bound: see offload.py)
 """
 
 import logging
 from app import app
+from offload import big_ints
 from render_sdk import Retry
 
 logger = logging.getLogger(__name__)
 
-@app.task
+@app.task(cpu_bound=big_ints)
 def square(a: int) -> int:
     """Synchronous task: Square a number."""
-    logger.info(f"Computing square of {a}")
+    logger.info("Computing square of %s", a)
     return a * a
 
-@app.task
-async def cube(a: int) -> int:
-    """Async task: Cube a number."""
-    logger.info(f"Computing cube of {a}")
+@app.task(cpu_bound=big_ints)
+def cube(a: int) -> int:
+    """Synchronous task: Cube a number."""
+    logger.info("Computing cube of %s", a)
     return a * a * a
 
 @app.task(
@@ -32,17 +33,17 @@ async def cube(a: int) -> int:
 )
 def add_numbers(a: int, b: int) -> int:
     """Add two numbers with retry configuration."""
-    logger.info(f"Adding {a} + {b}")
+    logger.info("Adding %s + %s", a, b)
     return a + b
 
 @app.task
 def greet(name: str) -> str:
     """Simple greeting task."""
-    logger.info(f"Greeting {name}")
+    logger.info("Greeting %s", name)
     return f"Hello, {name}! Welcome to Render Workflows."
 
-@app.task
+@app.task(cpu_bound=big_ints)
 def multiply(a: int, b: int) -> int:
     """Multiply two numbers."""
-    logger.info(f"Multiplying {a} * {b}")
+    logger.info("Multiplying %s * %s", a, b)
     return a * b
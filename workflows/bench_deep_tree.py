@@ -0,0 +1,140 @@
+"""
+Benchmark deep_parallel_tree across input sizes and shapes.
+
+Runs the tree on the local executor over a grid of `numbers` lengths and
+`chunk_size` values, with an injectable per-task latency standing in for
+the Render runtime's scheduling overhead. For each cell it records:
+
+- wall time (median over repeats)
+- critical-path length (longest chain of dependent task runs)
+- actual subtask count vs. the task's own `total_tasks_approx`
+- peak in-flight tasks
+- payload bytes (JSON-encoded arguments and results)
+
+Results are written as JSON so runs from different commits can be
+compared with --compare.
+
+Usage:
+    python bench_deep_tree.py
+    python bench_deep_tree.py --sizes 12 48 192 --chunk-sizes 2 4 8 --latency-ms 2
+    python bench_deep_tree.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_executor import LocalExecutor  # noqa: E402
+
+DEFAULT_SIZES = [12, 48, 192, 768]
+DEFAULT_CHUNK_SIZES = [2, 4, 8, 16]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_cell(app, size: int, chunk_size: int, latency_ms: float, repeats: int) -> dict:
+    """Run one (size, chunk_size) cell `repeats` times."""
+    numbers = list(range(1, size + 1))
+    wall_times = []
+    for _ in range(repeats):
+        executor = LocalExecutor(app, task_latency_ms=latency_ms)
+        started = time.perf_counter()
+        result = executor.run_sync("deep_parallel_tree", [numbers, chunk_size])
+        wall_times.append(time.perf_counter() - started)
+        executor.close()
+
+    stats = executor.stats
+    return {
+        "size": size,
+        "chunk_size": chunk_size,
+        "wall_time_s": statistics.median(wall_times),
+        "wall_time_min_s": min(wall_times),
+        "critical_path": stats.critical_path,
+        "subtasks": stats.task_runs - 1,
+        "total_tasks_approx": result["total_tasks_approx"],
+        "peak_in_flight": stats.peak_in_flight,
+        "payload_bytes": stats.payload_bytes,
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print wall-time deltas against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["size"], r["chunk_size"]): r for r in baseline["results"]}
+
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):")
+    for row in current["results"]:
+        old = before.get((row["size"], row["chunk_size"]))
+        if old is None:
+            continue
+        delta = (row["wall_time_s"] - old["wall_time_s"]) / old["wall_time_s"] * 100
+        print(
+            f"  size={row['size']:>5} chunk={row['chunk_size']:>3}  "
+            f"{old['wall_time_s']*1000:9.1f}ms -> {row['wall_time_s']*1000:9.1f}ms  ({delta:+.1f}%)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark deep_parallel_tree locally")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=DEFAULT_CHUNK_SIZES)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated overhead per task run")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="bench_deep_tree.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    # Per-task INFO lines would dominate the measurement (main.py sets
+    # up logging from LOG_LEVEL, see log_config.py)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from main import app
+
+    results = []
+    print(f"{'size':>6} {'chunk':>6} {'wall ms':>10} {'crit':>5} {'subtasks':>9} "
+          f"{'approx':>7} {'peak':>6} {'bytes':>10}")
+    for size in args.sizes:
+        for chunk_size in args.chunk_sizes:
+            row = bench_cell(app, size, chunk_size, args.latency_ms, args.repeats)
+            results.append(row)
+            print(
+                f"{row['size']:>6} {row['chunk_size']:>6} {row['wall_time_s']*1000:>10.1f} "
+                f"{row['critical_path']:>5} {row['subtasks']:>9} {row['total_tasks_approx']:>7} "
+                f"{row['peak_in_flight']:>6} {row['payload_bytes']:>10}"
+            )
+
+    output = {
+        "benchmark": "deep_parallel_tree",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency_ms,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark worker logging modes.
+
+Measures what logging costs a task, for each of log_config.py's modes:
+
+- sync:      every record formatted and written by the caller (the old
+             basicConfig setup)
+- async:     records handed to a background thread through a queue
+- sampled:   async, with 1 in 100 tree task runs logging (LOG_SAMPLE)
+- gated:     parallel_tasks at WARNING (LOG_LEVELS), so leaf calls return
+             before a record is built
+
+Two measurements per mode, with output going to a file:
+
+1. Per-call cost of the tree_square log line in a tight loop, from the
+   caller's side, plus the time to drain the queue afterwards. An eager
+   f-string call through the sync handler is included as the baseline
+   the task modules used before.
+2. deep_parallel_tree end to end on the local executor: wall time and
+   lines written.
+
+Usage:
+    python bench_logging.py
+    python bench_logging.py --calls 200000 --size 1536 --output after.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_deep_tree import _git_commit  # noqa: E402
+from local_executor import LocalExecutor  # noqa: E402
+from log_config import configure_logging, flush_logging, sampled  # noqa: E402
+
+MODES = {
+    "sync": {},
+    "async": {"LOG_ASYNC": "1"},
+    "sampled": {"LOG_ASYNC": "1", "LOG_SAMPLE": "tree_*=0.01"},
+    "gated": {"LOG_LEVELS": "parallel_tasks=WARNING"},
+}
+LOG_ENV = ("LOG_LEVEL", "LOG_LEVELS", "LOG_SAMPLE", "LOG_ASYNC")
+
+
+def _configure(env: dict, stream) -> None:
+    for key in LOG_ENV:
+        os.environ.pop(key, None)
+    os.environ.update(env)
+    # Loggers keep levels from a previous mode's LOG_LEVELS
+    for name in ("parallel_tasks", "basic_tasks"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    configure_logging(stream)
+
+
+def _count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def tree_square(logger: logging.Logger, n: int, eager: bool) -> None:
+    """The leaf task's log line; each call stands for one task run."""
+    if eager:
+        logger.info(f"[L3 tree_square] {n}² = {n*n}")
+    else:
+        logger.info("[L3 tree_square] %s² = %s", n, n * n)
+
+
+def bench_calls(env: dict, calls: int, eager: bool, tmpdir: str) -> dict:
+    """Per-call cost of the leaf log line, caller side and including drain."""
+    path = os.path.join(tmpdir, "calls.log")
+    with open(path, "w") as stream:
+        _configure(env, stream)
+        logger = logging.getLogger("parallel_tasks")
+        run = sampled(tree_square)
+        started = time.perf_counter()
+        for n in range(calls):
+            run(logger, n, eager)
+        caller = time.perf_counter() - started
+        flush_logging()
+        drained = time.perf_counter() - started
+    return {
+        "caller_us_per_call": caller / calls * 1e6,
+        "drained_us_per_call": drained / calls * 1e6,
+        "lines": _count_lines(path),
+    }
+
+
+def bench_tree(app, size: int, repeats: int, tmpdir: str) -> dict:
+    """
+    deep_parallel_tree wall time per logging mode.
+
+    Modes are interleaved within each repeat so that drift (thermal,
+    other load) spreads evenly over them.
+    """
+    numbers = list(range(1, size + 1))
+    wall_times = {mode: [] for mode in MODES}
+    results = {}
+    for _ in range(repeats):
+        for mode, env in MODES.items():
+            path = os.path.join(tmpdir, f"tree-{mode}.log")
+            with open(path, "w") as stream:
+                _configure(env, stream)
+                gc.collect()
+                executor = LocalExecutor(app)
+                started = time.perf_counter()
+                executor.run_sync("deep_parallel_tree", [numbers, 4])
+                flush_logging()
+                wall_times[mode].append(time.perf_counter() - started)
+                executor.close()
+            results[mode] = {
+                "task_runs": executor.stats.task_runs,
+                "lines": _count_lines(path),
+            }
+    for mode, row in results.items():
+        row["wall_time_s"] = statistics.median(wall_times[mode])
+        row["wall_time_min_s"] = min(wall_times[mode])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark worker logging modes")
+    parser.add_argument("--calls", type=int, default=100_000, help="Log calls per mode in the tight loop")
+    parser.add_argument("--size", type=int, default=768, help="deep_parallel_tree input length")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="bench_logging.json")
+    args = parser.parse_args()
+
+    from main import app
+
+    results = {"calls": {}, "tree": {}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results["calls"]["eager"] = bench_calls({}, args.calls, True, tmpdir)
+        for mode, env in MODES.items():
+            results["calls"][mode] = bench_calls(env, args.calls, False, tmpdir)
+        results["tree"] = bench_tree(app, args.size, args.repeats, tmpdir)
+    _configure({"LOG_LEVEL": "WARNING"}, sys.stderr)
+
+    print(f"Leaf log line, {args.calls} calls:")
+    print(f"  {'mode':<8} {'caller µs':>10} {'drained µs':>11} {'lines':>8}")
+    for mode, row in results["calls"].items():
+        print(f"  {mode:<8} {row['caller_us_per_call']:>10.2f} "
+              f"{row['drained_us_per_call']:>11.2f} {row['lines']:>8}")
+
+    baseline = results["tree"]["sync"]["wall_time_s"]
+    print(f"\ndeep_parallel_tree, {args.size} numbers:")
+    print(f"  {'mode':<8} {'wall ms':>9} {'min ms':>8} {'vs sync':>8} {'tasks':>7} {'lines':>7}")
+    for mode, row in results["tree"].items():
+        delta = (row["wall_time_s"] - baseline) / baseline * 100
+        print(f"  {mode:<8} {row['wall_time_s']*1000:>9.1f} {row['wall_time_min_s']*1000:>8.1f} {delta:>+7.1f}% "
+              f"{row['task_runs']:>7} {row['lines']:>7}")
+
+    output = {
+        "benchmark": "logging",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "calls": args.calls,
+        "size": args.size,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
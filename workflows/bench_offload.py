@@ -0,0 +1,193 @@
+"""
+Benchmark running sync and CPU-bound tasks off the event loop.
+
+Two workloads on the local executor, where every task shares one event
+loop the way coroutines share a worker's loop:
+
+- tree:     deep_parallel_tree over big integers. Its leaves are the
+            cpu_bound arithmetic tasks, but most of its CPU time is the
+            JSON round trip of their arguments and results, which the
+            executor (like the runtime) does on the loop.
+- compute:  --tasks concurrent runs of a cpu_bound task that does exact
+            big-integer arithmetic on a small payload, the case the
+            pools are for.
+
+A probe coroutine standing in for async I/O (a subtask call waiting on
+the network, a heartbeat) sleeps PROBE_MS at a time and records how late
+it wakes up. Per mode (see offload.py):
+
+- inline:   TASK_POOL=off, TASK_CPU_POOL=off: sync and cpu_bound tasks
+            run on the loop, as the SDK runs them
+- thread:   both on a thread pool
+- process:  sync tasks on a thread pool, cpu_bound ones on a process pool
+
+it reports wall time, the probe's wake-up lag (p50, p99, max) and the
+probe wake-ups per second, the I/O concurrency left while the workload
+computes. Pools are sized by --workers (default: the machine's cores);
+the process pool only adds throughput with more than one core.
+
+Usage:
+    python bench_offload.py
+    python bench_offload.py --workloads compute --tasks 64 --rounds 400 --workers 4
+    python bench_offload.py --workloads tree --size 256 --bits 2300 --output after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_deep_tree import _git_commit  # noqa: E402
+from local_executor import LocalExecutor  # noqa: E402
+
+MODES = {
+    "inline": {"TASK_POOL": "off", "TASK_CPU_POOL": "off"},
+    "thread": {"TASK_POOL": "thread", "TASK_CPU_POOL": "thread"},
+    "process": {"TASK_POOL": "thread", "TASK_CPU_POOL": "process"},
+}
+PROBE_MS = 1.0
+COMPUTE_TASK = "bench_offload_compute"
+# A Mersenne prime: squaring modulo it keeps the payload small
+MODULUS = 2**4423 - 1
+
+
+def _compute(seed: int, rounds: int) -> int:
+    """Repeated squaring modulo MODULUS; about 50 µs per round."""
+    x = seed
+    for _ in range(rounds):
+        x = (x * x + 1) % MODULUS
+    return x % 1_000_000_007
+
+
+async def _probe(done: asyncio.Event, lags: list[float]) -> None:
+    """Sleep PROBE_MS at a time until done, recording how late each wake-up is."""
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_MS / 1000)
+        lags.append(max(0.0, (time.perf_counter() - started) * 1000 - PROBE_MS))
+
+
+async def _run_once(app, calls: list[tuple[str, list]], latency_ms: float) -> tuple[float, list[float], list]:
+    """Run the calls concurrently next to the probe; (wall time, probe lags, results)."""
+    done = asyncio.Event()
+    lags: list[float] = []
+    probe = asyncio.create_task(_probe(done, lags))
+    with LocalExecutor(app, task_latency_ms=latency_ms) as executor:
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(executor.run(task, data) for task, data in calls))
+        finally:
+            wall = time.perf_counter() - started
+            done.set()
+            await probe
+    return wall, lags, results
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def bench_mode(app, workload: str, mode: str, calls: list[tuple[str, list]], latency_ms: float, repeats: int) -> dict:
+    """Run the workload's calls `repeats` times with the pools of `mode`."""
+    import offload
+
+    os.environ.update(MODES[mode])
+    walls, lags, outputs = [], [], set()
+    try:
+        for _ in range(repeats):
+            wall, run_lags, results = asyncio.run(_run_once(app, calls, latency_ms))
+            walls.append(wall)
+            lags.extend(run_lags)
+            outputs.add(json.dumps(results, sort_keys=True))
+    finally:
+        offload.shutdown_pools()
+    return {
+        "workload": workload,
+        "mode": mode,
+        "wall_time_s": statistics.median(walls),
+        "wall_time_min_s": min(walls),
+        "probe_lag_p50_ms": _percentile(lags, 0.5),
+        "probe_lag_p99_ms": _percentile(lags, 0.99),
+        "probe_lag_max_ms": max(lags, default=0.0),
+        "probe_wakeups_per_s": len(lags) / sum(walls),
+        # Every repeat must compute the same results
+        "consistent": len(outputs) == 1,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark task offloading on the local executor")
+    parser.add_argument("--workloads", nargs="+", choices=["tree", "compute"], default=["tree", "compute"])
+    parser.add_argument("--size", type=int, default=256, help="Numbers in the tree's input")
+    parser.add_argument("--bits", type=int, default=2300,
+                        help="Bits per number (products of cubes must stay under 4300 digits)")
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=32, help="Concurrent compute task runs")
+    parser.add_argument("--rounds", type=int, default=600, help="Squarings per compute task run")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated overhead per task run")
+    parser.add_argument("--workers", type=int, help="Pool size (TASK_POOL_WORKERS)")
+    parser.add_argument("--min-bits", type=int, help="TASK_CPU_MIN_BITS for cpu_bound tasks")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_offload.json")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.workers:
+        os.environ["TASK_POOL_WORKERS"] = str(args.workers)
+    if args.min_bits is not None:
+        os.environ["TASK_CPU_MIN_BITS"] = str(args.min_bits)
+    from main import app
+    from offload import pool_workers
+
+    app.task(cpu_bound=True, name=COMPUTE_TASK)(_compute)
+    rng = random.Random(args.seed)
+    workloads = {
+        "tree": [("deep_parallel_tree", [[rng.getrandbits(args.bits) for _ in range(args.size)], args.chunk_size])],
+        "compute": [(COMPUTE_TASK, [rng.getrandbits(4096), args.rounds]) for _ in range(args.tasks)],
+    }
+
+    results = []
+    print(f"{'workload':>8} {'mode':>8} {'wall ms':>10} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'wakeups/s':>10}")
+    for workload in args.workloads:
+        for mode in args.modes:
+            row = bench_mode(app, workload, mode, workloads[workload], args.latency_ms, args.repeats)
+            results.append(row)
+            print(
+                f"{workload:>8} {mode:>8} {row['wall_time_s']*1000:>10.1f} {row['probe_lag_p50_ms']:>8.2f} "
+                f"{row['probe_lag_p99_ms']:>8.2f} {row['probe_lag_max_ms']:>8.2f} "
+                f"{row['probe_wakeups_per_s']:>10.0f}"
+            )
+
+    output = {
+        "benchmark": "offload",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cores": os.cpu_count(),
+        "workers": pool_workers(),
+        "size": args.size,
+        "bits": args.bits,
+        "chunk_size": args.chunk_size,
+        "tasks": args.tasks,
+        "rounds": args.rounds,
+        "latency_ms": args.latency_ms,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
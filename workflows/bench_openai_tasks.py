@@ -0,0 +1,191 @@
+"""
+Benchmark the OpenAI task family against the offline stub.
+
+Starts openai_stub.py in-process, points the OpenAI client at it through
+OPENAI_BASE_URL and runs the fan-out tasks on the local executor:
+
+- parallel_sentiment_analysis: `--fan-out` texts analyzed concurrently
+- multi_language_summary: one summary, then `--fan-out` translations
+- process_document_pipeline: translate -> summarize -> sentiment in series
+
+For each scenario it records (median over repeats):
+
+- end-to-end latency
+- fan-out efficiency: time the stub spent serving calls divided by
+  wall time, relative to the scenario's fan-out width (1.0 means the
+  branches fully overlapped)
+- retry amplification: OpenAI requests sent per completed call, counting
+  both the OpenAI client's own 429 retries and task-level retries
+
+Usage:
+    python bench_openai_tasks.py
+    python bench_openai_tasks.py --median-ms 300 --rate-limit 0.1 --fan-out 16
+    python bench_openai_tasks.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_deep_tree import _git_commit  # noqa: E402
+from local_executor import LocalExecutor  # noqa: E402
+from openai_stub import StubConfig, start_in_thread  # noqa: E402
+
+SAMPLE_TEXTS = [
+    "I love this product, it exceeded every expectation.",
+    "The delivery was late and the box arrived damaged.",
+    "It works. Nothing special, nothing wrong.",
+    "Customer support resolved my issue in minutes!",
+]
+
+LANGUAGES = ["Spanish", "French", "German", "Japanese", "Italian", "Portuguese", "Korean", "Dutch"]
+
+DOCUMENT = (
+    "Render Workflows lets you define tasks in plain Python and run them on managed "
+    "infrastructure. Tasks can call other tasks, fan out in parallel and retry on failure. "
+) * 8
+
+
+def scenarios(fan_out: int) -> list[tuple[str, str, list, int]]:
+    """(label, task, input, fan-out width) for each benchmarked run."""
+    texts = [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} (#{i})" for i in range(fan_out)]
+    languages = [LANGUAGES[i % len(LANGUAGES)] + ("" if i < len(LANGUAGES) else f" {i}")
+                 for i in range(fan_out)]
+    return [
+        ("parallel_sentiment", "parallel_sentiment_analysis", [texts], fan_out),
+        ("multi_language_summary", "multi_language_summary", [DOCUMENT, languages], fan_out),
+        ("document_pipeline", "process_document_pipeline", [DOCUMENT, "Spanish"], 1),
+    ]
+
+
+def bench_scenario(app, server, task: str, input_data: list, width: int,
+                   repeats: int, retry_waits: bool) -> dict:
+    """Run one scenario `repeats` times against a fresh stub counter set."""
+    state = server.RequestHandlerClass.state
+    wall_times, efficiencies, amplifications = [], [], []
+    requests = rate_limited = task_retries = 0
+    for _ in range(repeats):
+        state.reset()
+        executor = LocalExecutor(app, retry_waits=retry_waits)
+        started = time.perf_counter()
+        executor.run_sync(task, input_data)
+        wall = time.perf_counter() - started
+        executor.close()
+
+        stub = state.snapshot()
+        wall_times.append(wall)
+        efficiencies.append(stub.get("total_latency_ms", 0) / 1000 / wall / width)
+        amplifications.append(stub.get("requests", 0) / max(1, stub.get("completed", 0)))
+        requests += stub.get("requests", 0)
+        rate_limited += stub.get("rate_limited", 0)
+        task_retries += executor.stats.retries
+
+    return {
+        "fan_out": width,
+        "wall_time_s": statistics.median(wall_times),
+        "wall_time_max_s": max(wall_times),
+        "fan_out_efficiency": statistics.median(efficiencies),
+        "retry_amplification": statistics.median(amplifications),
+        "openai_requests": requests / repeats,
+        "rate_limited": rate_limited / repeats,
+        "task_retries": task_retries / repeats,
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print wall-time deltas against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {r["scenario"]: r for r in baseline["results"]}
+
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):")
+    for row in current["results"]:
+        old = before.get(row["scenario"])
+        if old is None:
+            continue
+        delta = (row["wall_time_s"] - old["wall_time_s"]) / old["wall_time_s"] * 100
+        print(
+            f"  {row['scenario']:<24} {old['wall_time_s']*1000:9.1f}ms -> "
+            f"{row['wall_time_s']*1000:9.1f}ms  ({delta:+.1f}%)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the OpenAI tasks against a local stub")
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--median-ms", type=float, default=200.0, help="Stub median latency")
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-multiplier", type=float, default=8.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of stub requests answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-retry-waits", action="store_true", help="Skip task-level retry waits")
+    parser.add_argument("--output", default="bench_openai_tasks.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        median_ms=args.median_ms,
+        sigma=args.sigma,
+        tail_probability=args.tail_probability,
+        tail_multiplier=args.tail_multiplier,
+        tokens_per_sec=args.tokens_per_sec,
+        rate_limit=args.rate_limit,
+        retry_after_ms=args.retry_after_ms,
+        seed=args.seed,
+    )
+    server, base_url = start_in_thread(config)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+
+    # Per-task INFO lines would dominate the measurement (main.py sets
+    # up logging from LOG_LEVEL, see log_config.py)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from main import app
+
+    results = []
+    print(f"{'scenario':<24} {'fan':>4} {'wall ms':>10} {'eff':>6} {'ampl':>6} "
+          f"{'reqs':>6} {'429s':>6} {'retries':>8}")
+    try:
+        for label, task, input_data, width in scenarios(args.fan_out):
+            row = {"scenario": label, "task": task, **bench_scenario(
+                app, server, task, input_data, width, args.repeats, not args.no_retry_waits
+            )}
+            results.append(row)
+            print(
+                f"{label:<24} {row['fan_out']:>4} {row['wall_time_s']*1000:>10.1f} "
+                f"{row['fan_out_efficiency']:>6.2f} {row['retry_amplification']:>6.2f} "
+                f"{row['openai_requests']:>6.1f} {row['rate_limited']:>6.1f} {row['task_retries']:>8.1f}"
+            )
+    finally:
+        server.shutdown()
+
+    output = {
+        "benchmark": "openai_tasks",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "stub": vars(config),
+        "fan_out": args.fan_out,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
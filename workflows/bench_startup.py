@@ -0,0 +1,184 @@
+"""
+Benchmark cold start of the workflow worker and the backend.
+
+Every measurement starts a fresh interpreter, like a Render task run or
+a new backend instance:
+
+Worker (each task run is its own process):
+- python:         bare interpreter start, the floor for everything else
+- import main:    registering every task module
+- + openai:       import main, then openai; what an OpenAI task run pays
+                  and what every run paid while openai_tasks imported it
+                  eagerly
+- square run:     import plus one task run on the local executor
+
+Backend (uvicorn against the fake Render API from backend/loadtest):
+- import:         import backend.main
+- healthy:        process start until GET /health answers
+- first task:     process start until POST /api/basic/square answers,
+                  which needs render_sdk loaded
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --repeats 10 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_deep_tree import _git_commit  # noqa: E402
+
+WORKFLOWS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(WORKFLOWS_DIR)
+
+WORKER_CASES = {
+    "python": ["-c", "pass"],
+    "import main": ["-c", "import main"],
+    "+ openai": ["-c", "import main, openai"],
+    "square run": ["local_executor.py", "square", "[7]"],
+}
+
+
+def _time_process(args: list[str], cwd: str, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, data: dict | None = None) -> bool:
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError):
+        return False
+
+
+def _wait_for(url: str, data: dict | None = None, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not _request(url, data):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{url} did not answer within {timeout}s")
+        time.sleep(0.005)
+
+
+def bench_worker(repeats: int) -> dict:
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    times = {case: [] for case in WORKER_CASES}
+    for _ in range(repeats):
+        for case, args in WORKER_CASES.items():
+            times[case].append(_time_process(args, WORKFLOWS_DIR, env))
+    return {case: statistics.median(values) for case, values in times.items()}
+
+
+def bench_backend(repeats: int) -> dict:
+    env = {
+        **os.environ,
+        "RENDER_API_KEY": os.getenv("RENDER_API_KEY", "rnd_bench"),
+        "RENDER_USE_LOCAL_DEV": "true",
+    }
+    fake_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    env["RENDER_LOCAL_DEV_URL"] = fake_url
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "backend.loadtest.fake_render_api", "--port", str(fake_port),
+         "--latency-ms", "0", "--task-duration-ms", "0"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    times = {"import": [], "healthy": [], "first task": []}
+    try:
+        _wait_for(f"{fake_url}/_stats")
+        for _ in range(repeats):
+            times["import"].append(_time_process(["-c", "import backend.main"], REPO_ROOT, env))
+
+            port = _free_port()
+            started = time.perf_counter()
+            backend = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                 "--log-level", "warning", "--no-access-log"],
+                cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                _wait_for(f"{base_url}/health")
+                times["healthy"].append(time.perf_counter() - started)
+                _wait_for(f"{base_url}/api/basic/square", {"a": 3})
+                times["first task"].append(time.perf_counter() - started)
+            finally:
+                backend.terminate()
+                backend.wait(timeout=10)
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+    return {case: statistics.median(values) for case, values in times.items()}
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print deltas against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):")
+    for service in ("worker", "backend"):
+        for case, value in current["results"].get(service, {}).items():
+            old = baseline["results"].get(service, {}).get(case)
+            if old is None:
+                continue
+            delta = (value - old) / old * 100
+            print(f"  {service:<8} {case:<12} {old*1000:8.1f}ms -> {value*1000:8.1f}ms  ({delta:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark worker and backend cold start")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--skip-backend", action="store_true")
+    parser.add_argument("--output", default="bench_startup.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    results = {"worker": bench_worker(args.repeats)}
+    if not args.skip_backend:
+        results["backend"] = bench_backend(args.repeats)
+
+    for service, cases in results.items():
+        print(f"{service}:")
+        for case, value in cases.items():
+            print(f"  {case:<12} {value*1000:8.1f} ms")
+
+    output = {
+        "benchmark": "startup",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+OpenAI call statistics shared between worker processes.
+
+Each Render task run is its own process, so statistics kept in memory
+start empty on every run: hedging (hedging.py) would never collect the
+OPENAI_HEDGE_MIN_SAMPLES latencies its percentile needs, its hedge
+tokens would refill with every process, and model routing (model_routing.py)
+would never see MIN_OBSERVED_CALLS calls of a model, and a root run's
+retry budget (retry_policy.py) could not be shared by the runs of its
+tree. OPENAI_STATS_DB points them at a SQLite file all runs share
+instead:
+
+- latency samples per key (the newest WINDOW_SIZE are kept)
+- counters (hedge tokens, tokens per model, retries per root run, ...)
+
+Unset (the default), statistics are per process, which only adds up in
+long-lived runners such as local_executor.py. On Render the file has to
+be on a disk the worker's instances share.
+
+Methods block; call them from a thread. Database errors are logged and
+read as "no statistics", so a broken file never fails a task.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latencies (
+    key         TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    latency_ms  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS latencies_by_key ON latencies (key, recorded_at DESC);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class CallStats:
+    """Latency samples and counters in a SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def latencies(self, key: str, limit: int = WINDOW_SIZE) -> list[float]:
+        """The newest `limit` latencies recorded for key, oldest first."""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT latency_ms FROM latencies WHERE key = ? ORDER BY recorded_at DESC LIMIT ?",
+                    (key, limit),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Call statistics not read: {e}")
+            return []
+        return [row[0] for row in reversed(rows)]
+
+    def add_latency(self, key: str, latency_ms: float) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO latencies (key, recorded_at, latency_ms) VALUES (?, ?, ?)",
+                    (key, now, latency_ms),
+                )
+                # Keep the window bounded
+                self._conn.execute(
+                    "DELETE FROM latencies WHERE key = ? AND recorded_at < ("
+                    " SELECT recorded_at FROM latencies WHERE key = ?"
+                    " ORDER BY recorded_at DESC LIMIT 1 OFFSET ?)",
+                    (key, key, WINDOW_SIZE - 1),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Call latency not recorded: {e}")
+
+    def counters(self, prefix: str) -> dict[str, float]:
+        """Counters whose name starts with prefix."""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT name, value FROM counters WHERE substr(name, 1, ?) = ?",
+                    (len(prefix), prefix),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Call statistics not read: {e}")
+            return {}
+        return dict(rows)
+
+    def add(self, amounts: dict[str, float]) -> dict[str, float]:
+        """Add to counters; returns their new values."""
+        values = {}
+        try:
+            with self._lock:
+                for name, amount in amounts.items():
+                    values[name] = self._conn.execute(
+                        "INSERT INTO counters (name, value) VALUES (?, ?)"
+                        " ON CONFLICT (name) DO UPDATE SET value = value + excluded.value"
+                        " RETURNING value",
+                        (name, amount),
+                    ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Call counters not recorded: {e}")
+        return values
+
+    def add_capped(self, name: str, amount: float, cap: float) -> float | None:
+        """
+        Add to a counter that never exceeds cap (a missing counter starts
+        full, at cap); returns its new value, or None on a database error.
+        """
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?)"
+                    " ON CONFLICT (name) DO UPDATE SET value = min(value + ?, ?)"
+                    " RETURNING value",
+                    (name, min(cap + amount, cap), amount, cap),
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Call counters not recorded: {e}")
+            return None
+
+    def delete(self, prefix: str) -> None:
+        """Drop the counters whose name starts with prefix."""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM counters WHERE substr(name, 1, ?) = ?", (len(prefix), prefix)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Call counters not deleted: {e}")
+
+    def __repr__(self) -> str:
+        return f"sqlite:{self.path}"
+
+
+_stats: CallStats | None = None
+_stats_path: str | None = None
+_stats_lock = threading.Lock()
+
+
+def get_call_stats() -> CallStats | None:
+    """The store OPENAI_STATS_DB names, or None for per-process statistics."""
+    global _stats, _stats_path
+    path = os.getenv("OPENAI_STATS_DB", "").strip()
+    if not path or path == "off":
+        return None
+    with _stats_lock:
+        if _stats is None or _stats_path != path:
+            try:
+                _stats = CallStats(path)
+            except sqlite3.Error as e:
+                logger.warning(f"OPENAI_STATS_DB={path!r} unusable, statistics stay per process: {e}")
+                return None
+            _stats_path = path
+        return _stats
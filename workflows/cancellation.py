@@ -0,0 +1,72 @@
+"""
+Cooperative cancellation for task runs.
+
+A cancelled run should stop spending capacity, not just stop reporting.
+Two things get in the way:
+
+- asyncio.gather leaves the other children running when one fails, so
+  a fan-out keeps starting and awaiting subtasks after its result is
+  already lost. gather_cancelling cancels the pending children instead
+  and waits for them to unwind before re-raising.
+- When Render cancels a run it terminates the worker process. The
+  SIGTERM handler installed by main.py turns that into a CancelledError
+  in the running task, so gathers cancel their children, in-flight
+  OpenAI requests are closed (hedging.py and openai_tasks.py close
+  their connections on cancellation) and metrics record the run as
+  cancelled before the process exits.
+
+Subtask runs already started on Render are separate processes; the
+backend cancels those (see DELETE /api/task/{task_run_id}).
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from collections.abc import Awaitable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+async def gather_cancelling(*aws: Awaitable) -> list[Any]:
+    """
+    Like asyncio.gather, but if any awaitable fails (or the caller is
+    cancelled) the others are cancelled and awaited before re-raising.
+    """
+    futures = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*futures)
+    except BaseException:
+        pending = [f for f in futures if not f.done()]
+        for future in pending:
+            future.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
+
+def _cancel_all(loop: asyncio.AbstractEventLoop) -> None:
+    tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+    logger.warning("Received SIGTERM, cancelling %d asyncio tasks", len(tasks))
+    for task in tasks:
+        task.cancel()
+
+
+def _on_sigterm(signum, frame) -> None:
+    # A second SIGTERM terminates as usual
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+    # The handler can interrupt the loop mid-step; cancel from a callback
+    loop.call_soon_threadsafe(_cancel_all, loop)
+
+
+def install_sigterm_handler() -> None:
+    """Cancel the running task run on SIGTERM (RENDER_SDK_MODE=run only)."""
+    if os.getenv("RENDER_SDK_MODE") != "run":
+        return
+    signal.signal(signal.SIGTERM, _on_sigterm)
@@ -0,0 +1,211 @@
+"""
+Checkpoints for deep_parallel_tree.
+
+When a deep_parallel_tree run fails partway (say tree_layered_sum hits
+its timeout), the retry would otherwise recompute the scatter and
+cross-reduce phases from scratch. With a checkpoint store configured,
+completed phases and subtrees are saved as they finish and a retried or
+resubmitted run with the same input picks them up instead.
+
+Keys are hashes of the work's input:
+- phases:   the root input (numbers, chunk_size) plus the phase name
+- subtrees: the subtree's own input (a chunk, a list of values to
+  halve-and-add), so identical subtrees are shared between runs
+
+Dataset handles (datasets.py) name their content by hash, so runs over
+an uploaded dataset get stable keys too.
+
+Inputs are hashed after trace_context.traced, deadline.deadline_aware
+and retry_policy.retried have removed their __traceparent__,
+__deadline__ and __retry_budget__ envelopes, so tracing, deadlines and
+retry budgets do not change the keys.
+
+Select the store with CHECKPOINT_STORE:
+- unset / "off":      no checkpoints (default)
+- "memory":           in this process only (local executor, tests)
+- "file" / "file:DIR": JSON files in DIR (default <tmp>/workflow-checkpoints),
+                      shared by every process on the machine
+
+File checkpoints expire after CHECKPOINT_MAX_AGE seconds (default 86400):
+older files are not read, and each process deletes them from DIR at most
+once every SWEEP_INTERVAL seconds as it writes.
+
+Stores are called from a thread (asyncio.to_thread), so a store that
+reads disk or the network does not block the worker's event loop.
+Other stores plug in with register_store(scheme, factory). Bump
+CHECKPOINT_VERSION when a checkpointed task's logic changes, so old
+results are not reused.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# Seconds a file checkpoint is kept (CHECKPOINT_MAX_AGE)
+DEFAULT_MAX_AGE = 86400.0
+
+
+class CheckpointStore(Protocol):
+    """Where checkpointed results live. Values are JSON-serializable."""
+
+    def get(self, key: str) -> Any | None: ...
+
+    def put(self, key: str, value: Any) -> None: ...
+
+
+class MemoryStore:
+    """Checkpoints held in this process."""
+
+    def __init__(self):
+        self._values: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            data = self._values.get(key)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key: str, value: Any) -> None:
+        data = json.dumps(value)
+        with self._lock:
+            self._values[key] = data
+
+    def __repr__(self) -> str:
+        return "memory"
+
+
+def _max_age() -> float:
+    value = os.getenv("CHECKPOINT_MAX_AGE")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            logger.warning(f"Ignoring malformed CHECKPOINT_MAX_AGE: {value!r}")
+    return DEFAULT_MAX_AGE
+
+
+class FileStore:
+    """One JSON file per checkpoint, written atomically, kept for max_age seconds."""
+
+    SWEEP_INTERVAL = 300.0
+
+    def __init__(self, directory: str, max_age: float | None = None):
+        self.directory = directory
+        self.max_age = max_age if max_age is not None else _max_age()
+        os.makedirs(directory, exist_ok=True)
+        self._swept = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        try:
+            with open(self._path(key)) as f:
+                if time.time() - os.fstat(f.fileno()).st_mtime > self.max_age:
+                    return None
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {key}: {e}")
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._sweep()
+
+    def _sweep(self) -> None:
+        """Delete expired checkpoints (and abandoned temp files), at most once per SWEEP_INTERVAL."""
+        now = time.time()
+        with self._sweep_lock:
+            if now - self._swept < self.SWEEP_INTERVAL:
+                return
+            self._swept = now
+        removed = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if now - entry.stat().st_mtime > self.max_age:
+                            os.unlink(entry.path)
+                            removed += 1
+                    except FileNotFoundError:
+                        pass
+        except OSError as e:
+            logger.warning(f"Checkpoint sweep of {self.directory} failed: {e}")
+        if removed:
+            logger.info(f"Deleted {removed} expired checkpoints from {self.directory}")
+
+    def __repr__(self) -> str:
+        return f"file:{self.directory}"
+
+
+_factories: dict[str, Callable[[str], CheckpointStore]] = {
+    "memory": lambda _: MemoryStore(),
+    "file": lambda arg: FileStore(arg or os.path.join(tempfile.gettempdir(), "workflow-checkpoints")),
+}
+_stores: dict[str, CheckpointStore] = {}
+_stores_lock = threading.Lock()
+
+
+def register_store(scheme: str, factory: Callable[[str], CheckpointStore]) -> None:
+    """Make CHECKPOINT_STORE="<scheme>:<arg>" build a store with factory(arg)."""
+    _factories[scheme] = factory
+
+
+def get_store() -> CheckpointStore | None:
+    """The store named by CHECKPOINT_STORE, or None when checkpoints are off."""
+    spec = os.getenv("CHECKPOINT_STORE", "").strip()
+    if not spec or spec == "off":
+        return None
+    with _stores_lock:
+        store = _stores.get(spec)
+        if store is None:
+            scheme, _, arg = spec.partition(":")
+            if scheme not in _factories:
+                raise ValueError(f"Unknown CHECKPOINT_STORE scheme {scheme!r}")
+            store = _stores[spec] = _factories[scheme](arg)
+        return store
+
+
+def input_hash(*parts) -> str:
+    """Stable hash of JSON-serializable inputs."""
+    data = json.dumps([CHECKPOINT_VERSION, *parts], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+async def checkpointed(
+    store: CheckpointStore | None, key: tuple, compute: Callable[[], Awaitable[Any]]
+) -> tuple[Any, bool]:
+    """
+    Return (result, restored): the stored result for input_hash(*key) if
+    there is one, otherwise await compute() and store what it returns.
+    """
+    if store is None:
+        return await compute(), False
+    digest = input_hash(*key)
+    value = await asyncio.to_thread(store.get, digest)
+    if value is not None:
+        return value, True
+    value = await compute()
+    await asyncio.to_thread(store.put, digest, value)
+    return value, False
@@ -0,0 +1,137 @@
+"""
+Lazy access to large task inputs in the payload store.
+
+The backend streams large uploads for deep_parallel_tree and
+parallel_sentiment_analysis to disk (see backend/payloads.py for the
+upload side and the on-disk layout) and starts the task with a handle
+instead of the list:
+
+    {"dataset": "<id>", "start": 0, "stop": 100000}
+
+Tasks that accept a handle pass slices of it down as smaller handles
+(split) and read values only where they are used (load), so a run's
+arguments stay a few bytes whatever the input size. Plain lists work as
+before; every helper here takes either.
+
+Datasets are read from PAYLOAD_DIR (default <tmp>/workflow-payloads),
+which must be the backend's directory: the same machine, or a mount
+both services share.
+"""
+
+import array
+import functools
+import json
+import os
+import sys
+import tempfile
+from typing import Any
+
+# Must match backend/payloads.py
+DATASET_KEY = "dataset"
+JSON_FORMAT = "json"
+PACKED_FORMATS = {"int64": "q", "int32": "i", "float64": "d"}
+
+
+def payload_dir() -> str:
+    return os.getenv("PAYLOAD_DIR") or os.path.join(tempfile.gettempdir(), "workflow-payloads")
+
+
+def is_handle(value) -> bool:
+    return isinstance(value, dict) and DATASET_KEY in value
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array.array:
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class Dataset:
+    """A stored dataset; values are read from disk on each call."""
+
+    def __init__(self, dataset_id: str, root: str | None = None):
+        if not dataset_id.isalnum():
+            raise ValueError(f"Invalid dataset id {dataset_id!r}")
+        self.id = dataset_id
+        self.path = os.path.join(root or payload_dir(), dataset_id)
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Dataset {dataset_id} not found in {os.path.dirname(self.path)} (check PAYLOAD_DIR)"
+            ) from None
+        self.format = meta["format"]
+        self.count = meta["count"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def read(self, start: int = 0, stop: int | None = None) -> list[Any]:
+        """Values [start, stop) as a list."""
+        start, stop, _ = slice(start, stop).indices(self.count)
+        if stop <= start:
+            return []
+        with open(os.path.join(self.path, "data.bin"), "rb") as data:
+            if self.format == JSON_FORMAT:
+                with open(os.path.join(self.path, "index.bin"), "rb") as index:
+                    index.seek(start * 8)
+                    offsets = _from_little_endian("Q", index.read((stop - start + 1) * 8))
+                data.seek(offsets[0])
+                lines = data.read(offsets[-1] - offsets[0]).splitlines()
+                return [json.loads(line) for line in lines]
+            typecode = PACKED_FORMATS[self.format]
+            itemsize = array.array(typecode).itemsize
+            data.seek(start * itemsize)
+            return _from_little_endian(typecode, data.read((stop - start) * itemsize)).tolist()
+
+
+@functools.lru_cache(maxsize=64)
+def _open(dataset_id: str, root: str) -> Dataset:
+    # Datasets are immutable (the id is their content hash)
+    return Dataset(dataset_id, root)
+
+
+def open_dataset(handle: dict) -> Dataset:
+    return _open(handle[DATASET_KEY], payload_dir())
+
+
+def _bounds(handle: dict) -> tuple[int, int]:
+    start = handle.get("start", 0)
+    stop = handle.get("stop")
+    if stop is None:
+        stop = len(open_dataset(handle))
+    return start, stop
+
+
+def size(values: list | dict) -> int:
+    """Number of values in a list or a handle, without reading them."""
+    if not is_handle(values):
+        return len(values)
+    start, stop = _bounds(values)
+    return max(0, stop - start)
+
+
+def load(values: list | dict) -> list:
+    """The values themselves: a list as is, a handle read from the store."""
+    if not is_handle(values):
+        return values
+    return open_dataset(values).read(*_bounds(values))
+
+
+def split(values: list | dict, chunk_size: int) -> list[list | dict]:
+    """
+    Consecutive pieces of at most chunk_size values: sublists of a list,
+    smaller handles of a handle (nothing is read).
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if not is_handle(values):
+        return [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    start, stop = _bounds(values)
+    return [
+        {DATASET_KEY: values[DATASET_KEY], "start": i, "stop": min(i + chunk_size, stop)}
+        for i in range(start, stop, chunk_size)
+    ]
@@ -0,0 +1,176 @@
+"""
+Deadlines for task runs and their subtask trees.
+
+Every task gets the app's flat timeout, which says nothing about how
+long the caller is still willing to wait. A request can instead carry a
+deadline: the backend turns an `X-Deadline-Ms` header into an absolute
+time and passes it in the task input, like trace context, as a
+trailing `{"__deadline__": <unix ms>}` argument (or a `__deadline__`
+key for named input). `deadline_aware()` wraps every task registered on
+the app (see app.py):
+
+- strips the deadline from the input before the task function sees it
+- fails fast with DeadlineExceeded when the deadline has already passed,
+  instead of starting work whose result would arrive too late
+- cancels the run when the deadline passes while it is running
+- hands the deadline on to every subtask the task starts; a subtask
+  started after the deadline fails in the caller without a task run
+
+Tasks read the budget with remaining_ms() to degrade instead of failing
+(skip an optional stage, route to a cheaper model: openai_tasks.py
+passes it to model routing as the latency budget). Without a deadline
+nothing changes.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import math
+import time
+
+from render_sdk.workflows.task import _current_client
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_KEY = "__deadline__"
+
+# Absolute deadline (unix seconds) of the task run currently executing
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "task_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """The run's deadline passed before its work could finish."""
+
+
+def remaining_ms() -> float | None:
+    """Milliseconds left before the current deadline; None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return (deadline - time.time()) * 1000
+
+
+def latency_budget(explicit_ms: float | None) -> float | None:
+    """The tighter of an explicit latency budget and the time left."""
+    remaining = remaining_ms()
+    if remaining is None:
+        return explicit_ms
+    if explicit_ms is None:
+        return max(0.0, remaining)
+    return max(0.0, min(explicit_ms, remaining))
+
+
+def check_deadline(what: str) -> None:
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    remaining = remaining_ms()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"{what}: deadline passed {-remaining:.0f}ms ago")
+
+
+def attach_deadline(input_data: list | dict, deadline: float) -> list | dict:
+    """Return task input carrying `deadline` (unix seconds) for the receiving task."""
+    value = round(deadline * 1000)
+    if isinstance(input_data, dict):
+        return {**input_data, DEADLINE_KEY: value}
+    return [*input_data, {DEADLINE_KEY: value}]
+
+
+def _is_envelope(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and DEADLINE_KEY in value
+
+
+def _parse(value) -> float | None:
+    try:
+        deadline = float(value) / 1000
+    except (TypeError, ValueError):
+        deadline = math.nan
+    if not math.isfinite(deadline):
+        logger.warning(f"[Deadline] Ignoring malformed deadline {value!r}")
+        return None
+    return deadline
+
+
+def _split_call_args(args: tuple, kwargs: dict) -> tuple[tuple, dict, float | None]:
+    """Remove the deadline from a task's call arguments."""
+    if DEADLINE_KEY in kwargs:
+        kwargs = dict(kwargs)
+        return args, kwargs, _parse(kwargs.pop(DEADLINE_KEY))
+    if args and _is_envelope(args[-1]):
+        return args[:-1], kwargs, _parse(args[-1][DEADLINE_KEY])
+    return args, kwargs, None
+
+
+class _DeadlineClient:
+    """Wraps the subtask client so every subtask inherits the deadline."""
+
+    def __init__(self, client, deadline: float):
+        self._client = client
+        self._deadline = deadline
+
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None):
+        check_deadline(f"subtask {task_name}")
+        return await self._client.run_subtask(
+            task_name, attach_deadline(input_data or [], self._deadline)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _effective(received: float | None) -> float | None:
+    inherited = _deadline.get()
+    if received is None:
+        return inherited
+    return received if inherited is None else min(received, inherited)
+
+
+def deadline_aware(func):
+    """Wrap a task function to receive, enforce and propagate its deadline."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            args, kwargs, received = _split_call_args(args, kwargs)
+            deadline = _effective(received)
+            if deadline is None:
+                return await func(*args, **kwargs)
+
+            token = _deadline.set(deadline)
+            client = _current_client.get(None)
+            client_token = (
+                _current_client.set(_DeadlineClient(client, deadline)) if client else None
+            )
+            try:
+                check_deadline(name)
+                return await asyncio.wait_for(func(*args, **kwargs), deadline - time.time())
+            except asyncio.TimeoutError:
+                if time.time() < deadline:
+                    raise
+                raise DeadlineExceeded(f"{name}: ran past its deadline") from None
+            finally:
+                if client_token is not None:
+                    _current_client.reset(client_token)
+                _deadline.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        args, kwargs, received = _split_call_args(args, kwargs)
+        deadline = _effective(received)
+        if deadline is None:
+            return func(*args, **kwargs)
+        # A sync task cannot be interrupted; only refuse to start it late
+        token = _deadline.set(deadline)
+        try:
+            check_deadline(name)
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return sync_wrapper
@@ -0,0 +1,268 @@
+"""
+Request hedging for straggling OpenAI calls.
+
+Fan-out tasks like parallel_sentiment_analysis and multi_language_summary
+finish only when their slowest GPT call does, and a few calls always take
+many times the median. Hedging sends a duplicate request once a call has
+run longer than a chosen latency percentile, keeps whichever answers first
+and cancels the other.
+
+Configuration (environment variables):
+- OPENAI_HEDGE_ENABLED:          "true" to enable hedging (default off)
+- OPENAI_HEDGE_PERCENTILE:       latency percentile that triggers a hedge (default 95)
+- OPENAI_HEDGE_MAX_RATE:         max fraction of calls that may be hedged (default 0.1)
+- OPENAI_HEDGE_BURST:            hedges that may be saved up while calls are
+                                 fast (default 1, at least 1)
+- OPENAI_HEDGE_INITIAL_DELAY_MS: hedge delay used until enough samples exist (default 3000)
+- OPENAI_HEDGE_MIN_SAMPLES:      samples needed before the percentile is used (default 20)
+- OPENAI_STATS_DB:               SQLite file sharing latencies and the rate cap
+                                 between worker processes (see call_stats.py)
+
+The rate cap is a token bucket: every call adds OPENAI_HEDGE_MAX_RATE of
+a token, every hedge takes one, and the bucket holds OPENAI_HEDGE_BURST
+tokens at most. Calls that did not straggle therefore cannot bank hedges
+for a latency incident, when every call straggles and hedging them all
+would double the load on an upstream that is already slow.
+
+Without OPENAI_STATS_DB the latency windows and the bucket are per
+process. Every Render task run is a fresh process that makes a handful of
+calls, so there it never collects OPENAI_HEDGE_MIN_SAMPLES latencies and
+starts with a full bucket: hedging as configured then only works in
+long-lived runners like local_executor.py.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+from call_stats import WINDOW_SIZE, get_call_stats
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class HedgeConfig:
+    """Hedging settings, usually read from the environment."""
+    enabled: bool = False
+    percentile: float = 95.0
+    max_rate: float = 0.1
+    burst: int = 1
+    initial_delay_ms: float = 3000.0
+    min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "HedgeConfig":
+        return cls(
+            enabled=_env_flag("OPENAI_HEDGE_ENABLED"),
+            percentile=float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95")),
+            max_rate=float(os.getenv("OPENAI_HEDGE_MAX_RATE", "0.1")),
+            burst=int(os.getenv("OPENAI_HEDGE_BURST", "1")),
+            initial_delay_ms=float(os.getenv("OPENAI_HEDGE_INITIAL_DELAY_MS", "3000")),
+            min_samples=int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20")),
+        )
+
+
+@dataclass
+class HedgeStats:
+    """Counters describing hedging behaviour since the process started."""
+    calls: int = 0
+    hedges_sent: int = 0
+    hedges_won: int = 0
+    hedges_suppressed: int = 0
+    requests_cancelled: int = 0
+    delays_ms: dict[str, float] = field(default_factory=dict)
+
+
+class LatencyWindow:
+    """Bounded window of recent latencies (ms) for one call type."""
+
+    def __init__(self, size: int = WINDOW_SIZE):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency_ms: float) -> None:
+        self._samples.append(latency_ms)
+
+    def extend(self, latencies_ms: list[float]) -> None:
+        self._samples.extend(latencies_ms)
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile of the recorded samples."""
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class Hedger:
+    """
+    Runs calls with an optional hedged duplicate.
+
+    Latencies are tracked per key (e.g. the task name), so a slow translation
+    never sets the hedge delay for a quick sentiment check. With a shared
+    call_stats store, each key's window starts from the latencies other
+    processes recorded and the token bucket is theirs too.
+    """
+
+    def __init__(self, config: HedgeConfig | None = None):
+        self.config = config or HedgeConfig.from_env()
+        self.stats = HedgeStats()
+        self._windows: dict[str, LatencyWindow] = {}
+        self._tokens = float(self.capacity)
+
+    @property
+    def capacity(self) -> int:
+        """Most hedge tokens the bucket holds."""
+        return max(1, self.config.burst)
+
+    def hedge_delay_ms(self, key: str) -> float:
+        """Delay after which a duplicate request is sent for `key`."""
+        window = self._windows.get(key)
+        if window is None or len(window) < self.config.min_samples:
+            return self.config.initial_delay_ms
+        return window.percentile(self.config.percentile)
+
+    async def _load(self, key: str) -> None:
+        """Start the window for `key` from the shared store's latencies."""
+        if key in self._windows:
+            return
+        window = LatencyWindow()
+        shared = get_call_stats()
+        if shared is not None:
+            window.extend(await asyncio.to_thread(shared.latencies, f"hedge:{key}"))
+        self._windows.setdefault(key, window)
+
+    async def _record(self, key: str, started: float) -> None:
+        latency_ms = (time.monotonic() - started) * 1000
+        self._windows.setdefault(key, LatencyWindow()).record(latency_ms)
+        shared = get_call_stats()
+        if shared is not None:
+            await asyncio.to_thread(shared.add_latency, f"hedge:{key}", latency_ms)
+
+    async def _refill(self) -> None:
+        """Add a call's share of a hedge token to the bucket."""
+        shared = get_call_stats()
+        if shared is None:
+            self._tokens = min(self._tokens + self.config.max_rate, self.capacity)
+            return
+        await asyncio.to_thread(shared.add_capped, "hedge:tokens", self.config.max_rate, self.capacity)
+
+    async def _may_hedge(self) -> bool:
+        """Take a hedge token from the bucket, if it holds one."""
+        shared = get_call_stats()
+        if shared is None:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+        # Take the token first, so concurrent processes cannot overshoot
+        tokens = await asyncio.to_thread(shared.add_capped, "hedge:tokens", -1, self.capacity)
+        if tokens is None:
+            return False
+        if tokens >= 0:
+            return True
+        await asyncio.to_thread(shared.add_capped, "hedge:tokens", 1, self.capacity)
+        return False
+
+    async def call(self, key: str, make_request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `make_request()` and hedge it if it straggles.
+
+        `make_request` must start a fresh request on every call. If one
+        attempt fails, the other is still awaited; the primary's error is
+        raised only when both fail.
+        """
+        self.stats.calls += 1
+        started = time.monotonic()
+
+        if not self.config.enabled:
+            result = await make_request()
+            await self._record(key, started)
+            return result
+
+        await self._refill()
+        await self._load(key)
+        delay_ms = self.hedge_delay_ms(key)
+        self.stats.delays_ms[key] = round(delay_ms, 1)
+
+        primary = asyncio.ensure_future(make_request())
+        pending: set[asyncio.Future] = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay_ms / 1000)
+            if done:
+                result = primary.result()
+                await self._record(key, started)
+                return result
+
+            if not await self._may_hedge():
+                self.stats.hedges_suppressed += 1
+                result = await primary
+                await self._record(key, started)
+                return result
+
+            self.stats.hedges_sent += 1
+            logger.info(f"[Hedging] {key} exceeded {delay_ms:.0f}ms, sending hedge request")
+            hedge_started = time.monotonic()
+            hedge = asyncio.ensure_future(make_request())
+            pending.add(hedge)
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = next((f for f in done if f.exception() is None), None)
+                if winner is None:
+                    continue
+                if winner is hedge:
+                    self.stats.hedges_won += 1
+                    await self._record(key, hedge_started)
+                else:
+                    await self._record(key, started)
+                return winner.result()
+
+            # Both attempts failed: surface the primary's error
+            return primary.result()
+        finally:
+            for fut in pending:
+                if not fut.done():
+                    fut.cancel()
+                    self.stats.requests_cancelled += 1
+            # Let the losers release their connections and retrieve their errors
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+_hedger: Hedger | None = None
+
+
+def get_hedger() -> Hedger:
+    """Get the process-wide Hedger, reading config on first use."""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger
+
+
+def hedge_metrics() -> dict:
+    """Snapshot of hedging counters for metrics export."""
+    hedger = get_hedger()
+    metrics = asdict(hedger.stats)
+    metrics["enabled"] = hedger.config.enabled
+    metrics["hedge_rate"] = (
+        hedger.stats.hedges_sent / hedger.stats.calls if hedger.stats.calls else 0.0
+    )
+    return metrics
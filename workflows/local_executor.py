@@ -0,0 +1,376 @@
+"""
+In-process local execution engine for the Workflows app.
+
+Runs the tasks registered on `app` without the Render runtime, so the
+orchestration logic (deep_parallel_tree, the OpenAI pipelines) can be
+profiled and benchmarked with no network in the way.
+
+Semantics follow the Render runtime:
+- Subtask calls (`await square(n)`) go through the executor, which plays
+  the role of the SDK's UDS client.
+- Arguments and results are JSON round-tripped, like the real runtime.
+- Runtime retry options (max_retries, wait_duration_ms, backoff_scaling)
+  and timeout_seconds are honored per task. Tasks registered on the app
+  retry in-process and leave the runtime RUNTIME_RETRIES retries (see
+  retry_policy.py); those retries are counted in stats.retries too.
+  Each task run takes its retry budget from its input, as on Render.
+- Async tasks run on the event loop. Sync tasks registered on the app
+  are offloaded to its pools (see offload.py); other sync functions run
+  on the executor's own thread or process pool.
+
+An optional per-task latency can be injected to model the runtime's
+scheduling overhead, and the executor records the task graph's shape:
+peak in-flight tasks and the critical path (the longest chain of task
+runs that had to happen one after another). Pass a tracing.Tracer to
+record a span per task run (see trace_analysis.py).
+
+Usage:
+    python local_executor.py deep_parallel_tree '[[1,2,3,4,5,6,7,8,9,10,11,12]]'
+    python local_executor.py square '[7]' --backend process
+    python local_executor.py deep_parallel_tree '[[1,2,3,4,5,6,7,8]]' --trace trace.json
+    python local_executor.py deep_parallel_tree '[[1,2,3,4,5,6,7,8]]' --latency-ms 50 --deadline-ms 300
+"""
+
+import argparse
+import asyncio
+import contextvars
+import importlib
+import inspect
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from render_sdk.client.errors import TaskRunError  # noqa: E402
+from render_sdk.workflows.task import _current_client  # noqa: E402
+from deadline import attach_deadline  # noqa: E402
+from metrics import task_retries  # noqa: E402
+from retry_policy import retry_budget, retry_listener, retry_waits  # noqa: E402
+from tracing import Span, Tracer, now_us  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Chain length of the task currently running. A one-element list so that
+# children can push their finished chain length back to the parent.
+_chain: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar(
+    "local_executor_chain", default=None
+)
+
+# Span of the task currently running, when tracing
+_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "local_executor_span", default=None
+)
+
+TaskLatency = float | dict[str, float] | Callable[[str], float]
+
+
+@dataclass
+class ExecutorStats:
+    """Counters for one executor instance."""
+    task_runs: int = 0
+    retries: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    payload_bytes: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    critical_path: int = 0
+    by_task: Counter = field(default_factory=Counter)
+
+
+def _call_in_process(module_name: str, attr_name: str, input_data: list | dict) -> tuple[int, Any]:
+    """
+    Run a sync task function inside a pool process.
+
+    Task modules bind the decorated TaskCallable to the function's name, so
+    the raw function cannot be pickled by reference. The child imports the
+    module and unwraps the TaskCallable instead.
+
+    Returns (start time in microseconds, result) so the parent can tell
+    queue wait from execution time.
+    """
+    started = now_us()
+    module = importlib.import_module(module_name)
+    func = getattr(module, attr_name).__wrapped__
+    if isinstance(input_data, dict):
+        return started, func(**input_data)
+    return started, func(*input_data)
+
+
+class LocalExecutor:
+    """
+    Executes Workflows tasks in-process.
+
+    Args:
+        app: The Workflows instance whose registry holds the tasks
+        backend: "thread" or "process" pool for sync tasks
+        max_workers: Pool size (defaults to the number of CPU cores)
+        retry_waits: Sleep between retries as configured (False skips the waits)
+        task_latency_ms: Simulated overhead per task run: a constant, a
+            {task_name: ms} dict, or a callable taking the task name
+        tracer: Optional Tracer that receives a span per task run
+    """
+
+    def __init__(
+        self,
+        app,
+        backend: str = "thread",
+        max_workers: int | None = None,
+        retry_waits: bool = True,
+        task_latency_ms: TaskLatency = 0,
+        tracer: Tracer | None = None,
+    ):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.app = app
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.retry_waits = retry_waits
+        self.task_latency_ms = task_latency_ms
+        self.tracer = tracer
+        self.stats = ExecutorStats()
+        self._pool: Executor | None = None
+
+    def __enter__(self) -> "LocalExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the sync-task pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.backend == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    # The SDK's task callables talk to this method through _current_client
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None) -> Any:
+        """Run a task by name, as the Render runtime would for a subtask."""
+        try:
+            return await self.run_task(task_name, input_data or [])
+        except TaskRunError:
+            raise
+        except Exception as e:
+            raise TaskRunError(f"Subtask failed: {e}") from e
+
+    def _latency_ms(self, task_name: str) -> float:
+        latency = self.task_latency_ms
+        if callable(latency):
+            return latency(task_name)
+        if isinstance(latency, dict):
+            return latency.get(task_name, 0)
+        return latency
+
+    async def run_task(self, task_name: str, input_data: list | dict) -> Any:
+        """Run a registered task, tracking in-flight count and chain length."""
+        task_info = self.app._registry.get_task(task_name)
+        if task_info is None:
+            raise ValueError(f"Task '{task_name}' not found")
+
+        parent = _chain.get()
+        cell = [(parent[0] if parent else 0) + 1]
+        token = _chain.set(cell)
+        # Like a fresh task run process: subtasks see the executor itself,
+        # not the caller's wrapped client (trace context, deadline, ...),
+        # and get their retry budget from their input
+        client_token = _current_client.set(self)
+        budget_token = retry_budget.set(None)
+        span = self.tracer.start_span(task_name, _span.get()) if self.tracer else None
+        span_token = _span.set(span)
+        stats = self.stats
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        error = None
+        try:
+            return await self._run_with_retries(task_name, task_info, input_data)
+        except BaseException as e:
+            error = e
+            if isinstance(e, asyncio.CancelledError):
+                stats.cancelled += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            if span is not None:
+                self.tracer.end_span(span, error)
+            _span.reset(span_token)
+            retry_budget.reset(budget_token)
+            _current_client.reset(client_token)
+            _chain.reset(token)
+            if parent is not None:
+                parent[0] = max(parent[0], cell[0])
+            stats.critical_path = max(stats.critical_path, cell[0])
+
+    async def _run_with_retries(self, task_name: str, task_info, input_data: list | dict) -> Any:
+        """Run a task with its retry and timeout options."""
+        encoded = json.dumps(input_data)
+        self.stats.payload_bytes += len(encoded)
+        input_data = json.loads(encoded)
+        span = _span.get()
+        if span is not None:
+            span.input_bytes = len(encoded)
+
+        options = task_info.options
+        retry = options.retry
+        max_retries = retry.max_retries if retry else 0
+        attempt = 0
+        while True:
+            self.stats.task_runs += 1
+            self.stats.by_task[task_name] += 1
+            try:
+                result = await self._attempt(task_info, input_data, options.timeout_seconds)
+                encoded = json.dumps(result)
+                self.stats.payload_bytes += len(encoded)
+                if span is not None:
+                    span.output_bytes = len(encoded)
+                return json.loads(encoded)
+            except Exception as e:
+                if attempt >= max_retries:
+                    self.stats.failures += 1
+                    logger.error(f"[Local Executor] {task_name} failed after {attempt + 1} attempts: {e}")
+                    raise
+                wait_ms = retry.wait_duration_ms * (retry.backoff_scaling ** attempt)
+                attempt += 1
+                self.stats.retries += 1
+                task_retries.inc(task_name)
+                if span is not None:
+                    span.retries = attempt
+                logger.warning(
+                    f"[Local Executor] {task_name} attempt {attempt} failed ({e}); "
+                    f"retrying in {wait_ms:.0f}ms"
+                )
+                if self.retry_waits:
+                    await asyncio.sleep(wait_ms / 1000)
+
+    async def _attempt(self, task_info, input_data: list | dict, timeout_seconds: int | None) -> Any:
+        """Run one attempt of a task, enforcing its timeout."""
+        latency_ms = self._latency_ms(task_info.name)
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+        func = task_info.func
+        span = _span.get()
+        if inspect.iscoroutinefunction(func):
+            if span is not None:
+                span.mark_started()
+            call = func(**input_data) if isinstance(input_data, dict) else func(*input_data)
+        else:
+            call = self._run_sync(func, input_data, span)
+
+        if not timeout_seconds:
+            return await call
+        try:
+            return await asyncio.wait_for(call, timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise TimeoutError(
+                f"Task '{task_info.name}' timed out after {timeout_seconds}s"
+            ) from None
+
+    async def _run_sync(self, func, input_data: list | dict, span: Span | None = None) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.backend == "process":
+            started, result = await loop.run_in_executor(
+                self._get_pool(), _call_in_process, func.__module__, func.__name__, input_data
+            )
+            if span is not None:
+                span.mark_started(started)
+            return result
+
+        def call():
+            if span is not None:
+                span.mark_started()
+            if isinstance(input_data, dict):
+                return func(**input_data)
+            return func(*input_data)
+
+        # Run in the caller's context, as an async task would (deadline,
+        # retry budget, retry listener)
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._get_pool(), context.run, call)
+
+    def _record_retry(self, task_name: str, attempt: int) -> None:
+        """retry_policy listener: called in the retrying task's context."""
+        self.stats.retries += 1
+        span = _span.get()
+        if span is not None:
+            span.retries = attempt
+
+    async def run(self, task_name: str, input_data: list | dict) -> Any:
+        """Run a root task; subtasks it spawns are executed by this executor."""
+        token = _current_client.set(self)
+        listener_token = retry_listener.set(self._record_retry)
+        waits_token = retry_waits.set(self.retry_waits)
+        try:
+            return await self.run_task(task_name, input_data)
+        finally:
+            retry_waits.reset(waits_token)
+            retry_listener.reset(listener_token)
+            _current_client.reset(token)
+
+    def run_sync(self, task_name: str, input_data: list | dict) -> Any:
+        """Blocking wrapper around run() for scripts."""
+        return asyncio.run(self.run(task_name, input_data))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a workflow task locally")
+    parser.add_argument("task", help="Registered task name, e.g. deep_parallel_tree")
+    parser.add_argument("input", nargs="?", default="[]", help="JSON list or object of arguments")
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-retry-waits", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated overhead per task run")
+    parser.add_argument("--trace", help="Write a Chrome trace-event JSON file")
+    parser.add_argument("--deadline-ms", type=float, help="Deadline for the run, as a request would pass it")
+    args = parser.parse_args()
+
+    from main import app
+
+    with LocalExecutor(
+        app,
+        backend=args.backend,
+        max_workers=args.workers,
+        retry_waits=not args.no_retry_waits,
+        task_latency_ms=args.latency_ms,
+        tracer=Tracer() if args.trace else None,
+    ) as executor:
+        input_data = json.loads(args.input)
+        if args.deadline_ms is not None:
+            input_data = attach_deadline(input_data, time.time() + args.deadline_ms / 1000)
+        started = time.perf_counter()
+        result = executor.run_sync(args.task, input_data)
+        elapsed = time.perf_counter() - started
+
+    print(json.dumps(result, indent=2))
+    stats = executor.stats
+    print(
+        f"\n{stats.task_runs} task runs, {stats.retries} retries, "
+        f"critical path {stats.critical_path}, peak in-flight {stats.peak_in_flight}, "
+        f"{stats.payload_bytes} payload bytes in {elapsed:.3f}s",
+        file=sys.stderr,
+    )
+    if args.trace:
+        executor.tracer.write_chrome_trace(args.trace)
+        print(f"Wrote {args.trace}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Logging setup for the worker.
+
+A large deep_parallel_tree run executes tens of thousands of leaf tasks,
+each logging a line or two. With the plain `basicConfig` setup every
+line is formatted and written synchronously by the task that logged it.
+This module makes that cheaper, configured from the environment:
+
+- LOG_LEVEL:   root level (default INFO)
+- LOG_LEVELS:  per-logger overrides, e.g. "parallel_tasks=WARNING,openai_pool=DEBUG".
+               Calls below a logger's level return before a record is built.
+- LOG_SAMPLE:  let a fraction of runs of a task family log below WARNING, e.g.
+               "tree_*=0.01,square=0.1" (shell-style patterns on the task name).
+               Each run is kept at random with that probability, decided once at
+               its start, so a run that logs keeps all of its lines. (A counter
+               would not do: every Render run is a fresh process, so each would
+               be its process's first.) WARNING and above always get through.
+- LOG_ASYNC:   "1" to hand records to a background thread through a queue, so
+               formatting and writing happen off the task's path.
+
+The "progress" logger (progress.py) is exempt from LOG_LEVEL, LOG_LEVELS
+and LOG_SAMPLE: its lines are not diagnostics but the partial output the
+backend relays to the UI, and a dropped final event would leave it
+waiting.
+
+Gated and sampled-out calls return before a record is built, and task
+modules log with %-style arguments (`logger.info("%s² = %s", n, n * n)`)
+so they do not format anything either. app.py wraps every task with
+`sampled`.
+"""
+
+import atexit
+import contextvars
+import fnmatch
+import functools
+import inspect
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Must match the logger name in progress.py
+PROGRESS_LOGGER = "progress"
+
+
+def _parse_pairs(value: str | None) -> list[tuple[str, str]]:
+    """Parse "a=1,b=2" into [("a", "1"), ("b", "2")], skipping malformed entries."""
+    pairs = []
+    for item in (value or "").split(","):
+        key, sep, val = item.partition("=")
+        if sep and key.strip() and val.strip():
+            pairs.append((key.strip(), val.strip()))
+    return pairs
+
+
+# True while a task run that was sampled out is executing
+_sampled_out: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "log_sampled_out", default=False
+)
+
+
+class SamplingLogger(logging.Logger):
+    """Logger that drops records below WARNING inside sampled-out task runs."""
+
+    def isEnabledFor(self, level: int) -> bool:
+        if level < logging.WARNING and _sampled_out.get() and self.name != PROGRESS_LOGGER:
+            return False
+        return super().isEnabledFor(level)
+
+
+class _Sampler:
+    """Keeps each run of a task family with the family's probability."""
+
+    def __init__(self, rates: list[tuple[str, float]]):
+        self.rates = rates
+        self._families: dict[str, float | None] = {}
+
+    def _rate(self, name: str) -> float | None:
+        for pattern, rate in self.rates:
+            if fnmatch.fnmatchcase(name, pattern):
+                return rate
+        return None
+
+    def keep(self, name: str) -> bool:
+        try:
+            rate = self._families[name]
+        except KeyError:
+            rate = self._families[name] = self._rate(name)
+        return rate is None or random.random() < rate
+
+
+_sampler: _Sampler | None = None
+
+
+def sampled(func):
+    """Wrap a task function so LOG_SAMPLE decides per run whether it logs."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _sampler is None:
+                return await func(*args, **kwargs)
+            token = _sampled_out.set(not _sampler.keep(name))
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _sampled_out.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        if _sampler is None:
+            return func(*args, **kwargs)
+        token = _sampled_out.set(not _sampler.keep(name))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _sampled_out.reset(token)
+
+    return sync_wrapper
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock `prepare` formats the message up front so records can be
+    pickled; ours never leave the process. Arguments are formatted later,
+    so callers must not mutate objects they pass as log arguments.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging(stream=None) -> None:
+    """
+    Set up root logging from LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE and LOG_ASYNC.
+
+    Call before the task modules are imported: only loggers created
+    afterwards are SamplingLoggers. Raises ValueError for an unknown
+    level name or a non-numeric sample rate.
+    """
+    global _listener, _sampler
+
+    logging.setLoggerClass(SamplingLogger)
+    # Not in LOG_FORMAT; skipping them makes every record cheaper to build
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    flush_logging()
+
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_pairs(os.getenv("LOG_LEVELS")):
+        logging.getLogger(name).setLevel(level.upper())
+    logging.getLogger(PROGRESS_LOGGER).setLevel(logging.INFO)
+
+    rates = [
+        (pattern, min(1.0, float(rate)))
+        for pattern, rate in _parse_pairs(os.getenv("LOG_SAMPLE"))
+    ]
+    _sampler = _Sampler(rates) if rates else None
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    if os.getenv("LOG_ASYNC", "").lower() in ("1", "true", "yes"):
+        handler = _InProcessQueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(handler)
+    else:
+        root.addHandler(output)
+
+
+def flush_logging() -> None:
+    """Drain the queue and stop the listener thread (registered at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(flush_logging)
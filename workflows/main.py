@@ -15,14 +15,31 @@ import sys
 # Ensure sibling modules are importable
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Time the imports below when IMPORT_PROFILE is set (see startup_profile.py)
+from startup_profile import profile_imports, report_imports  # noqa: E402
+
+_import_profiler = profile_imports()
+
+# Configure logging (levels, sampling and async output from the environment)
+from log_config import configure_logging  # noqa: E402
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
 from app import app  # noqa: E402 - the Workflows instance
+import metrics  # noqa: E402
+from cancellation import install_sigterm_handler  # noqa: E402
+
+# Render stops a cancelled run with SIGTERM; unwind it cooperatively
+install_sigterm_handler()
+
+# Optional /metrics endpoint; a taken port only costs the endpoint
+_metrics_port = os.getenv("WORKER_METRICS_PORT", "").strip()
+if _metrics_port:
+    try:
+        metrics.start_http_server(int(_metrics_port))
+    except ValueError:
+        logger.warning(f"Ignoring WORKER_METRICS_PORT={_metrics_port!r}: not a port number")
 
 # Import all task modules to register tasks with app
 import basic_tasks      # noqa: E402, F401 - Simple sync/async tasks
@@ -32,3 +49,4 @@ import openai_tasks     # noqa: E402, F401 - OpenAI/LLM integration
 import advanced_tasks   # noqa: E402, F401 - Complex pipelines
 
 logger.info("Registered modules: basic_tasks, subtasks, parallel_tasks, openai_tasks, advanced_tasks")
+report_imports(_import_profiler, logger)
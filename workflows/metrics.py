@@ -0,0 +1,408 @@
+"""
+Prometheus metrics for the workflow worker.
+
+Every task registered on the app is wrapped (see app.py) to record:
+
+- workflow_task_duration_seconds{task}      histogram of run time
+- workflow_task_runs_total{task,status}     runs by outcome (ok, error,
+                                            cancelled); on Render a failed
+                                            run is what triggers a retry
+- workflow_task_retries_total{task}         in-process retries (see retry_policy.py)
+- workflow_task_retries_denied_total{task,reason}
+                                            failures not retried: permanent
+                                            error, deadline or budget spent
+- workflow_subtasks_started{task}           histogram of subtasks per run
+- workflow_subtask_fanout_width{task}       histogram of peak concurrent subtasks
+- workflow_subtasks_cancelled_total{task}   in-flight subtask calls cancelled
+                                            (see cancellation.py)
+- workflow_task_pool_wait_seconds{task,pool}
+                                            time a sync or CPU-bound task waited
+                                            for a pool worker (see offload.py)
+
+plus the OpenAI counters kept by model_routing, hedging and openai_pool
+(tokens by model, hedges, connection pool wait), read at export time.
+
+Counters are plain numbers behind a per-metric lock, cheap enough to
+update on every task run. Each Render task run is its own short-lived
+process, so the worker cannot simply be scraped. Pick an export mode:
+
+- WORKER_METRICS_PORT: serve /metrics from this process, started by
+  main.py (long-lived runners such as local_executor.py). If the port is
+  taken, say by another run on the same instance, the worker runs
+  without it.
+- METRICS_PUSHGATEWAY_URL: push to a Prometheus Pushgateway after every
+  task run, grouped by job="workflow-worker" and entry_task=<task>. Each
+  push replaces the group, so the gateway holds the latest run of each
+  task (a fixed number of groups) rather than one group per process.
+  Read it like any Pushgateway batch job: gauges of the last run plus
+  push_time_seconds, not counters to rate().
+"""
+
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from render_sdk.workflows.task import _current_client
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+FANOUT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+Sample = tuple[str, dict, float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, label_values: tuple) -> tuple:
+        if len(label_values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in label_values)
+
+    def samples(self) -> list[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.label_names, key)), value) for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value: float) -> None:
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        key = self._key(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> list[Sample]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """Metrics plus callbacks that produce samples at export time."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[tuple[str, str, str, list[tuple[dict, float]]]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DURATION_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable) -> None:
+        """`collector()` returns [(name, kind, help, [(labels, value), ...]), ...]."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"[Metrics] Collector failed: {e}")
+                continue
+            for name, kind, documentation, values in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+task_duration = REGISTRY.histogram(
+    "workflow_task_duration_seconds", "Task run duration", ("task",)
+)
+task_runs = REGISTRY.counter(
+    "workflow_task_runs_total", "Task runs by outcome", ("task", "status")
+)
+task_retries = REGISTRY.counter(
+    "workflow_task_retries_total", "Task retries", ("task",)
+)
+task_retries_denied = REGISTRY.counter(
+    "workflow_task_retries_denied_total", "Failed task attempts not retried, by reason", ("task", "reason")
+)
+subtasks_started = REGISTRY.histogram(
+    "workflow_subtasks_started", "Subtasks started per task run", ("task",), FANOUT_BUCKETS
+)
+fanout_width = REGISTRY.histogram(
+    "workflow_subtask_fanout_width", "Peak concurrent subtasks per task run", ("task",), FANOUT_BUCKETS
+)
+subtasks_cancelled = REGISTRY.counter(
+    "workflow_subtasks_cancelled_total", "In-flight subtask calls cancelled", ("task",)
+)
+task_pool_wait = REGISTRY.histogram(
+    "workflow_task_pool_wait_seconds", "Time a task waited for a pool worker", ("task", "pool")
+)
+
+
+def _openai_families() -> list:
+    """OpenAI counters kept by the routing, hedging and pool modules."""
+    families = []
+    model_routing = sys.modules.get("model_routing")
+    if model_routing is not None:
+        models = model_routing.model_metrics()
+        families += [
+            ("openai_requests_total", "counter", "OpenAI calls by model",
+             [({"model": m}, s["calls"]) for m, s in models.items()]),
+            ("openai_tokens_total", "counter", "OpenAI tokens by model and kind",
+             [({"model": m, "kind": "prompt"}, s["prompt_tokens"]) for m, s in models.items()]
+             + [({"model": m, "kind": "completion"}, s["completion_tokens"]) for m, s in models.items()]),
+            ("openai_latency_seconds_total", "counter", "Total OpenAI call latency by model",
+             [({"model": m}, s["total_latency_ms"] / 1000) for m, s in models.items()]),
+        ]
+    hedging = sys.modules.get("hedging")
+    if hedging is not None:
+        hedges = hedging.hedge_metrics()
+        families.append(("openai_hedges_total", "counter", "Hedged OpenAI requests by outcome", [
+            ({"outcome": "sent"}, hedges["hedges_sent"]),
+            ({"outcome": "won"}, hedges["hedges_won"]),
+            ({"outcome": "suppressed"}, hedges["hedges_suppressed"]),
+        ]))
+    openai_pool = sys.modules.get("openai_pool")
+    if openai_pool is not None:
+        pool = openai_pool.pool_metrics()
+        families += [
+            ("openai_pool_requests_total", "counter", "Requests through the OpenAI connection pool",
+             [({}, pool["requests"])]),
+            ("openai_pool_queued_total", "counter", "Requests that waited for a pooled connection",
+             [({}, pool["queued"])]),
+            ("openai_pool_wait_seconds_total", "counter", "Total time spent waiting for a connection",
+             [({}, pool["total_wait_ms"] / 1000)]),
+        ]
+    return families
+
+
+REGISTRY.add_collector(_openai_families)
+
+
+class _CountingClient:
+    """Wraps the subtask client to count subtasks and their peak concurrency."""
+
+    def __init__(self, client):
+        self._client = client
+        self.started = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None):
+        self.started += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await self._client.run_subtask(task_name, input_data)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _record(name: str, started: float, error: BaseException | None) -> None:
+    task_duration.observe(time.perf_counter() - started, name)
+    if error is None:
+        status = "ok"
+    elif isinstance(error, asyncio.CancelledError):
+        status = "cancelled"
+    else:
+        status = "error"
+    task_runs.inc(name, status)
+
+
+def instrumented(func):
+    """Wrap a task function to record duration, outcome and subtask fan-out."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            client = _current_client.get(None)
+            counting = _CountingClient(client) if client is not None else None
+            token = _current_client.set(counting) if counting is not None else None
+            started = time.perf_counter()
+            error = None
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                if token is not None:
+                    _current_client.reset(token)
+                _record(name, started, error)
+                if counting is not None:
+                    subtasks_started.observe(counting.started, name)
+                    fanout_width.observe(counting.peak, name)
+                    if counting.cancelled:
+                        subtasks_cancelled.inc(name, amount=counting.cancelled)
+                if os.getenv("METRICS_PUSHGATEWAY_URL"):
+                    await asyncio.to_thread(push, name)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _record(name, started, error)
+            if os.getenv("METRICS_PUSHGATEWAY_URL"):
+                push(name)
+
+    return sync_wrapper
+
+
+def push(task: str) -> None:
+    """Push all metrics to METRICS_PUSHGATEWAY_URL as `task`'s group. Never raises."""
+    url = os.getenv("METRICS_PUSHGATEWAY_URL")
+    if not url:
+        return
+    try:
+        import httpx
+
+        httpx.put(
+            f"{url.rstrip('/')}/metrics/job/workflow-worker/entry_task/{task}",
+            content=REGISTRY.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4"},
+            timeout=2.0,
+        )
+    except Exception as e:
+        logger.warning(f"[Metrics] Push to {url} failed: {e}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002 - silence per-request logs
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        payload = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_server: ThreadingHTTPServer | None = None
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer | None:
+    """Serve /metrics from a daemon thread (once per process); None if the port is unavailable."""
+    global _server
+    if _server is None:
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"[Metrics] Not serving /metrics on port {port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        logger.info(f"[Metrics] Serving /metrics on port {port}")
+    return _server
+
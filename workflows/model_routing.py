@@ -0,0 +1,226 @@
+"""
+Latency-aware model routing for OpenAI tasks.
+
+A one-sentence sentiment check does not need the same model as a long
+translation. The router picks between a fast and a strong model from the
+task type, the input length and an optional latency budget, and keeps
+per-model latency and token counters.
+
+Selection order:
+  1. An explicit `model` argument passed to the task
+  2. OPENAI_MODEL_<TASK> (e.g. OPENAI_MODEL_SUMMARIZE_TEXT)
+  3. Fast model for short inputs, strong model otherwise
+  4. If a latency budget is given and the estimate for the chosen model
+     exceeds it, fall back to the fast model
+
+Configuration (environment variables):
+- OPENAI_MODEL_FAST:    fast/cheap model (default gpt-4o-mini)
+- OPENAI_MODEL_STRONG:  high-quality model (default gpt-4)
+
+Observed latencies replace the defaults once a model has
+MIN_OBSERVED_CALLS calls. A Render task run is a fresh process making a
+call or two, so those are only reached there with OPENAI_STATS_DB, which
+shares the counters between runs (see call_stats.py); without it the
+feedback only works in long-lived runners like local_executor.py.
+
+To run against a local OpenAI-compatible stub, set OPENAI_BASE_URL; the
+openai SDK picks it up automatically.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+
+from call_stats import get_call_stats
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Samples needed before observed latencies replace the defaults below
+MIN_OBSERVED_CALLS = 5
+
+# How often shared counters are re-read from OPENAI_STATS_DB
+REFRESH_SECONDS = 30.0
+
+
+@dataclass
+class TaskProfile:
+    """How a task type's inputs map to models."""
+    short_input_chars: int
+    output_tokens: int | None  # None: output is about as long as the input
+
+
+TASK_PROFILES = {
+    "analyze_text_sentiment": TaskProfile(short_input_chars=600, output_tokens=80),
+    "translate_text": TaskProfile(short_input_chars=300, output_tokens=None),
+    "summarize_text": TaskProfile(short_input_chars=1500, output_tokens=150),
+}
+
+
+@dataclass
+class ModelProfile:
+    """Default latency model: base overhead plus time per output token."""
+    base_ms: float
+    ms_per_output_token: float
+
+
+@dataclass
+class ModelStats:
+    """Per-model call counters."""
+    calls: int = 0
+    total_latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.total_latency_ms / self.calls if self.calls else 0.0
+
+    def counts(self, model: str) -> dict[str, float]:
+        """The counters as call_stats counter names."""
+        return {f"model:{model}:{f.name}": getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_counters(cls, model: str, counters: dict[str, float]) -> "ModelStats":
+        prefix = f"model:{model}:"
+        return cls(**{
+            f.name: f.type(counters[prefix + f.name]) for f in fields(cls) if prefix + f.name in counters
+        })
+
+
+@dataclass
+class RouteDecision:
+    """The chosen model and why."""
+    model: str
+    reason: str
+    estimated_ms: float
+
+
+class ModelRouter:
+    """
+    Chooses models per call and records per-model metrics.
+
+    `stats` counts this process's calls (exported as metrics); estimates
+    use `observed`, the same counters summed over every process sharing
+    OPENAI_STATS_DB, or this process's alone without it.
+    """
+
+    def __init__(self, fast_model: str | None = None, strong_model: str | None = None):
+        self.fast_model = fast_model or os.getenv("OPENAI_MODEL_FAST", "gpt-4o-mini")
+        self.strong_model = strong_model or os.getenv("OPENAI_MODEL_STRONG", "gpt-4")
+        self.profiles = {
+            self.fast_model: ModelProfile(base_ms=400, ms_per_output_token=8),
+            self.strong_model: ModelProfile(base_ms=1200, ms_per_output_token=35),
+        }
+        self.stats: dict[str, ModelStats] = {}
+        self.observed: dict[str, ModelStats] = {}
+        self._refreshed = 0.0
+
+    async def refresh(self) -> None:
+        """Re-read the shared counters if they are older than REFRESH_SECONDS."""
+        shared = get_call_stats()
+        if shared is None or time.monotonic() - self._refreshed < REFRESH_SECONDS:
+            return
+        self._refreshed = time.monotonic()
+        counters = await asyncio.to_thread(shared.counters, "model:")
+        models = {name.split(":")[1] for name in counters}
+        self.observed = {model: ModelStats.from_counters(model, counters) for model in models}
+
+    def estimate_ms(self, model: str, task_type: str, input_chars: int) -> float:
+        """Predict latency for one call from observed or default timings."""
+        stats = self.observed.get(model) if get_call_stats() is not None else self.stats.get(model)
+        profile = self.profiles.get(model, self.profiles[self.strong_model])
+        task = TASK_PROFILES.get(task_type)
+        output_tokens = (
+            task.output_tokens if task and task.output_tokens is not None
+            else input_chars / CHARS_PER_TOKEN
+        )
+        estimate = profile.base_ms + output_tokens * profile.ms_per_output_token
+        if stats and stats.calls >= MIN_OBSERVED_CALLS and stats.completion_tokens:
+            # Scale the default by how this model has actually performed
+            expected_avg = profile.base_ms + (
+                stats.completion_tokens / stats.calls
+            ) * profile.ms_per_output_token
+            estimate *= stats.avg_latency_ms / expected_avg
+        return estimate
+
+    async def choose(
+        self,
+        task_type: str,
+        input_chars: int,
+        latency_budget_ms: float | None = None,
+        model: str | None = None,
+    ) -> RouteDecision:
+        """Pick the model for one call."""
+        await self.refresh()
+        if model:
+            decision = RouteDecision(model, "override", self.estimate_ms(model, task_type, input_chars))
+        elif os.getenv(f"OPENAI_MODEL_{task_type.upper()}"):
+            env_model = os.getenv(f"OPENAI_MODEL_{task_type.upper()}")
+            decision = RouteDecision(
+                env_model, "env override", self.estimate_ms(env_model, task_type, input_chars)
+            )
+        else:
+            task = TASK_PROFILES.get(task_type)
+            short = task is not None and input_chars <= task.short_input_chars
+            chosen = self.fast_model if short else self.strong_model
+            decision = RouteDecision(
+                chosen,
+                "short input" if short else "long input",
+                self.estimate_ms(chosen, task_type, input_chars),
+            )
+            if (
+                latency_budget_ms is not None
+                and chosen != self.fast_model
+                and decision.estimated_ms > latency_budget_ms
+            ):
+                decision = RouteDecision(
+                    self.fast_model,
+                    "latency budget",
+                    self.estimate_ms(self.fast_model, task_type, input_chars),
+                )
+
+        logger.info(
+            f"[Model Routing] {task_type}: {decision.model} ({decision.reason}, "
+            f"~{decision.estimated_ms:.0f}ms, {input_chars} chars, budget={latency_budget_ms})"
+        )
+        return decision
+
+    async def record(self, model: str, latency_ms: float, usage=None) -> None:
+        """Record one completed call; `usage` is the OpenAI usage object."""
+        call = ModelStats(calls=1, total_latency_ms=latency_ms)
+        if usage is not None:
+            call.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            call.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        stats = self.stats.setdefault(model, ModelStats())
+        stats.calls += call.calls
+        stats.total_latency_ms += call.total_latency_ms
+        stats.prompt_tokens += call.prompt_tokens
+        stats.completion_tokens += call.completion_tokens
+        shared = get_call_stats()
+        if shared is not None:
+            totals = await asyncio.to_thread(shared.add, call.counts(model))
+            if totals:
+                self.observed[model] = ModelStats.from_counters(model, totals)
+
+
+_router: ModelRouter | None = None
+
+
+def get_router() -> ModelRouter:
+    """Get the process-wide ModelRouter."""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
+
+
+def model_metrics() -> dict:
+    """Per-model latency and token counters for metrics export."""
+    return {
+        model: {**asdict(stats), "avg_latency_ms": stats.avg_latency_ms}
+        for model, stats in get_router().stats.items()
+    }
@@ -0,0 +1,207 @@
+"""
+Run sync and CPU-bound tasks off the worker's event loop.
+
+The SDK calls a sync task function directly on the event loop, and an
+async task that only computes (tree_cube on big integers) never yields.
+While either runs, every other coroutine in the process waits: subtask
+calls in flight, heartbeats, the metrics server, and on the local
+executor every other task of the tree.
+
+Tasks registered on the app are wrapped (see app.py) so that:
+
+- sync tasks run on a thread pool (TASK_POOL)
+- tasks registered with `cpu_bound=True` run on TASK_CPU_POOL, a
+  process pool by default, so big-integer arithmetic runs in parallel
+  instead of taking turns on the GIL. `cpu_bound` can also be a
+  predicate on the call's arguments; calls it rejects run inline. A
+  round trip to a pool process costs about as much as cubing a
+  1000-digit number, so the arithmetic tasks use `big_ints`: only calls
+  with an integer of TASK_CPU_MIN_BITS or more are offloaded.
+- async tasks stay on the loop
+
+Configuration (environment variables):
+- TASK_POOL: thread, process or off (run inline, as before). Defaults
+  to thread, and to off in a Render task run (RENDER_SDK_MODE=run),
+  which is a process running a single task
+- TASK_CPU_POOL: pool for cpu_bound tasks: process, thread or off.
+  Defaults to process, and to off in a Render task run, where starting
+  the forkserver and a pool process that imports the worker again would
+  cost more than the one task could gain
+- TASK_POOL_WORKERS: size of each pool (default: the machine's cores)
+- TASK_CPU_MIN_BITS: smallest integer argument, in bits, that sends a
+  big_ints call to its pool (default 4096, about 1200 digits)
+
+Tasks on a process pool get their arguments and return their result by
+pickling, and run without the caller's context: no deadline or log
+sampling inside them, and they cannot call subtasks. Only mark tasks
+that compute from their arguments. Each Render task run is its own
+process, so there a pool only pays off for tasks that share a loop (the
+local executor, long-lived runners), and both pools default to off.
+
+Process pools start their workers with forkserver (spawn where it is
+not available), never fork: the worker has threads by then (the SDK
+client, the LOG_ASYNC listener, the metrics server), and a forked child
+inherits their locks in whatever state they were.
+
+Time spent waiting for a pool worker is recorded as
+workflow_task_pool_wait_seconds{task,pool}.
+"""
+
+import asyncio
+import contextvars
+import functools
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from log_config import configure_logging
+from metrics import task_pool_wait
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process", "off")
+DEFAULT_CPU_MIN_BITS = 4096
+
+# Functions that run on a process pool, by (module, name). A pool process
+# finds them here after importing the module (which registers its tasks
+# again), since the module attribute is the SDK's task callable, not the
+# function.
+_functions: dict[tuple[str, str], object] = {}
+
+_pools: dict[str, Executor] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_kind(variable: str, default: str) -> str:
+    kind = os.getenv(variable, default).strip().lower()
+    if kind not in POOL_KINDS:
+        logger.warning(f"Ignoring {variable}={kind!r}; use one of {', '.join(POOL_KINDS)}")
+        return default
+    return kind
+
+
+def pool_workers() -> int:
+    value = os.getenv("TASK_POOL_WORKERS")
+    if value:
+        try:
+            return max(int(value), 1)
+        except ValueError:
+            logger.warning(f"Ignoring malformed TASK_POOL_WORKERS: {value!r}")
+    return os.cpu_count() or 1
+
+
+def _cpu_min_bits() -> int:
+    value = os.getenv("TASK_CPU_MIN_BITS")
+    if value:
+        try:
+            return max(int(value), 0)
+        except ValueError:
+            logger.warning(f"Ignoring malformed TASK_CPU_MIN_BITS: {value!r}")
+    return DEFAULT_CPU_MIN_BITS
+
+
+def big_ints(*args, **kwargs) -> bool:
+    """cpu_bound predicate: an integer argument has TASK_CPU_MIN_BITS or more."""
+    values = (*args, *kwargs.values())
+    bits = max((abs(v).bit_length() for v in values if isinstance(v, int)), default=0)
+    return bits >= _cpu_min_bits()
+
+
+def _pool_default(kind: str) -> str:
+    """`kind`, or off in a Render task run, where the process runs a single task."""
+    return "off" if os.getenv("RENDER_SDK_MODE") == "run" else kind
+
+
+def _init_process() -> None:
+    # A pool process starts fresh: set logging up as the worker did
+    configure_logging()
+
+
+def _process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool(kind: str) -> Executor:
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            if kind == "process":
+                pool = ProcessPoolExecutor(
+                    max_workers=pool_workers(), mp_context=_process_context(), initializer=_init_process
+                )
+            else:
+                pool = ThreadPoolExecutor(max_workers=pool_workers(), thread_name_prefix="task-pool")
+            _pools[kind] = pool
+        return pool
+
+
+def shutdown_pools() -> None:
+    """Shut down the pools (they are created again on the next offloaded run)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _timed(submitted: float, func, args, kwargs) -> tuple[float, object]:
+    """Run func in a pool worker; returns (seconds it waited for the worker, result)."""
+    return time.time() - submitted, func(*args, **kwargs)
+
+
+def _call_registered(key: tuple[str, str], submitted: float, args, kwargs) -> tuple[float, object]:
+    """Run a registered function inside a pool process."""
+    func = _functions.get(key)
+    if func is None:
+        module = importlib.import_module(key[0])
+        # Registered again by the import (a main script is __mp_main__ in
+        # a pool process), or registered by a call the import does not
+        # repeat, in which case the module attribute is the plain function
+        func = _functions.get((module.__name__, key[1])) or getattr(module, key[1])
+    return _timed(submitted, func, args, kwargs)
+
+
+def offloaded(func, cpu_bound: bool | Callable[..., bool] = False):
+    """
+    Wrap a sync task function to run on its pool; returns an async function.
+
+    Async functions are returned as is. The pool is read from the
+    environment on each run; with the pool off (or a call the cpu_bound
+    predicate rejects) the function runs inline on the loop, as the SDK
+    would run it.
+    """
+    if asyncio.iscoroutinefunction(func):
+        if cpu_bound:
+            raise TypeError(f"cpu_bound task {func.__name__} must be a sync function")
+        return func
+    name = func.__name__
+    key = (func.__module__, name)
+    _functions[key] = func
+
+    @functools.wraps(func)
+    async def offload_wrapper(*args, **kwargs):
+        if cpu_bound:
+            kind = _pool_kind("TASK_CPU_POOL", _pool_default("process"))
+        else:
+            kind = _pool_kind("TASK_POOL", _pool_default("thread"))
+        if kind == "off" or (callable(cpu_bound) and not cpu_bound(*args, **kwargs)):
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        if kind == "process":
+            call = functools.partial(_call_registered, key, submitted, args, kwargs)
+        else:
+            # In the caller's context, as on the loop (deadline, retry budget)
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, _timed, submitted, func, args, kwargs)
+        waited, result = await loop.run_in_executor(_get_pool(kind), call)
+        task_pool_wait.observe(waited, name, kind)
+        return result
+
+    return offload_wrapper
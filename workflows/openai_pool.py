@@ -0,0 +1,182 @@
+"""
+Connection pooling for the OpenAI client.
+
+Passing our own http_client replaces the openai SDK's default limits
+(1000 connections, 100 keep-alive), so this module builds the httpx
+client used by AsyncOpenAI with those limits as the floor, plus optional
+HTTP/2 and keep-alive tuning, and measures how long requests wait for a
+pooled connection so queueing shows up in metrics.
+
+Configuration (environment variables):
+- OPENAI_MAX_CONNECTIONS:       max concurrent connections (default and minimum 1000)
+- OPENAI_MAX_KEEPALIVE:         idle connections kept open (default and minimum 100)
+- OPENAI_KEEPALIVE_EXPIRY:      seconds an idle connection is kept (default 30)
+- OPENAI_HTTP2:                 "true" to negotiate HTTP/2 (needs the h2 package)
+- OPENAI_TIMEOUT_SECONDS:       overall request timeout (default 600)
+- OPENAI_WARMUP_CONNECTIONS:    connections to open when a client is created (default 0)
+
+Connections belong to the event loop that opened them, and the SDK gives
+a task run no hook on its loop before the task starts. So the warm-up
+starts with the client, in the first OpenAI task of a process, and
+overlaps that task's preparation. A Render task run pays it once per
+run; long-lived runners such as local_executor.py pay it once per loop.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events that mark the end of the wait for a pool slot
+_CONNECTION_ACQUIRED_EVENTS = (
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+# Must match openai._constants.DEFAULT_CONNECTION_LIMITS (openai is only
+# imported on first use, so it is not read from there)
+SDK_MAX_CONNECTIONS = 1000
+SDK_MAX_KEEPALIVE = 100
+
+# Waits shorter than this are lock bookkeeping, not queueing
+QUEUED_THRESHOLD_MS = 5.0
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _at_least(name: str, floor: int) -> int:
+    """Integer setting that may raise but not lower the SDK's limit."""
+    value = int(os.getenv(name, str(floor)))
+    if value < floor:
+        logger.warning(f"{name}={value} is below the openai SDK default, using {floor}")
+        return floor
+    return value
+
+
+@dataclass
+class PoolConfig:
+    """Connection pool settings, usually read from the environment."""
+    max_connections: int = SDK_MAX_CONNECTIONS
+    max_keepalive: int = SDK_MAX_KEEPALIVE
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    timeout: float = 600.0
+    warmup_connections: int = 0
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            max_connections=_at_least("OPENAI_MAX_CONNECTIONS", SDK_MAX_CONNECTIONS),
+            max_keepalive=_at_least("OPENAI_MAX_KEEPALIVE", SDK_MAX_KEEPALIVE),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+            http2=_env_flag("OPENAI_HTTP2"),
+            timeout=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "600")),
+            warmup_connections=int(os.getenv("OPENAI_WARMUP_CONNECTIONS", "0")),
+        )
+
+
+@dataclass
+class PoolStats:
+    """Pool wait-time counters since the process started."""
+    requests: int = 0
+    queued: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+
+_stats = PoolStats()
+
+
+class _PoolTimingTransport(httpx.AsyncHTTPTransport):
+    """Transport that records how long each request waits for a connection."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        acquired: list[float] = []
+        inner_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if not acquired and event_name in _CONNECTION_ACQUIRED_EVENTS:
+                acquired.append(time.monotonic())
+            if inner_trace is not None:
+                await inner_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            if acquired:
+                _record_wait((acquired[0] - started) * 1000)
+
+
+def _record_wait(wait_ms: float) -> None:
+    _stats.requests += 1
+    _stats.total_wait_ms += wait_ms
+    _stats.max_wait_ms = max(_stats.max_wait_ms, wait_ms)
+    if wait_ms >= QUEUED_THRESHOLD_MS:
+        _stats.queued += 1
+        logger.debug(f"[OpenAI Pool] request waited {wait_ms:.1f}ms for a connection")
+
+
+def build_http_client(config: PoolConfig | None = None) -> httpx.AsyncClient:
+    """Build the httpx client handed to AsyncOpenAI(http_client=...)."""
+    config = config or PoolConfig.from_env()
+
+    http2 = config.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "OPENAI_HTTP2 is set but the h2 package is not installed - "
+            "falling back to HTTP/1.1. Install with: pip install 'httpx[http2]'"
+        )
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    transport = _PoolTimingTransport(limits=limits, http2=http2)
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(config.timeout, connect=5.0),
+        follow_redirects=True,
+    )
+
+
+async def warm_up(client, connections: int) -> None:
+    """
+    Open `connections` pooled connections ahead of the first real call.
+
+    Uses the free models endpoint, so TLS handshakes are paid before a
+    fan-out starts instead of during it. Failures are only logged.
+    """
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(client.models.list() for _ in range(connections)), return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    elapsed_ms = (time.monotonic() - started) * 1000
+    if failures:
+        logger.warning(f"[OpenAI Pool] warm-up: {len(failures)}/{connections} failed: {failures[0]}")
+    else:
+        logger.info(f"[OpenAI Pool] warm-up opened {connections} connections in {elapsed_ms:.0f}ms")
+
+
+def pool_metrics() -> dict:
+    """Snapshot of pool wait-time counters for metrics export."""
+    metrics = asdict(_stats)
+    metrics["avg_wait_ms"] = _stats.total_wait_ms / _stats.requests if _stats.requests else 0.0
+    return metrics
@@ -0,0 +1,295 @@
+"""
+Offline OpenAI-compatible stub server.
+
+Serves /v1/chat/completions (plain and streamed) and /v1/models with
+deterministic responses, so the OpenAI task family can be benchmarked
+without spending money or inheriting OpenAI's latency variance.
+
+- Latency: log-normal around a median, plus an optional slow tail
+  (a fraction of requests take `tail_multiplier` times longer)
+- Token throughput: generation time grows with completion tokens
+- 429 injection: a fraction of requests are rejected with Retry-After
+- Determinism: the reply is derived from a hash of the request, so the
+  same prompt always gets the same answer (and the same latency when a
+  seed is set)
+
+Point the tasks at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage:
+    python openai_stub.py --port 8130 --median-ms 800 --tokens-per-sec 60 --rate-limit 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server."""
+    median_ms: float = 500.0
+    sigma: float = 0.3
+    tail_probability: float = 0.0
+    tail_multiplier: float = 8.0
+    tokens_per_sec: float = 0.0  # 0 disables token-proportional generation time
+    rate_limit: float = 0.0
+    retry_after_ms: int = 100
+    seed: int | None = None
+
+
+class StubState:
+    """Shared counters, guarded by a lock (the server is threaded)."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.latencies_ms: list[float] = []
+        self._random = random.Random(config.seed)
+
+    def sample_latency(self, key: str) -> float:
+        """Seconds of base latency for one request."""
+        config = self.config
+        rng = random.Random(f"{config.seed}:{key}") if config.seed is not None else self._random
+        with self.lock:
+            latency = rng.lognormvariate(0, config.sigma) * config.median_ms / 1000
+            if rng.random() < config.tail_probability:
+                latency *= config.tail_multiplier
+                self.counters["tail_requests"] += 1
+        return latency
+
+    def should_rate_limit(self) -> bool:
+        with self.lock:
+            return self._random.random() < self.config.rate_limit
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            latencies = sorted(self.latencies_ms)
+            stats = dict(self.counters)
+            if latencies:
+                stats["total_latency_ms"] = sum(latencies)
+                stats["p50_ms"] = latencies[len(latencies) // 2]
+                stats["p99_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            return stats
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.latencies_ms.clear()
+
+
+def _reply_for(request: dict) -> str:
+    """Deterministic reply text for a chat completion request."""
+    messages = request.get("messages", [])
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    digest = int(hashlib.sha256(f"{system}\n{user}".encode()).hexdigest(), 16)
+
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        sentiment = SENTIMENTS[digest % len(SENTIMENTS)]
+        return json.dumps({
+            "sentiment": sentiment,
+            "explanation": f"Stub analysis ({digest % 1000:03d}) judged the text {sentiment}.",
+        })
+
+    words = user.split()
+    if "summar" in system.lower():
+        return " ".join(words[: max(5, len(words) // 5)]) + "."
+    # Translation and anything else: echo with a stable marker, same length
+    return f"[stub-{digest % 1000:03d}] {user}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState  # set on the subclass built by make_server()
+
+    def log_message(self, format, *args):  # noqa: A002 - silence per-request logs
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        elif self.path == "/_stats":
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/_reset":
+            self.state.reset()
+            self._send_json(200, {"ok": True})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        state = self.state
+        with state.lock:
+            state.counters["requests"] += 1
+        started = time.monotonic()
+
+        if state.should_rate_limit():
+            with state.lock:
+                state.counters["rate_limited"] += 1
+            retry_after = state.config.retry_after_ms
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after-ms": str(retry_after), "retry-after": str(max(1, retry_after // 1000))},
+            )
+            return
+
+        text = _reply_for(body)
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // CHARS_PER_TOKEN
+        completion_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        key = json.dumps(body.get("messages", []), sort_keys=True)
+        base_latency = state.sample_latency(key)
+        generation = (
+            completion_tokens / state.config.tokens_per_sec if state.config.tokens_per_sec else 0.0
+        )
+        model = body.get("model", "stub")
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            self._stream(model, text, base_latency, generation, usage if include_usage else None)
+        else:
+            time.sleep(base_latency + generation)
+            self._send_json(200, {
+                "id": f"chatcmpl-stub-{state.counters['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        with state.lock:
+            state.counters["completed"] += 1
+            state.counters["completion_tokens"] += completion_tokens
+            state.latencies_ms.append((time.monotonic() - started) * 1000)
+
+    def _stream(self, model: str, text: str, first_token_delay: float, generation: float,
+                usage: dict | None = None) -> None:
+        """
+        Send the reply as SSE chunks, spreading generation time across them.
+        With `usage` (stream_options.include_usage), a last chunk without
+        choices carries it, as OpenAI's does.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(event: str) -> None:
+            data = event.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        time.sleep(first_token_delay)
+        pieces = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        for piece in pieces:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            send(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(generation / len(pieces))
+        if usage is not None:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            send(f"data: {json.dumps(chunk)}\n\n")
+        send("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Build a stub server; port 0 picks a free port."""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(config: StubConfig) -> tuple[ThreadingHTTPServer, str]:
+    """Start a stub in a background thread; returns (server, base_url)."""
+    server = make_server(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline OpenAI stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8130)
+    parser.add_argument("--median-ms", type=float, default=500.0)
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal spread")
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-multiplier", type=float, default=8.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        median_ms=args.median_ms,
+        sigma=args.sigma,
+        tail_probability=args.tail_probability,
+        tail_multiplier=args.tail_multiplier,
+        tokens_per_sec=args.tokens_per_sec,
+        rate_limit=args.rate_limit,
+        retry_after_ms=args.retry_after_ms,
+        seed=args.seed,
+    )
+    server = make_server(config, args.host, args.port)
+    print(f"OpenAI stub listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
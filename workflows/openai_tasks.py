@@ -7,35 +7,59 @@ patterns of AI-powered workflows.
 Requirements:
 - OpenAI API key set in OPENAI_API_KEY environment variable
 - openai package installed
+
+Set OPENAI_HEDGE_ENABLED=true to hedge straggling calls (see hedging.py).
+translate_text and summarize_text accept stream=True to publish partial
+output as progress events while the completion is generated (see progress.py).
+Models are chosen per call by model_routing.py from input length, task type
+and an optional latency budget; pass model=... to force one.
 """
 
+import asyncio
 import json
 import logging
 import os
+import time
+import weakref
+from typing import TYPE_CHECKING
 from app import app
+from deadline import latency_budget
+from hedging import get_hedger
+from model_routing import get_router
+from openai_pool import PoolConfig, build_http_client, warm_up
+from progress import ProgressPublisher
 from render_sdk import Retry
 
-logger = logging.getLogger(__name__)
-
-# OpenAI client initialization (lazy loading)
-_openai_client = None
-_openai_import_error = None
-
-try:
+if TYPE_CHECKING:
     from openai import AsyncOpenAI
-except ImportError as e:
-    _openai_import_error = e
-    logger.warning(
-        "OpenAI package not installed - OpenAI tasks will fail. "
-        "Install with: pip install openai"
-    )
 
-def get_openai_client():
-    """
-    Get or initialize the OpenAI client.
+logger = logging.getLogger(__name__)
 
-    This function initializes the client lazily, checking for the API key
-    at the time of the first call rather than at module import time.
+# OpenAI client initialization (lazy loading, one client per event loop).
+# The openai package itself is imported on first use: it takes most of a
+# second to import, and every task run is a fresh worker process, so
+# runs of the arithmetic tasks should not pay for it.
+_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+# Pool warm-ups in progress or done, per event loop
+_warmups: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = (
+    weakref.WeakKeyDictionary()
+)
+
+async def get_openai_client():
+    """
+    Get or initialize the OpenAI client for the running event loop.
+
+    This function initializes the client lazily, importing openai and
+    checking for the API key at the time of the first call rather than at
+    module import time.
+    httpx connection pools are bound to the loop that created them, so
+    each event loop gets its own client with the pool limits from
+    openai_pool.PoolConfig. With OPENAI_WARMUP_CONNECTIONS set, a new
+    client starts warming up its pool in the background; requests wait
+    for it just before they are sent (see _warmed_up), so model routing
+    and the rest of a task's preparation overlap the warm-up.
 
     Returns:
         AsyncOpenAI: The initialized OpenAI client
@@ -44,14 +68,16 @@ def get_openai_client():
         ImportError: If the openai package is not installed
         ValueError: If OPENAI_API_KEY is not set
     """
-    global _openai_client
-
-    if _openai_import_error:
-        raise ImportError(
-            "OpenAI package not installed. Install with: pip install openai"
-        ) from _openai_import_error
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
+        try:
+            from openai import AsyncOpenAI
+        except ImportError as e:
+            raise ImportError(
+                "OpenAI package not installed. Install with: pip install openai"
+            ) from e
 
-    if _openai_client is None:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError(
@@ -59,14 +85,106 @@ def get_openai_client():
                 "Please set it in your Render environment variables."
             )
 
-        _openai_client = AsyncOpenAI(api_key=api_key)
-        logger.info("OpenAI client initialized successfully")
+        config = PoolConfig.from_env()
+        client = AsyncOpenAI(api_key=api_key, http_client=build_http_client(config))
+        _openai_clients[loop] = client
+        logger.info(
+            f"OpenAI client initialized successfully (max_connections="
+            f"{config.max_connections}, http2={config.http2})"
+        )
+        if config.warmup_connections > 0:
+            _warmups[loop] = loop.create_task(warm_up(client, config.warmup_connections))
+    return client
+
+
+async def _warmed_up() -> None:
+    """Wait for the running loop's pool warm-up, if one is in progress."""
+    warming = _warmups.get(asyncio.get_running_loop())
+    if warming is not None and not warming.done():
+        # Shielded: one cancelled caller must not cancel the others' warm-up
+        await asyncio.shield(warming)
+
+
+async def _create_completion(client, task_type: str, **kwargs):
+    """
+    Create a chat completion through the hedging layer.
+
+    Args:
+        client: The AsyncOpenAI client
+        task_type: Key used to track latencies (usually the task name)
+        **kwargs: Arguments for client.chat.completions.create
+
+    Returns:
+        The ChatCompletion from whichever request answered first
+    """
+    hedger = get_hedger()
+    await _warmed_up()
+    started = time.monotonic()
+    response = await hedger.call(
+        task_type, lambda: client.chat.completions.create(**kwargs)
+    )
+    await get_router().record(
+        kwargs["model"], (time.monotonic() - started) * 1000, response.usage
+    )
+    return response
 
-    return _openai_client
+
+async def _stream_completion(client, task_type: str, **kwargs) -> str:
+    """
+    Consume a streamed chat completion, publishing partial text as it arrives.
+
+    Streams are not hedged: a duplicate would have to replay tokens the
+    user has already seen.
+
+    Args:
+        client: The AsyncOpenAI client
+        task_type: Task name reported in progress events
+        **kwargs: Arguments for client.chat.completions.create
+
+    Returns:
+        The full completion text
+    """
+    publisher = ProgressPublisher(task_type)
+    parts = []
+    usage = None
+    await _warmed_up()
+    started = time.monotonic()
+    # The last chunk then carries the token counts model routing needs
+    stream = await client.chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **kwargs
+    )
+    # Closing the response on cancellation stops generation (and billing)
+    async with stream:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                # Join only when an event is due: joining per token is quadratic
+                if publisher.due():
+                    publisher.update("".join(parts))
+
+    text = "".join(parts)
+    publisher.finish(text)
+    await get_router().record(kwargs["model"], (time.monotonic() - started) * 1000, usage)
+    return text
+
+
+async def _complete_text(client, task_type: str, stream: bool, **kwargs) -> str:
+    """Return the completion text, streamed or in one response."""
+    if stream:
+        return await _stream_completion(client, task_type, **kwargs)
+    response = await _create_completion(client, task_type, **kwargs)
+    return response.choices[0].message.content
 
 
 @app.task(retry=Retry(max_retries=3, wait_duration_ms=2000, backoff_scaling=2.0))
-async def analyze_text_sentiment(text: str) -> dict:
+async def analyze_text_sentiment(
+    text: str, latency_budget_ms: int | None = None, model: str | None = None
+) -> dict:
     """
     Analyze text sentiment using OpenAI GPT.
 
@@ -75,17 +193,25 @@ async def analyze_text_sentiment(text: str) -> dict:
 
     Args:
         text: The text to analyze
+        latency_budget_ms: Optional latency budget used for model routing
+            (capped by the time left before the run's deadline)
+        model: Optional model override
 
     Returns:
         dict with 'sentiment' and 'explanation' keys
     """
     logger.info(f"[OpenAI Task] Analyzing sentiment for text: {text[:50]}...")
 
-    client = get_openai_client()
+    client = await get_openai_client()
+    route = await get_router().choose(
+        "analyze_text_sentiment", len(text), latency_budget(latency_budget_ms), model
+    )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
+        response = await _create_completion(
+            client,
+            "analyze_text_sentiment",
+            model=route.model,
             messages=[
                 {
                     "role": "system",
@@ -110,7 +236,13 @@ async def analyze_text_sentiment(text: str) -> dict:
 
 
 @app.task(retry=Retry(max_retries=3, wait_duration_ms=2000, backoff_scaling=2.0))
-async def translate_text(text: str, target_language: str) -> str:
+async def translate_text(
+    text: str,
+    target_language: str,
+    stream: bool = False,
+    latency_budget_ms: int | None = None,
+    model: str | None = None,
+) -> str:
     """
     Translate text to a target language using OpenAI GPT.
 
@@ -119,6 +251,10 @@ async def translate_text(text: str, target_language: str) -> str:
     Args:
         text: The text to translate
         target_language: Target language (e.g., 'Spanish', 'French', 'Japanese')
+        stream: Publish partial translations as progress events
+        latency_budget_ms: Optional latency budget used for model routing
+            (capped by the time left before the run's deadline)
+        model: Optional model override
 
     Returns:
         Translated text
@@ -127,11 +263,17 @@ async def translate_text(text: str, target_language: str) -> str:
         f"[Translation Task] Translating text to {target_language}: {text[:50]}..."
     )
 
-    client = get_openai_client()
+    client = await get_openai_client()
+    route = await get_router().choose(
+        "translate_text", len(text), latency_budget(latency_budget_ms), model
+    )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
+        translation = await _complete_text(
+            client,
+            "translate_text",
+            stream,
+            model=route.model,
             messages=[
                 {
                     "role": "system",
@@ -145,7 +287,6 @@ async def translate_text(text: str, target_language: str) -> str:
             ],
         )
 
-        translation = response.choices[0].message.content
         logger.info(f"[Translation Task] Translation complete: {translation[:50]}...")
         return translation
 
@@ -155,7 +296,13 @@ async def translate_text(text: str, target_language: str) -> str:
 
 
 @app.task(retry=Retry(max_retries=3, wait_duration_ms=2000, backoff_scaling=2.0))
-async def summarize_text(text: str, max_sentences: int = 3) -> str:
+async def summarize_text(
+    text: str,
+    max_sentences: int = 3,
+    stream: bool = False,
+    latency_budget_ms: int | None = None,
+    model: str | None = None,
+) -> str:
     """
     Summarize text using OpenAI GPT.
 
@@ -164,17 +311,27 @@ async def summarize_text(text: str, max_sentences: int = 3) -> str:
     Args:
         text: The text to summarize
         max_sentences: Maximum number of sentences in summary
+        stream: Publish partial summaries as progress events
+        latency_budget_ms: Optional latency budget used for model routing
+            (capped by the time left before the run's deadline)
+        model: Optional model override
 
     Returns:
         Summarized text
     """
     logger.info(f"[Summary Task] Summarizing text ({len(text)} chars)...")
 
-    client = get_openai_client()
+    client = await get_openai_client()
+    route = await get_router().choose(
+        "summarize_text", len(text), latency_budget(latency_budget_ms), model
+    )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
+        summary = await _complete_text(
+            client,
+            "summarize_text",
+            stream,
+            model=route.model,
             messages=[
                 {
                     "role": "system",
@@ -188,7 +345,6 @@ async def summarize_text(text: str, max_sentences: int = 3) -> str:
             ],
         )
 
-        summary = response.choices[0].message.content
         logger.info(f"[Summary Task] Summary complete: {summary[:50]}...")
         return summary
 
@@ -0,0 +1,201 @@
+"""
+Local stand-in for an OTLP/HTTP trace collector.
+
+Accepts OTLP JSON on POST /v1/traces (what trace_context.py and
+backend/tracing.py send), appends every document to a JSON-lines file
+and prints request waterfalls that span the backend and the worker.
+
+Usage:
+    python otlp_collector.py --port 4318 --output spans.jsonl
+    # backend and worker: OTEL_EXPORTER_OTLP_ENDPOINT=http://127.0.0.1:4318
+
+    python otlp_collector.py --show spans.jsonl                  # every trace
+    python otlp_collector.py --show spans.jsonl --trace-id <id> --chrome trace.json
+
+The --show file can also be one written directly by the exporters via
+TRACE_EXPORT_FILE. --chrome writes the trace in Chrome trace-event
+format for Perfetto (see tracing.py).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tracing import Span, chrome_trace_events  # noqa: E402
+
+BAR_WIDTH = 40
+
+
+def flatten(document: dict) -> list[dict]:
+    """Spans from one OTLP JSON document, tagged with their service name."""
+    spans = []
+    for resource_spans in document.get("resourceSpans", []):
+        attributes = resource_spans.get("resource", {}).get("attributes", [])
+        service = next(
+            (a["value"].get("stringValue") for a in attributes if a["key"] == "service.name"),
+            "unknown",
+        )
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({**span, "service": service})
+    return spans
+
+
+def load_spans(path: str) -> list[dict]:
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                spans.extend(flatten(json.loads(line)))
+    return spans
+
+
+def group_traces(spans: list[dict]) -> dict[str, list[dict]]:
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["traceId"]].append(span)
+    return traces
+
+
+def waterfall(spans: list[dict]) -> list[str]:
+    """Indented timeline of one trace, parents before children."""
+    start = min(int(s["startTimeUnixNano"]) for s in spans)
+    end = max(int(s["endTimeUnixNano"]) for s in spans)
+    total = max(1, end - start)
+    ids = {s["spanId"] for s in spans}
+    children = defaultdict(list)
+    for span in spans:
+        parent = span.get("parentSpanId") if span.get("parentSpanId") in ids else None
+        children[parent].append(span)
+
+    lines = [f"trace {spans[0]['traceId']}  {len(spans)} spans  {total / 1e6:.1f}ms"]
+
+    def emit(span: dict, depth: int) -> None:
+        offset = int(span["startTimeUnixNano"]) - start
+        duration = int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])
+        col = int(offset / total * BAR_WIDTH)
+        width = max(1, int(duration / total * BAR_WIDTH))
+        bar = " " * col + "#" * min(width, BAR_WIDTH - col)
+        failed = " !" if span.get("status", {}).get("code") == 2 else ""
+        label = f"{'  ' * depth}{span['name']} [{span['service']}]"
+        lines.append(
+            f"  {label:<52} |{bar:<{BAR_WIDTH}}| +{offset / 1e6:>8.1f}ms {duration / 1e6:>8.1f}ms{failed}"
+        )
+        for child in sorted(children[span["spanId"]], key=lambda s: int(s["startTimeUnixNano"])):
+            emit(child, depth + 1)
+
+    for root in sorted(children[None], key=lambda s: int(s["startTimeUnixNano"])):
+        emit(root, 0)
+    return lines
+
+
+def to_chrome_trace(spans: list[dict]) -> dict:
+    """Convert OTLP spans for Perfetto / chrome://tracing."""
+    converted = [
+        Span(
+            span_id=span["spanId"],
+            name=span["name"],
+            parent_id=span.get("parentSpanId") or None,
+            start_us=int(span["startTimeUnixNano"]) // 1000,
+            end_us=int(span["endTimeUnixNano"]) // 1000,
+            error=span.get("status", {}).get("message"),
+            attributes={"service": span["service"], "trace_id": span["traceId"]},
+        )
+        for span in spans
+    ]
+    return {"traceEvents": chrome_trace_events(converted), "displayTimeUnit": "ms"}
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    output: str  # set on the subclass built by make_server()
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):  # noqa: A002 - silence per-request logs
+        pass
+
+    def _send_json(self, status: int, body) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            document = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send_json(400, {"error": "expected OTLP JSON"})
+            return
+        with self.lock, open(self.output, "a") as f:
+            f.write(json.dumps(document) + "\n")
+        self._send_json(200, {"partialSuccess": {}})
+
+    def do_GET(self):
+        spans = load_spans(self.output) if os.path.exists(self.output) else []
+        traces = group_traces(spans)
+        if self.path == "/v1/traces":
+            self._send_json(200, {trace_id: len(s) for trace_id, s in traces.items()})
+        elif self.path.startswith("/v1/traces/"):
+            trace_id = self.path.rsplit("/", 1)[-1]
+            if trace_id not in traces:
+                self._send_json(404, {"error": "unknown trace"})
+            else:
+                self._send_json(200, {"spans": traces[trace_id], "waterfall": waterfall(traces[trace_id])})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+def make_server(output: str, host: str = "127.0.0.1", port: int = 4318) -> ThreadingHTTPServer:
+    handler = type("BoundCollectorHandler", (CollectorHandler,), {"output": output})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OTLP trace collector stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="spans.jsonl", help="Where received spans are appended")
+    parser.add_argument("--show", metavar="FILE", help="Print waterfalls from a spans file and exit")
+    parser.add_argument("--trace-id", help="Only this trace (with --show)")
+    parser.add_argument("--chrome", help="Also write the shown spans as a Chrome trace (with --show)")
+    args = parser.parse_args()
+
+    if args.show:
+        traces = group_traces(load_spans(args.show))
+        if args.trace_id:
+            traces = {args.trace_id: traces.get(args.trace_id, [])}
+        shown = []
+        for spans in traces.values():
+            if spans:
+                print("\n".join(waterfall(spans)) + "\n")
+                shown.extend(spans)
+        if args.chrome:
+            with open(args.chrome, "w") as f:
+                json.dump(to_chrome_trace(shown), f)
+            print(f"Wrote {args.chrome}")
+        return
+
+    server = make_server(args.output, args.host, args.port)
+    print(f"OTLP collector listening on http://{args.host}:{args.port}/v1/traces -> {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,22 @@
 Parallel execution examples using asyncio.gather.
 
 Shows how to execute multiple tasks concurrently, including a deep
-recursive tree that spawns 100+ subtasks across 10+ levels.
+recursive tree that spawns 100+ subtasks across 10+ levels. Fan-outs use
+cancellation.gather_cancelling, so a failed or cancelled branch stops
+its siblings instead of leaving them running.
+
+deep_parallel_tree also takes a dataset handle in place of its numbers
+(see datasets.py): the handle is split into per-chunk handles and each
+tree_chunk_process reads only its own slice.
 """
 
-import asyncio
 import logging
 from app import app
 from basic_tasks import square, cube, add_numbers, multiply
+from cancellation import gather_cancelling
+from checkpoint import checkpointed, get_store, input_hash
+from datasets import load, size, split
+from offload import big_ints
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +32,17 @@ async def compute_multiple(numbers: list[int]) -> dict:
     Returns:
         Dict with 'squares' and 'cubes' lists
     """
-    logger.info(f"Processing {len(numbers)} numbers in parallel")
+    logger.info("Processing %d numbers in parallel", len(numbers))
 
     # Launch all square tasks in parallel
     square_tasks = [square(n) for n in numbers]
-    squares = await asyncio.gather(*square_tasks)
-    logger.info(f"Squares computed: {squares}")
+    squares = await gather_cancelling(*square_tasks)
+    logger.info("Squares computed: %s", squares)
 
     # Launch all cube tasks in parallel
     cube_tasks = [cube(n) for n in numbers]
-    cubes = await asyncio.gather(*cube_tasks)
-    logger.info(f"Cubes computed: {cubes}")
+    cubes = await gather_cancelling(*cube_tasks)
+    logger.info("Cubes computed: %s", cubes)
 
     return {
         "input": numbers,
@@ -49,15 +58,15 @@ async def sum_of_squares(numbers: list[int]) -> dict:
 
     Demonstrates parallel computation followed by aggregation.
     """
-    logger.info(f"Calculating sum of squares for {len(numbers)} numbers")
+    logger.info("Calculating sum of squares for %d numbers", len(numbers))
 
     # Compute all squares in parallel
     square_tasks = [square(n) for n in numbers]
-    squares = await asyncio.gather(*square_tasks)
+    squares = await gather_cancelling(*square_tasks)
 
     # Sum the results
     total = sum(squares)
-    logger.info(f"Sum of squares: {total}")
+    logger.info("Sum of squares: %s", total)
 
     return {
         "numbers": numbers,
@@ -89,44 +98,54 @@ async def sum_of_squares(numbers: list[int]) -> dict:
 # With default input of 12 numbers (3 chunks × 4):
 #   L0:1 + L1:1 + L2:3 + L3:12 + L4:12 + L5:12 + L6:1 + L7:6 + L8:6
 #   + L9:1 + L10-11:~6 + L12:1 = ~62 core + extras ≈ 100+ tasks
+#
+# The multiplying leaves (tree_square, tree_cube, tree_pair_multiply) are
+# sync and cpu_bound: on big integers they run on a process pool instead
+# of stalling the event loop (see offload.py).
+#
+# The root and the phases that hold all n values (L1, L6, L9-L11, L12)
+# are also registered on "pro". deep_parallel_tree__pro, started for
+# large inputs (see backend/planning.py), runs them there; the per-chunk
+# and per-pair tasks stay on the default plan.
 # ---------------------------------------------------------------------------
 
-@app.task
-async def tree_square(n: int) -> int:
+@app.task(cpu_bound=big_ints)
+def tree_square(n: int) -> int:
     """L3 leaf: square a number."""
-    logger.info(f"[L3 tree_square] {n}² = {n*n}")
+    logger.info("[L3 tree_square] %s² = %s", n, n * n)
     return n * n
 
-@app.task
-async def tree_cube(n: int) -> int:
+@app.task(cpu_bound=big_ints)
+def tree_cube(n: int) -> int:
     """L4 leaf: cube a number."""
-    logger.info(f"[L4 tree_cube] {n}³ = {n*n*n}")
+    logger.info("[L4 tree_cube] %s³ = %s", n, n * n * n)
     return n * n * n
 
 @app.task
 async def tree_combine(sq: int, cb: int) -> dict:
     """L5: combine a square and cube into a record."""
     total = sq + cb
-    logger.info(f"[L5 tree_combine] {sq} + {cb} = {total}")
+    logger.info("[L5 tree_combine] %s + %s = %s", sq, cb, total)
     return {"square": sq, "cube": cb, "combined": total}
 
 @app.task
-async def tree_chunk_process(chunk: list[int], chunk_id: int) -> dict:
+async def tree_chunk_process(chunk: list[int] | dict, chunk_id: int) -> dict:
     """L2: process one chunk – fans out to L3/L4/L5 for every element."""
-    logger.info(f"[L2 tree_chunk_process] chunk {chunk_id}: {chunk}")
+    chunk = load(chunk)
+    logger.info("[L2 tree_chunk_process] chunk %s: %s", chunk_id, chunk)
 
     sq_tasks = [tree_square(n) for n in chunk]
     cb_tasks = [tree_cube(n) for n in chunk]
-    squares, cubes = await asyncio.gather(
-        asyncio.gather(*sq_tasks),
-        asyncio.gather(*cb_tasks),
+    squares, cubes = await gather_cancelling(
+        gather_cancelling(*sq_tasks),
+        gather_cancelling(*cb_tasks),
     )
 
     combine_tasks = [tree_combine(s, c) for s, c in zip(squares, cubes)]
-    combined = await asyncio.gather(*combine_tasks)
+    combined = await gather_cancelling(*combine_tasks)
 
     chunk_total = sum(r["combined"] for r in combined)
-    logger.info(f"[L2 tree_chunk_process] chunk {chunk_id} total = {chunk_total}")
+    logger.info("[L2 tree_chunk_process] chunk %s total = %s", chunk_id, chunk_total)
     return {
         "chunk_id": chunk_id,
         "elements": chunk,
@@ -134,88 +153,111 @@ async def tree_chunk_process(chunk: list[int], chunk_id: int) -> dict:
         "chunk_total": chunk_total,
     }
 
-@app.task
-async def tree_scatter(numbers: list[int], chunk_size: int) -> dict:
+@app.task(plans=("pro",))
+async def tree_scatter(numbers: list[int] | dict, chunk_size: int) -> dict:
     """L1: split numbers into chunks and process each in parallel."""
-    chunks = [numbers[i:i+chunk_size] for i in range(0, len(numbers), chunk_size)]
-    logger.info(f"[L1 tree_scatter] splitting {len(numbers)} numbers into {len(chunks)} chunks")
+    # Handles split into smaller handles without reading the dataset
+    chunks = split(numbers, chunk_size)
+    logger.info("[L1 tree_scatter] splitting %d numbers into %d chunks", size(numbers), len(chunks))
+
+    # Each chunk is a checkpointed subtree (see checkpoint.py)
+    store = get_store()
 
-    chunk_tasks = [tree_chunk_process(ch, i) for i, ch in enumerate(chunks)]
-    chunk_results = await asyncio.gather(*chunk_tasks)
+    async def process(chunk: list[int] | dict, chunk_id: int):
+        key = ("tree_chunk_process", chunk, chunk_id)
+        return await checkpointed(store, key, lambda: tree_chunk_process(chunk, chunk_id))
+
+    outcomes = await gather_cancelling(*(process(ch, i) for i, ch in enumerate(chunks)))
+    chunk_results = [result for result, _ in outcomes]
 
     scatter_total = sum(r["chunk_total"] for r in chunk_results)
-    logger.info(f"[L1 tree_scatter] scatter total = {scatter_total}")
-    return {
+    logger.info("[L1 tree_scatter] scatter total = %s", scatter_total)
+    result = {
         "num_chunks": len(chunks),
         "chunk_results": chunk_results,
         "scatter_total": scatter_total,
     }
+    if store is not None:
+        restored = sum(1 for _, hit in outcomes if hit)
+        result["checkpoint"] = {"restored": restored, "computed": len(chunks) - restored}
+    return result
 
 @app.task
 async def tree_pair_add(a: int, b: int) -> int:
     """L7: add a pair of values."""
     result = a + b
-    logger.info(f"[L7 tree_pair_add] {a} + {b} = {result}")
+    logger.info("[L7 tree_pair_add] %s + %s = %s", a, b, result)
     return result
 
-@app.task
-async def tree_pair_multiply(a: int, b: int) -> int:
+@app.task(cpu_bound=big_ints)
+def tree_pair_multiply(a: int, b: int) -> int:
     """L8: multiply a pair of values."""
     result = a * b
-    logger.info(f"[L8 tree_pair_multiply] {a} * {b} = {result}")
+    logger.info("[L8 tree_pair_multiply] %s * %s = %s", a, b, result)
     return result
 
-@app.task
+@app.task(plans=("pro",))
 async def tree_cross_reduce(chunk_results: list[dict]) -> dict:
     """L6: cross-reduce – pair up all combined values across chunks and run add+multiply."""
     all_combined = []
     for cr in chunk_results:
         all_combined.extend(r["combined"] for r in cr["records"])
 
-    logger.info(f"[L6 tree_cross_reduce] cross-reducing {len(all_combined)} values")
+    logger.info("[L6 tree_cross_reduce] cross-reducing %d values", len(all_combined))
 
     # Pair up consecutive values
     pairs = list(zip(all_combined[::2], all_combined[1::2]))
     add_tasks = [tree_pair_add(a, b) for a, b in pairs]
     mul_tasks = [tree_pair_multiply(a, b) for a, b in pairs]
-    sums, products = await asyncio.gather(
-        asyncio.gather(*add_tasks),
-        asyncio.gather(*mul_tasks),
+    sums, products = await gather_cancelling(
+        gather_cancelling(*add_tasks),
+        gather_cancelling(*mul_tasks),
     )
 
-    logger.info(f"[L6 tree_cross_reduce] produced {len(sums)} sums, {len(products)} products")
+    logger.info("[L6 tree_cross_reduce] produced %d sums, %d products", len(sums), len(products))
     return {
         "pair_sums": list(sums),
         "pair_products": list(products),
         "num_pairs": len(pairs),
     }
 
-@app.task
+@app.task(plans=("pro",))
 async def tree_partial_sum(values: list[int], depth: int) -> dict:
     """L10+: recursively halve-and-add until a single value remains."""
-    logger.info(f"[L{9+depth} tree_partial_sum] depth={depth}, values={len(values)}")
+    logger.info("[L%d tree_partial_sum] depth=%d, values=%d", 9 + depth, depth, len(values))
 
+    store = get_store()
     if len(values) <= 1:
-        return {"final": values[0] if values else 0, "depth": depth}
-
-    pairs = list(zip(values[::2], values[1::2]))
-    add_tasks = [tree_pair_add(a, b) for a, b in pairs]
-    reduced = list(await asyncio.gather(*add_tasks))
-
-    # If odd count, carry the leftover
-    if len(values) % 2 == 1:
-        reduced.append(values[-1])
-
-    return await tree_partial_sum(reduced, depth + 1)
+        result = {"final": values[0] if values else 0, "depth": depth}
+        if store is not None:
+            result["checkpoint"] = {"restored": 0, "computed": 0}
+        return result
+
+    async def reduce_level() -> list[int]:
+        pairs = list(zip(values[::2], values[1::2]))
+        add_tasks = [tree_pair_add(a, b) for a, b in pairs]
+        reduced = list(await gather_cancelling(*add_tasks))
+
+        # If odd count, carry the leftover
+        if len(values) % 2 == 1:
+            reduced.append(values[-1])
+        return reduced
+
+    # Each level's pair additions are a checkpointed subtree
+    reduced, restored = await checkpointed(store, ("tree_partial_sum", values), reduce_level)
+    result = await tree_partial_sum(reduced, depth + 1)
+    if store is not None:
+        result["checkpoint"]["restored" if restored else "computed"] += 1
+    return result
 
-@app.task
+@app.task(plans=("pro",))
 async def tree_layered_sum(cross_result: dict) -> dict:
     """L9: kick off recursive fan-in over pair sums."""
     values = cross_result["pair_sums"] + cross_result["pair_products"]
-    logger.info(f"[L9 tree_layered_sum] reducing {len(values)} values recursively")
+    logger.info("[L9 tree_layered_sum] reducing %d values recursively", len(values))
     return await tree_partial_sum(values, 1)
 
-@app.task
+@app.task(plans=("pro",))
 async def tree_finalize(scatter: dict, cross: dict, layered: dict) -> dict:
     """L12: collect all results into a final summary."""
     logger.info("[L12 tree_finalize] assembling final result")
@@ -227,8 +269,15 @@ async def tree_finalize(scatter: dict, cross: dict, layered: dict) -> dict:
         "recursive_depth": layered["depth"],
     }
 
-@app.task
-async def deep_parallel_tree(numbers: list[int], chunk_size: int = 4) -> dict:
+def _subtree_counts(result: dict, phase: str) -> dict:
+    """Restored/computed subtrees of a phase; all restored if the phase was."""
+    counts = result.get("checkpoint", {"restored": 0, "computed": 0})
+    if phase == "restored":
+        return {"restored": counts["restored"] + counts["computed"], "computed": 0}
+    return counts
+
+@app.task(plans=("pro",))
+async def deep_parallel_tree(numbers: list[int] | dict, chunk_size: int = 4) -> dict:
     """
     L0 root: orchestrate a 10+ level deep, 100+ task parallel tree.
 
@@ -236,37 +285,62 @@ async def deep_parallel_tree(numbers: list[int], chunk_size: int = 4) -> dict:
     across 12 levels.
 
     Args:
-        numbers:    list of ints to process (recommend 12+ for full depth)
+        numbers:    list of ints to process (recommend 12+ for full depth),
+                    or a dataset handle (see datasets.py)
         chunk_size: how many numbers per chunk (default 4)
 
     Returns:
         dict with full tree results and task statistics
     """
-    logger.info(f"[L0 deep_parallel_tree] START – {len(numbers)} numbers, chunk_size={chunk_size}")
+    n = size(numbers)
+    logger.info("[L0 deep_parallel_tree] START – %d numbers, chunk_size=%s", n, chunk_size)
+
+    # With CHECKPOINT_STORE set, phases a previous attempt finished are
+    # restored instead of recomputed (see checkpoint.py)
+    store = get_store()
+    root_hash = input_hash("deep_parallel_tree", numbers, chunk_size) if store is not None else None
+    phases = {}
+
+    async def phase(name: str, compute):
+        result, restored = await checkpointed(store, (name, root_hash), compute)
+        phases[name] = "restored" if restored else "computed"
+        return result
 
     # L1-L5: scatter phase
-    scatter = await tree_scatter(numbers, chunk_size)
+    scatter = await phase("scatter", lambda: tree_scatter(numbers, chunk_size))
 
     # L6-L8: cross-reduce phase
-    cross = await tree_cross_reduce(scatter["chunk_results"])
+    cross = await phase("cross_reduce", lambda: tree_cross_reduce(scatter["chunk_results"]))
 
     # L9-L11: layered recursive sum
-    layered = await tree_layered_sum(cross)
+    layered = await phase("layered_sum", lambda: tree_layered_sum(cross))
 
     # L12: finalize
     summary = await tree_finalize(scatter, cross, layered)
 
     # Count tasks spawned
-    n = len(numbers)
     num_chunks = scatter["num_chunks"]
     num_pairs = cross["num_pairs"]
     num_cross_vals = len(cross["pair_sums"]) + len(cross["pair_products"])
-    # Rough task count: 1(L0) + 1(L1) + chunks(L2) + n(L3) + n(L4) + n(L5)
-    #   + 1(L6) + pairs(L7) + pairs(L8) + 1(L9) + recursive(L10+) + 1(L12)
+    # Task count: 1(L0) + 1(L1) + chunks(L2) + n(L3) + n(L4) + n(L5)
+    #   + 1(L6) + pairs(L7) + pairs(L8) + 1(L9) + partial sums and their
+    #   pair adds (L10+) + 1(L12); see also backend/explain.py
     recursive_adds = num_cross_vals - 1 if num_cross_vals > 1 else 0
-    total_tasks = 1 + 1 + num_chunks + n + n + n + 1 + num_pairs + num_pairs + 1 + recursive_adds + 1
+    recursive_calls = layered["depth"]
+    total_tasks = (
+        1 + 1 + num_chunks + n + n + n + 1 + num_pairs + num_pairs + 1
+        + recursive_calls + recursive_adds + 1
+    )
 
     summary["total_tasks_approx"] = total_tasks
     summary["input_size"] = n
-    logger.info(f"[L0 deep_parallel_tree] DONE – ~{total_tasks} tasks spawned")
+    if store is not None:
+        summary["checkpoint"] = {
+            "store": repr(store),
+            "input_hash": root_hash,
+            "phases": phases,
+            "chunks": _subtree_counts(scatter, phases["scatter"]),
+            "partial_sum_levels": _subtree_counts(layered, phases["layered_sum"]),
+        }
+    logger.info("[L0 deep_parallel_tree] DONE – ~%d tasks spawned", total_tasks)
     return summary
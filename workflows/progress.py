@@ -0,0 +1,59 @@
+"""
+Progress events for long-running tasks.
+
+Tasks publish partial output as structured task-log lines. The backend
+reads them back through the Render logs API (filtered by task run and the
+PROGRESS_MARKER text) and relays the latest one to the UI while the run is
+still in progress.
+
+Line format:  [progress] {"task": "...", "seq": 3, "text": "...", "done": false}
+
+Configuration (environment variables):
+- PROGRESS_INTERVAL_MS: minimum gap between published events (default 250)
+"""
+
+import json
+import logging
+import os
+import time
+
+# Exempt from level gating and sampling (see log_config.PROGRESS_LOGGER)
+logger = logging.getLogger("progress")
+
+PROGRESS_MARKER = "[progress]"
+
+
+class ProgressPublisher:
+    """
+    Throttled publisher of partial text for one task invocation.
+
+    Each event carries the full text so far, so the consumer only ever
+    needs the most recent line.
+    """
+
+    def __init__(self, task: str, interval_ms: float | None = None):
+        self.task = task
+        if interval_ms is None:
+            interval_ms = float(os.getenv("PROGRESS_INTERVAL_MS", "250"))
+        self.interval = interval_ms / 1000
+        self.seq = 0
+        self._last_sent = 0.0
+
+    def due(self) -> bool:
+        """Whether update() would publish now; check before building the text."""
+        return time.monotonic() - self._last_sent >= self.interval
+
+    def update(self, text: str) -> None:
+        """Publish `text` unless an event went out less than an interval ago."""
+        if self.due():
+            self._emit(text, done=False)
+            self._last_sent = time.monotonic()
+
+    def finish(self, text: str) -> None:
+        """Always publish the final text."""
+        self._emit(text, done=True)
+
+    def _emit(self, text: str, done: bool) -> None:
+        self.seq += 1
+        event = {"task": self.task, "seq": self.seq, "text": text, "done": done}
+        logger.info(f"{PROGRESS_MARKER} {json.dumps(event, ensure_ascii=False)}")
@@ -0,0 +1,463 @@
+"""
+Error-classified, jittered retries with a retry budget per root run.
+
+Render retries a failed task run on a fixed schedule whatever the error
+was: a missing OPENAI_API_KEY is retried three times with seconds of
+sleep, and when a blip fails many leaves of a tree at once they all
+retry in lockstep. Tasks registered on the app (see app.py) are instead
+retried in-process by `retried()`, and Render keeps only RUNTIME_RETRIES
+retries (default 1, see runtime_retry) for failures the process cannot
+retry itself: a lost instance, an OOM kill, the run timing out. Set it
+to 0 to leave every retry to retried(); note a run whose in-process
+retries all failed is also run again by that platform retry. The
+`retry=Retry(...)` option of `@app.task` keeps its meaning:
+max_retries, wait_duration_ms and backoff_scaling now configure this
+policy.
+- Timeouts: `timeout_seconds` still bounds each attempt (async tasks),
+  and the run's timeout given to Render is stretched to cover every
+  attempt and the longest waits between them (RetryPolicy.run_timeout).
+
+- Classification: only transient errors are retried (timeouts,
+  connection errors, HTTP 408/409/429/5xx from OpenAI, anything
+  unrecognized). Permanent ones fail at once: bad arguments
+  (TypeError, ValueError other than JSON decoding), HTTP 4xx, a passed
+  deadline, and a failed subtask, which has already used its own
+  retries (retrying the parent would re-run the whole subtree).
+- Jitter: the wait before retry n is drawn uniformly from
+  [0, min(RETRY_MAX_WAIT_MS, wait_duration_ms * backoff_scaling**n)]
+  ("full jitter"), so failures that happened together retry apart.
+  A retry whose wait would outlast the run's deadline is not attempted.
+- Budget: a root run may spend RETRY_BUDGET retries (default 10) across
+  its whole subtree. Subtasks receive it in their input, a trailing
+  `{"__retry_budget__": ...}` argument like trace context and deadlines.
+  With a call_stats store (OPENAI_STATS_DB, see call_stats.py) the root
+  run counts retries there under an id of its own, and every run of its
+  tree spends from that one counter, however many run at once. Without
+  one, each subtask run is handed half of what is left (rounded up) as
+  it starts and reports what it spent in its result; the caller charges
+  that, or the whole share when the subtask failed, and takes the rest
+  back. Subtasks started after the budget is handed out get no retries.
+
+The root run's dict result gets a "retries" entry:
+    {"total": 2, "budget": 10, "denied": 0, "by_task": {"translate_text": 2}}
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from render_sdk import Retry
+from render_sdk.client.errors import TaskRunError
+from render_sdk.workflows.task import _current_client
+
+from call_stats import CallStats, get_call_stats
+from deadline import DeadlineExceeded, remaining_ms
+from metrics import task_retries, task_retries_denied
+
+logger = logging.getLogger(__name__)
+
+RETRY_BUDGET_KEY = "__retry_budget__"
+RESULT_KEY = "retries"
+# Wraps a subtask result that is not a dict, so it can carry a retry report
+RESULT_VALUE_KEY = "__result__"
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+RUNTIME_RETRY_WAIT_MS = 1000
+
+# Called as listener(task_name, attempt) for every retry; the local
+# executor uses it to count retries per run
+retry_listener: contextvars.ContextVar[Callable[[str, int], None] | None] = contextvars.ContextVar(
+    "retry_listener", default=None
+)
+# False retries without waiting (LocalExecutor(retry_waits=False))
+retry_waits: contextvars.ContextVar[bool] = contextvars.ContextVar("retry_waits", default=True)
+
+
+def default_budget() -> int:
+    return int(os.getenv("RETRY_BUDGET", "10"))
+
+
+def runtime_retry() -> Retry:
+    """What Render itself is told: RUNTIME_RETRIES platform retries, for infrastructure failures."""
+    return Retry(
+        max_retries=max(0, int(os.getenv("RUNTIME_RETRIES", "1"))),
+        wait_duration_ms=RUNTIME_RETRY_WAIT_MS,
+        backoff_scaling=1.0,
+    )
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long to wait before retrying one task's runs."""
+    max_retries: int
+    base_ms: float
+    multiplier: float = 2.0
+    max_ms: float = 30_000
+    attempt_timeout: float | None = None
+
+    @classmethod
+    def from_retry(cls, retry: Retry | None, timeout_seconds: int | None = None) -> "RetryPolicy":
+        if retry is None:
+            return cls(max_retries=0, base_ms=0, attempt_timeout=timeout_seconds)
+        return cls(
+            max_retries=retry.max_retries,
+            base_ms=retry.wait_duration_ms,
+            multiplier=retry.backoff_scaling,
+            max_ms=float(os.getenv("RETRY_MAX_WAIT_MS", "30000")),
+            attempt_timeout=timeout_seconds,
+        )
+
+    def max_wait_ms(self, attempt: int) -> float:
+        return min(self.max_ms, self.base_ms * self.multiplier ** attempt)
+
+    def wait_ms(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential backoff."""
+        return random.uniform(0, self.max_wait_ms(attempt))
+
+    def run_timeout(self) -> int | None:
+        """Timeout for the whole run: every attempt plus the longest waits between them."""
+        if not self.attempt_timeout:
+            return self.attempt_timeout
+        waits_ms = sum(self.max_wait_ms(attempt) for attempt in range(self.max_retries))
+        return math.ceil(self.attempt_timeout * (self.max_retries + 1) + waits_ms / 1000)
+
+
+class RetryBudget:
+    """Retries left for a root run and who spent them, in this process."""
+
+    shared = False
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.denied = 0
+        self.reserved = 0
+        self.by_task: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used - self.reserved)
+
+    def try_spend(self, task_name: str) -> bool:
+        with self._lock:
+            if self.used + self.reserved >= self.limit:
+                self.denied += 1
+                return False
+            self.used += 1
+            self.by_task[task_name] += 1
+            return True
+
+    def reserve(self) -> int:
+        """Set aside a subtask run's share: half of what is left, rounded up."""
+        with self._lock:
+            share = math.ceil(max(0, self.limit - self.used - self.reserved) / 2)
+            self.reserved += share
+            return share
+
+    def settle(self, share: int, report: dict | None) -> None:
+        """Charge what a subtask run reported spending; None (it failed) charges its whole share."""
+        with self._lock:
+            self.reserved -= share
+            if report is None:
+                self.used += share
+                return
+            self.used += int(report.get("total", 0))
+            self.denied += int(report.get("denied", 0))
+            self.by_task.update(report.get("by_task", {}))
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "total": self.used,
+                "budget": self.limit,
+                "denied": self.denied,
+                "by_task": dict(self.by_task),
+            }
+
+
+class SharedRetryBudget:
+    """
+    A root run's retry budget kept in the call_stats store, so every run
+    of its tree spends from one counter. Methods block.
+    """
+
+    shared = True
+
+    def __init__(self, store: CallStats, root_id: str, limit: int):
+        self.limit = limit
+        self.root_id = root_id
+        self._store = store
+        self._prefix = f"retry:{root_id}:"
+
+    def try_spend(self, task_name: str) -> bool:
+        # Claim the retry first, so concurrent runs cannot overshoot
+        key = self._prefix + "used"
+        used = self._store.add({key: 1}).get(key)
+        if used is None:
+            return False
+        if used <= self.limit:
+            self._store.add({f"{self._prefix}task:{task_name}": 1})
+            return True
+        self._store.add({key: -1, self._prefix + "denied": 1})
+        return False
+
+    def reserve(self) -> dict:
+        return {"root": self.root_id, "limit": self.limit}
+
+    def settle(self, share: dict, report: dict | None) -> None:
+        """Subtasks spend from the store themselves; nothing to charge."""
+
+    def report(self) -> dict:
+        counters = self._store.counters(self._prefix)
+        task_prefix = self._prefix + "task:"
+        return {
+            "total": int(counters.get(self._prefix + "used", 0)),
+            "budget": self.limit,
+            "denied": int(counters.get(self._prefix + "denied", 0)),
+            "by_task": {
+                name[len(task_prefix):]: int(value)
+                for name, value in counters.items()
+                if name.startswith(task_prefix) and value
+            },
+        }
+
+    def close(self) -> None:
+        """Drop the root run's counters."""
+        self._store.delete(self._prefix)
+
+
+# The budget of the task run executing in this context. The local
+# executor clears it for each task run, as every Render run starts empty.
+retry_budget: contextvars.ContextVar[RetryBudget | SharedRetryBudget | None] = contextvars.ContextVar(
+    "retry_budget", default=None
+)
+
+
+def classify(error: BaseException) -> str:
+    """TRANSIENT if retrying could help, PERMANENT if it cannot."""
+    if isinstance(error, (TaskRunError, DeadlineExceeded)):
+        return PERMANENT
+    # openai.APIStatusError and subclasses
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return TRANSIENT if status in (408, 409, 429) or status >= 500 else PERMANENT
+    if isinstance(error, json.JSONDecodeError):
+        # A model answered with malformed JSON; the next answer may be fine
+        return TRANSIENT
+    if isinstance(error, (TypeError, ValueError, NotImplementedError)):
+        return PERMANENT
+    return TRANSIENT
+
+
+def attach_retry_budget(input_data: list | dict, share: int | dict) -> list | dict:
+    """Return task input carrying the receiving task's retry budget."""
+    if isinstance(input_data, dict):
+        return {**input_data, RETRY_BUDGET_KEY: share}
+    return [*input_data, {RETRY_BUDGET_KEY: share}]
+
+
+def _is_envelope(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and RETRY_BUDGET_KEY in value
+
+
+def _split_call_args(args: tuple, kwargs: dict) -> tuple[tuple, dict, int | dict | None]:
+    """Remove the retry budget from a task's call arguments."""
+    if RETRY_BUDGET_KEY in kwargs:
+        kwargs = dict(kwargs)
+        return args, kwargs, kwargs.pop(RETRY_BUDGET_KEY)
+    if args and _is_envelope(args[-1]):
+        return args[:-1], kwargs, args[-1][RETRY_BUDGET_KEY]
+    return args, kwargs, None
+
+
+def _unwrap_report(result) -> tuple[object, dict]:
+    """Split a subtask result into its value and the retries it reported."""
+    if not isinstance(result, dict) or not isinstance(result.get(RESULT_KEY), dict):
+        return result, {}
+    if RESULT_VALUE_KEY in result:
+        return result[RESULT_VALUE_KEY], result[RESULT_KEY]
+    result = dict(result)
+    return result, result.pop(RESULT_KEY)
+
+
+class _BudgetClient:
+    """Wraps the subtask client to hand subtasks their budget and charge what they spent."""
+
+    def __init__(self, client, budget: RetryBudget | SharedRetryBudget):
+        self._client = client
+        self._budget = budget
+
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None):
+        share = self._budget.reserve()
+        try:
+            result = await self._client.run_subtask(task_name, attach_retry_budget(input_data or [], share))
+        except BaseException:
+            self._budget.settle(share, None)
+            raise
+        result, report = _unwrap_report(result)
+        self._budget.settle(share, report)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _retry_wait_ms(name: str, policy: RetryPolicy, attempt: int, error: Exception) -> float | None:
+    """Milliseconds to wait before retrying after `error`, or None to give up."""
+    if attempt >= policy.max_retries:
+        return None
+    if classify(error) == PERMANENT:
+        logger.warning("[Retry] %s: not retrying %s: %s", name, type(error).__name__, error)
+        task_retries_denied.inc(name, "permanent")
+        return None
+    wait_ms = policy.wait_ms(attempt)
+    remaining = remaining_ms()
+    if remaining is not None and wait_ms >= remaining:
+        logger.warning("[Retry] %s: not retrying, deadline is %.0fms away", name, remaining)
+        task_retries_denied.inc(name, "deadline")
+        return None
+    return wait_ms
+
+
+def _charged_wait(
+    name: str, budget: RetryBudget | SharedRetryBudget, attempt: int, error: Exception, wait_ms: float, spent: bool
+) -> float | None:
+    """Seconds to wait before a retry the budget paid for (`spent`), or None if it did not."""
+    if not spent:
+        logger.warning("[Retry] %s: retry budget of %d exhausted", name, budget.limit)
+        task_retries_denied.inc(name, "budget")
+        return None
+    logger.warning(
+        "[Retry] %s attempt %d failed (%s: %s); retrying in %.0fms",
+        name, attempt + 1, type(error).__name__, error, wait_ms,
+    )
+    task_retries.inc(name)
+    listener = retry_listener.get()
+    if listener is not None:
+        listener(name, attempt + 1)
+    return wait_ms / 1000 if retry_waits.get() else 0.0
+
+
+def _begin(args: tuple, kwargs: dict) -> tuple[tuple, dict, RetryBudget | SharedRetryBudget, bool, bool]:
+    """Split off the budget; returns (args, kwargs, budget, owned, root)."""
+    args, kwargs, received = _split_call_args(args, kwargs)
+    inherited = retry_budget.get()
+    if inherited is not None:
+        return args, kwargs, inherited, False, False
+    if received is None:
+        store = get_call_stats()
+        if store is not None:
+            return args, kwargs, SharedRetryBudget(store, uuid.uuid4().hex, default_budget()), True, True
+        return args, kwargs, RetryBudget(default_budget()), True, True
+    if not isinstance(received, dict):
+        return args, kwargs, RetryBudget(int(received)), True, False
+    store = get_call_stats()
+    if store is None:
+        logger.warning("[Retry] No call_stats store for the shared retry budget; not retrying")
+        return args, kwargs, RetryBudget(0), True, False
+    return args, kwargs, SharedRetryBudget(store, received["root"], int(received["limit"])), True, False
+
+
+def _finish(result, budget: RetryBudget | SharedRetryBudget, owned: bool, root: bool):
+    """
+    Report the retries of a run that owns its budget: a root run in its
+    dict result, a subtask run (without a shared store) to its caller,
+    wrapping a result that is not a dict.
+    """
+    if not owned:
+        return result
+    if root:
+        return {**result, RESULT_KEY: budget.report()} if isinstance(result, dict) else result
+    if budget.shared or not (budget.used or budget.denied):
+        return result
+    if isinstance(result, dict):
+        return {**result, RESULT_KEY: budget.report()}
+    return {RESULT_VALUE_KEY: result, RESULT_KEY: budget.report()}
+
+
+def retried(func, policy: RetryPolicy):
+    """Wrap a task function to retry transient failures under `policy`."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            args, kwargs, budget, owned, root = _begin(args, kwargs)
+            token = retry_budget.set(budget)
+            client = _current_client.get(None)
+            client_token = _current_client.set(_BudgetClient(client, budget)) if client else None
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        if policy.attempt_timeout and policy.max_retries:
+                            result = await asyncio.wait_for(func(*args, **kwargs), policy.attempt_timeout)
+                        else:
+                            result = await func(*args, **kwargs)
+                        break
+                    except Exception as e:
+                        wait_ms = _retry_wait_ms(name, policy, attempt, e)
+                        if wait_ms is None:
+                            raise
+                        if budget.shared:
+                            spent = await asyncio.to_thread(budget.try_spend, name)
+                        else:
+                            spent = budget.try_spend(name)
+                        wait = _charged_wait(name, budget, attempt, e, wait_ms, spent)
+                        if wait is None:
+                            raise
+                        attempt += 1
+                        await asyncio.sleep(wait)
+                if root and budget.shared:
+                    return await asyncio.to_thread(_finish, result, budget, owned, root)
+                return _finish(result, budget, owned, root)
+            finally:
+                if client_token is not None:
+                    _current_client.reset(client_token)
+                retry_budget.reset(token)
+                if root and budget.shared:
+                    await asyncio.to_thread(budget.close)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        args, kwargs, budget, owned, root = _begin(args, kwargs)
+        token = retry_budget.set(budget)
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                    break
+                except Exception as e:
+                    wait_ms = _retry_wait_ms(name, policy, attempt, e)
+                    if wait_ms is None:
+                        raise
+                    wait = _charged_wait(name, budget, attempt, e, wait_ms, budget.try_spend(name))
+                    if wait is None:
+                        raise
+                    attempt += 1
+                    time.sleep(wait)
+            return _finish(result, budget, owned, root)
+        finally:
+            retry_budget.reset(token)
+            if root and budget.shared:
+                budget.close()
+
+    return sync_wrapper
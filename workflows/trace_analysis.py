@@ -0,0 +1,313 @@
+"""
+Critical-path and per-level analysis of a traced deep_parallel_tree run.
+
+Reads a Chrome trace written by tracing.Tracer (or runs the tree first
+with --run) and reports:
+
+- the critical path: the chain of spans that determined the end-to-end
+  time, walking back from the root's end through the child each span was
+  last waiting on, with the time each span contributed on its own
+- a per-level breakdown using the L0-L12 levels from parallel_tasks.py
+  (tree_partial_sum recursion keeps going past L11 on larger inputs, so
+  each group is keyed by level and task): task count, wall time the
+  level was active, busy time, self time (time not covered by children),
+  queue wait and payload bytes
+
+With --latency-profile it also writes each task's median self time as
+JSON, the per-task latencies the backend's dry-run planner predicts wall
+time from (EXPLAIN_LATENCY_PROFILE, see backend/explain.py).
+
+Usage:
+    python trace_analysis.py trace.json
+    python trace_analysis.py --run --size 48 --chunk-size 4 --latency-ms 2 --trace trace.json
+    python trace_analysis.py trace.json --latency-profile latencies.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+# Ensure sibling modules are importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tracing import Span, Tracer, spans_from_chrome_trace  # noqa: E402
+
+# Levels from the deep_parallel_tree architecture comment in parallel_tasks.py
+TREE_LEVELS = {
+    "deep_parallel_tree": 0,
+    "tree_scatter": 1,
+    "tree_chunk_process": 2,
+    "tree_square": 3,
+    "tree_cube": 4,
+    "tree_combine": 5,
+    "tree_cross_reduce": 6,
+    "tree_pair_add": 7,
+    "tree_pair_multiply": 8,
+    "tree_layered_sum": 9,
+    "tree_finalize": 12,
+}
+PARTIAL_SUM = "tree_partial_sum"
+
+
+@dataclass
+class LevelStats:
+    tasks: int = 0
+    first_start_us: int | None = None
+    last_end_us: int = 0
+    busy_us: int = 0
+    self_us: int = 0
+    queue_wait_us: int = 0
+    retries: int = 0
+    payload_bytes: int = 0
+
+    @property
+    def wall_us(self) -> int:
+        return self.last_end_us - (self.first_start_us or 0)
+
+
+def _children_by_parent(spans: list[Span]) -> dict[int | None, list[Span]]:
+    children = defaultdict(list)
+    for span in spans:
+        children[span.parent_id].append(span)
+    return children
+
+
+def _covered_us(intervals: list[tuple[int, int]]) -> int:
+    """Total length of the union of intervals."""
+    total, current_start, current_end = 0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def span_levels(spans: list[Span]) -> dict[int, str]:
+    """
+    Label each span with its deep_parallel_tree level group, e.g. "L3 tree_square".
+
+    tree_partial_sum is L9+depth, where depth counts the partial sums above
+    it; tree_pair_add calls made by a partial sum are grouped with it
+    rather than with the cross-reduce's L7.
+    """
+    by_id = {s.span_id: s for s in spans}
+    labels: dict[int, str] = {}
+
+    def level_of(span: Span) -> int | None:
+        if span.name == PARTIAL_SUM:
+            depth, parent = 1, by_id.get(span.parent_id)
+            while parent is not None and parent.name == PARTIAL_SUM:
+                depth += 1
+                parent = by_id.get(parent.parent_id)
+            return 9 + depth
+        parent = by_id.get(span.parent_id)
+        if span.name == "tree_pair_add" and parent is not None and parent.name == PARTIAL_SUM:
+            return level_of(parent)
+        return TREE_LEVELS.get(span.name)
+
+    for span in spans:
+        level = level_of(span)
+        parent = by_id.get(span.parent_id)
+        group = PARTIAL_SUM if parent is not None and parent.name == PARTIAL_SUM else span.name
+        labels[span.span_id] = f"L{level} {group}" if level is not None else span.name
+    return labels
+
+
+def critical_path(spans: list[Span]) -> list[tuple[Span, int]]:
+    """
+    The chain of spans that set the end-to-end time, root first.
+
+    Returns (span, self_us) pairs where self_us is the time the span spent
+    on the path itself: its own work and queue wait, not a child's.
+    """
+    children = _children_by_parent(spans)
+    roots = children.get(None, [])
+    if not roots:
+        return []
+    root = max(roots, key=lambda s: s.end_us - s.start_us)
+    path: list[tuple[Span, int]] = []
+
+    def walk(span: Span) -> None:
+        entry = len(path)
+        path.append((span, 0))
+        cursor = span.end_us
+        self_us = 0
+        remaining = sorted(children.get(span.span_id, []), key=lambda s: s.end_us, reverse=True)
+        gating: list[Span] = []
+        # Walk backwards: the child that finished last before the cursor gated it
+        for child in remaining:
+            if child.end_us <= cursor and child.start_us >= span.start_us:
+                self_us += cursor - child.end_us
+                gating.append(child)
+                cursor = child.start_us
+        self_us += cursor - span.start_us
+        path[entry] = (span, self_us)
+        for child in reversed(gating):
+            walk(child)
+
+    walk(root)
+    return path
+
+
+def level_breakdown(spans: list[Span]) -> dict[str, LevelStats]:
+    labels = span_levels(spans)
+    children = _children_by_parent(spans)
+    levels: dict[str, LevelStats] = defaultdict(LevelStats)
+    for span in spans:
+        stats = levels[labels[span.span_id]]
+        stats.tasks += 1
+        stats.first_start_us = (
+            span.start_us if stats.first_start_us is None else min(stats.first_start_us, span.start_us)
+        )
+        stats.last_end_us = max(stats.last_end_us, span.end_us)
+        stats.busy_us += span.duration_us
+        covered = _covered_us([(c.start_us, c.end_us) for c in children.get(span.span_id, [])])
+        stats.self_us += max(0, span.duration_us - covered)
+        stats.queue_wait_us += span.queue_wait_us
+        stats.retries += span.retries
+        stats.payload_bytes += span.input_bytes + span.output_bytes
+    return levels
+
+
+def task_latencies(spans: list[Span]) -> dict[str, dict]:
+    """Per task name: runs, and median and p90 self time (queue wait and own work)."""
+    children = _children_by_parent(spans)
+    self_ms: dict[str, list[float]] = defaultdict(list)
+    for span in spans:
+        covered = _covered_us([(c.start_us, c.end_us) for c in children.get(span.span_id, [])])
+        self_ms[span.name].append(max(0, span.duration_us - covered) / 1000)
+    profile = {}
+    for name, values in sorted(self_ms.items()):
+        values.sort()
+        profile[name] = {
+            "runs": len(values),
+            "self_ms": round(statistics.median(values), 3),
+            "p90_self_ms": round(values[min(len(values) - 1, int(len(values) * 0.9))], 3),
+        }
+    return profile
+
+
+def _level_key(label: str) -> tuple[int, str]:
+    level = label.split(" ")[0][1:]
+    return (int(level), label) if level.isdigit() else (10**6, label)
+
+
+def report(spans: list[Span]) -> dict:
+    path = critical_path(spans)
+    labels = span_levels(spans)
+    levels = level_breakdown(spans)
+    total_us = path[0][0].duration_us if path else 0
+
+    path_by_level: dict[str, int] = defaultdict(int)
+    for span, self_us in path:
+        path_by_level[labels[span.span_id]] += self_us
+
+    return {
+        "spans": len(spans),
+        "total_ms": total_us / 1000,
+        "critical_path": [
+            {
+                "span_id": span.span_id,
+                "name": span.name,
+                "level": labels[span.span_id],
+                "duration_ms": span.duration_us / 1000,
+                "self_ms": self_us / 1000,
+                "queue_wait_ms": span.queue_wait_us / 1000,
+            }
+            for span, self_us in path
+        ],
+        "levels": {
+            label: {
+                "tasks": stats.tasks,
+                "wall_ms": stats.wall_us / 1000,
+                "busy_ms": stats.busy_us / 1000,
+                "self_ms": stats.self_us / 1000,
+                "queue_wait_ms": stats.queue_wait_us / 1000,
+                "critical_path_ms": path_by_level.get(label, 0) / 1000,
+                "retries": stats.retries,
+                "payload_bytes": stats.payload_bytes,
+            }
+            for label, stats in sorted(levels.items(), key=lambda item: _level_key(item[0]))
+        },
+    }
+
+
+def print_report(result: dict) -> None:
+    path = result["critical_path"]
+    print(f"{result['spans']} spans, end-to-end {result['total_ms']:.1f}ms")
+    print(f"\nCritical path ({len(path)} spans):")
+    for step in path:
+        print(
+            f"  {step['level']:<24} {step['name']:<20} {step['duration_ms']:>9.1f}ms "
+            f"self {step['self_ms']:>8.1f}ms  queued {step['queue_wait_ms']:>7.1f}ms"
+        )
+
+    print(f"\n{'level':<24} {'tasks':>6} {'wall ms':>9} {'busy ms':>10} {'self ms':>9} "
+          f"{'queue ms':>9} {'on path':>8} {'bytes':>9}")
+    for label, row in result["levels"].items():
+        print(
+            f"{label:<24} {row['tasks']:>6} {row['wall_ms']:>9.1f} {row['busy_ms']:>10.1f} "
+            f"{row['self_ms']:>9.1f} {row['queue_wait_ms']:>9.1f} {row['critical_path_ms']:>8.1f} "
+            f"{row['payload_bytes']:>9}"
+        )
+
+
+def run_traced(size: int, chunk_size: int, latency_ms: float) -> Tracer:
+    """Run deep_parallel_tree on the local executor with tracing on."""
+    from local_executor import LocalExecutor
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from main import app
+
+    tracer = Tracer()
+    with LocalExecutor(app, task_latency_ms=latency_ms, tracer=tracer) as executor:
+        executor.run_sync("deep_parallel_tree", [list(range(1, size + 1)), chunk_size])
+    return tracer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Critical-path analysis of a deep_parallel_tree trace")
+    parser.add_argument("trace_file", nargs="?", help="Chrome trace JSON written by tracing.Tracer")
+    parser.add_argument("--run", action="store_true", help="Run the tree locally first")
+    parser.add_argument("--size", type=int, default=12)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated overhead per task run")
+    parser.add_argument("--trace", default="trace.json", help="Where --run writes its trace")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--latency-profile", help="Write per-task median self times to this JSON file")
+    args = parser.parse_args()
+
+    if args.run:
+        tracer = run_traced(args.size, args.chunk_size, args.latency_ms)
+        tracer.write_chrome_trace(args.trace)
+        spans = [s for s in tracer.spans if s.end_us is not None]
+        print(f"Wrote {args.trace}", file=sys.stderr)
+    elif args.trace_file:
+        with open(args.trace_file) as f:
+            spans = spans_from_chrome_trace(json.load(f))
+    else:
+        parser.error("pass a trace file or --run")
+
+    if args.latency_profile:
+        with open(args.latency_profile, "w") as f:
+            json.dump({"tasks": task_latencies(spans)}, f, indent=2)
+        print(f"Wrote {args.latency_profile}", file=sys.stderr)
+
+    result = report(spans)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+W3C trace context for task runs.
+
+Task runs carry no headers, so the backend passes its `traceparent` in
+the task input itself: a trailing `{"__traceparent__": "00-..."}`
+argument for positional input, or a `__traceparent__` key for named
+input. `traced()` wraps every task registered on the app (see app.py):
+
+- strips the context from the input before the task function sees it
+- records a span for the task run, parented to the caller's span
+- hands the context on to every subtask the task starts
+
+Spans are exported as OTLP JSON, one span per export since every task
+run is its own short-lived process:
+
+- OTEL_EXPORTER_OTLP_ENDPOINT: POST to <endpoint>/v1/traces (e.g. the
+  local stand-in in otlp_collector.py)
+- TRACE_EXPORT_FILE: append one OTLP JSON document per line
+- OTEL_SERVICE_NAME: service.name resource attribute (default
+  "workflow-worker")
+
+With neither exporter set, context is still passed through to subtasks
+but no spans are recorded.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import secrets
+import time
+from dataclasses import dataclass
+
+from render_sdk.workflows.task import _current_client
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_KEY = "__traceparent__"
+
+# OTLP span kinds
+SPAN_KIND_CONSUMER = 5
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    """The parts of a W3C traceparent header."""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @classmethod
+    def new_root(cls) -> "TraceContext":
+        return cls(trace_id=secrets.token_hex(16), span_id=secrets.token_hex(8))
+
+    @classmethod
+    def parse(cls, header: str | None) -> "TraceContext | None":
+        """Parse a traceparent header; None if it is missing or malformed."""
+        if not header:
+            return None
+        parts = header.strip().split("-")
+        if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        version, trace_id, span_id, flags = parts[:4]
+        if version == "ff" or set(trace_id) == {"0"} or set(span_id) == {"0"}:
+            return None
+        try:
+            int(trace_id, 16), int(span_id, 16)
+            sampled = bool(int(flags, 16) & 1)
+        except ValueError:
+            return None
+        return cls(trace_id=trace_id, span_id=span_id, sampled=sampled)
+
+    def child(self) -> "TraceContext":
+        """Context for a new span within the same trace."""
+        return TraceContext(self.trace_id, secrets.token_hex(8), self.sampled)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def export_enabled() -> bool:
+    return bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("TRACE_EXPORT_FILE"))
+
+
+def attach_trace_context(input_data: list | dict, context: TraceContext) -> list | dict:
+    """Return task input carrying `context` for the receiving task."""
+    if isinstance(input_data, dict):
+        return {**input_data, TRACEPARENT_KEY: context.traceparent}
+    return [*input_data, {TRACEPARENT_KEY: context.traceparent}]
+
+
+def _is_envelope(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and TRACEPARENT_KEY in value
+
+
+def _split_call_args(args: tuple, kwargs: dict) -> tuple[tuple, dict, TraceContext | None]:
+    """Remove the trace context from a task's call arguments."""
+    if TRACEPARENT_KEY in kwargs:
+        kwargs = dict(kwargs)
+        return args, kwargs, TraceContext.parse(kwargs.pop(TRACEPARENT_KEY))
+    if args and _is_envelope(args[-1]):
+        return args[:-1], kwargs, TraceContext.parse(args[-1][TRACEPARENT_KEY])
+    return args, kwargs, None
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_document(
+    context: TraceContext,
+    parent: TraceContext | None,
+    name: str,
+    kind: int,
+    start_ns: int,
+    end_ns: int,
+    attributes: dict,
+    error: BaseException | None = None,
+) -> dict:
+    """One span as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    span = {
+        "traceId": context.trace_id,
+        "spanId": context.span_id,
+        "parentSpanId": parent.span_id if parent else "",
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_otlp_attribute(k, v) for k, v in attributes.items()],
+        "status": (
+            {"code": STATUS_ERROR, "message": f"{type(error).__name__}: {error}"}
+            if error is not None else {"code": STATUS_OK}
+        ),
+    }
+    service = os.getenv("OTEL_SERVICE_NAME", "workflow-worker")
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service)]},
+            "scopeSpans": [{"scope": {"name": "workflows.trace_context"}, "spans": [span]}],
+        }]
+    }
+
+
+def export_span(document: dict) -> None:
+    """Send one OTLP document to the configured exporter. Never raises."""
+    try:
+        path = os.getenv("TRACE_EXPORT_FILE")
+        if path:
+            with open(path, "a") as f:
+                f.write(json.dumps(document) + "\n")
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+        if endpoint:
+            import httpx
+
+            httpx.post(f"{endpoint.rstrip('/')}/v1/traces", json=document, timeout=2.0)
+    except Exception as e:
+        logger.warning(f"[Tracing] Failed to export span: {e}")
+
+
+class _PropagatingClient:
+    """Wraps the subtask client so every subtask inherits the trace context."""
+
+    def __init__(self, client, context: TraceContext):
+        self._client = client
+        self._context = context
+
+    async def run_subtask(self, task_name: str, input_data: list | dict | None = None):
+        return await self._client.run_subtask(
+            task_name, attach_trace_context(input_data or [], self._context)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _begin(parent: TraceContext | None) -> tuple[TraceContext | None, int]:
+    if parent is None and not export_enabled():
+        return None, 0
+    context = parent.child() if parent else TraceContext.new_root()
+    return context, time.time_ns()
+
+
+def _finish(name, context, parent, start_ns, args, kwargs, error) -> dict | None:
+    if not (export_enabled() and context.sampled):
+        return None
+    input_bytes = len(json.dumps(kwargs if kwargs else list(args), default=str))
+    return otlp_document(
+        context, parent, name, SPAN_KIND_CONSUMER, start_ns, time.time_ns(),
+        {"task.name": name, "task.input_bytes": input_bytes}, error,
+    )
+
+
+def traced(func):
+    """Wrap a task function to receive, record and propagate trace context."""
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            args, kwargs, parent = _split_call_args(args, kwargs)
+            context, start_ns = _begin(parent)
+            if context is None:
+                return await func(*args, **kwargs)
+
+            client = _current_client.get(None)
+            token = _current_client.set(_PropagatingClient(client, context)) if client else None
+            error = None
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                if token is not None:
+                    _current_client.reset(token)
+                document = _finish(name, context, parent, start_ns, args, kwargs, error)
+                if document is not None:
+                    await asyncio.to_thread(export_span, document)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        args, kwargs, parent = _split_call_args(args, kwargs)
+        context, start_ns = _begin(parent)
+        if context is None:
+            return func(*args, **kwargs)
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            document = _finish(name, context, parent, start_ns, args, kwargs, error)
+            if document is not None:
+                export_span(document)
+
+    return sync_wrapper
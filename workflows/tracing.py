@@ -0,0 +1,192 @@
+"""
+Span tracing for task runs.
+
+A span covers one task invocation from the moment it was submitted to the
+moment its result came back:
+
+- start / end: submission and completion (wall clock, microseconds)
+- parent: the span of the task that spawned it
+- queue wait: time between submission and the task function starting
+  (scheduling overhead, a busy pool)
+- retries and payload size: JSON-encoded input and output bytes
+
+Spans are collected by a Tracer and exported as Chrome trace-event JSON,
+which chrome://tracing and https://ui.perfetto.dev open directly.
+trace_analysis.py reads the same file back to compute the critical path.
+
+Usage:
+    tracer = Tracer()
+    executor = LocalExecutor(app, tracer=tracer)
+    executor.run_sync("deep_parallel_tree", [numbers])
+    tracer.write_chrome_trace("trace.json")
+"""
+
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+
+TRACE_CATEGORY = "task"
+QUEUE_CATEGORY = "queue"
+
+
+def now_us() -> int:
+    """Wall-clock time in microseconds (comparable across processes)."""
+    return time.time_ns() // 1000
+
+
+@dataclass
+class Span:
+    """One task invocation."""
+    span_id: int | str
+    name: str
+    parent_id: int | str | None
+    start_us: int
+    end_us: int | None = None
+    exec_start_us: int | None = None
+    retries: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    error: str | None = None
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration_us(self) -> int:
+        return (self.end_us or self.start_us) - self.start_us
+
+    @property
+    def queue_wait_us(self) -> int:
+        if self.exec_start_us is None:
+            return 0
+        return max(0, self.exec_start_us - self.start_us)
+
+    def mark_started(self, at_us: int | None = None) -> None:
+        """Record when the task function first began executing."""
+        if self.exec_start_us is None:
+            self.exec_start_us = at_us if at_us is not None else now_us()
+
+
+class Tracer:
+    """Collects spans for one or more task runs."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent: Span | None = None, **attributes) -> Span:
+        with self._lock:
+            span = Span(
+                span_id=next(self._ids),
+                name=name,
+                parent_id=parent.span_id if parent else None,
+                start_us=now_us(),
+                attributes=attributes,
+            )
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, error: BaseException | None = None) -> None:
+        span.end_us = now_us()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+
+    def to_chrome_trace(self) -> dict:
+        """Export finished spans as Chrome trace-event JSON."""
+        return {"traceEvents": chrome_trace_events(self.spans), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+def _assign_lanes(spans: list[Span]) -> dict[int, int]:
+    """
+    Pack spans onto thread lanes so that every lane is properly nested.
+
+    Trace viewers draw a lane as a flame chart, so overlapping siblings
+    must land on different lanes while children can share their parent's.
+    """
+    lanes: list[list[Span]] = []
+    assignment: dict[int, int] = {}
+    for span in sorted(spans, key=lambda s: (s.start_us, -s.duration_us)):
+        end = span.end_us or span.start_us
+        for index, stack in enumerate(lanes):
+            while stack and (stack[-1].end_us or 0) <= span.start_us:
+                stack.pop()
+            if not stack or (stack[-1].end_us or 0) >= end:
+                stack.append(span)
+                assignment[span.span_id] = index
+                break
+        else:
+            lanes.append([span])
+            assignment[span.span_id] = len(lanes) - 1
+    return assignment
+
+
+def chrome_trace_events(spans: list[Span]) -> list[dict]:
+    """Complete ("X") events for each span, plus a nested slice for queue wait."""
+    finished = [s for s in spans if s.end_us is not None]
+    lanes = _assign_lanes(finished)
+    events = [
+        {"ph": "M", "pid": 1, "name": "process_name", "args": {"name": "workflow tasks"}},
+    ]
+    for span in finished:
+        tid = lanes[span.span_id]
+        events.append({
+            "ph": "X",
+            "cat": TRACE_CATEGORY,
+            "name": span.name,
+            "pid": 1,
+            "tid": tid,
+            "ts": span.start_us,
+            "dur": span.duration_us,
+            "args": {
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "queue_wait_us": span.queue_wait_us,
+                "retries": span.retries,
+                "input_bytes": span.input_bytes,
+                "output_bytes": span.output_bytes,
+                "error": span.error,
+                **span.attributes,
+            },
+        })
+        if span.queue_wait_us:
+            events.append({
+                "ph": "X",
+                "cat": QUEUE_CATEGORY,
+                "name": "queued",
+                "pid": 1,
+                "tid": tid,
+                "ts": span.start_us,
+                "dur": span.queue_wait_us,
+                "args": {"span_id": span.span_id},
+            })
+    return events
+
+
+def spans_from_chrome_trace(trace: dict | list) -> list[Span]:
+    """Rebuild spans from an exported Chrome trace."""
+    events = trace["traceEvents"] if isinstance(trace, dict) else trace
+    spans = []
+    for event in events:
+        if event.get("ph") != "X" or event.get("cat") != TRACE_CATEGORY:
+            continue
+        args = dict(event.get("args", {}))
+        queue_wait = args.pop("queue_wait_us", 0)
+        spans.append(Span(
+            span_id=args.pop("span_id"),
+            name=event["name"],
+            parent_id=args.pop("parent_id", None),
+            start_us=event["ts"],
+            end_us=event["ts"] + event["dur"],
+            exec_start_us=event["ts"] + queue_wait,
+            retries=args.pop("retries", 0),
+            input_bytes=args.pop("input_bytes", 0),
+            output_bytes=args.pop("output_bytes", 0),
+            error=args.pop("error", None),
+            attributes=args,
+        ))
+    return spans